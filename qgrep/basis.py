@@ -1,12 +1,44 @@
 import json
 import numpy as np
 
-from collections import Iterable, OrderedDict
+from collections import Counter, OrderedDict
+from collections.abc import Iterable
 from more_itertools import take
+from multiprocessing import Pool
 from .atom import ensure_short_atom_name
 
 SUPPORTED = ["gaussian94", "gamess", "bagel", "cfour", "molpro"]
 AM = "SPDFGHIKLMN"
+EXTENSIONS = {
+    "gaussian94": "gbs",
+    "gamess": "gamess",
+    "bagel": "json",
+    "cfour": "GENBAS",
+    "molpro": "bas",
+}
+
+
+def format_block(form, values):
+    """
+    Format a block of values with a single call to format
+    :param form: format string for a single row of values
+    :param values: 2D np.array, one row per line
+    :return: formatted string of the entire block
+    """
+    return (form * len(values)).format(*np.ravel(values))
+
+
+def num_components(am, cartesian=False):
+    """
+    Number of angular components of a shell
+    :param am: angular momentum, -1 for combined SP (L) shells
+    :param cartesian: use cartesian instead of spherical functions
+    """
+    if am == -1:
+        return 1 + 3
+    if cartesian:
+        return (am + 1) * (am + 2) // 2
+    return 2 * am + 1
 
 
 class BasisFunction:
@@ -23,7 +55,7 @@ class BasisFunction:
                 "Expected exactly two sets of coefficients for combined BasisFunction."
             )
 
-        if not exps or not coeffs:
+        if not exps.size or not coeffs.size:
             raise SyntaxError("Cannot create an empty BasisFunction.")
         elif len(exps) != coeffs.shape[-1]:
             raise SyntaxError(
@@ -71,6 +103,17 @@ class BasisFunction:
         """
         return hash((self.func_type, self.values.data.tobytes()))
 
+    def canonical_key(self, rtol=1e-7, atol=1e-7):
+        """
+        Generate a hashable key that is shared by BasisFunctions whose exponents agree to within
+        rtol (relative) and whose coefficients agree to within atol (absolute)
+        WARNING: values that straddle a rounding boundary produce different keys
+        :return: (func_type, exponent bytes, coefficient bytes)
+        """
+        exps_key = np.rint(np.log(self.exps) / rtol).astype(np.int64)
+        coeffs_key = np.rint(self.coeffs / atol).astype(np.int64)
+        return self.func_type, exps_key.tobytes(), coeffs_key.tobytes()
+
     @staticmethod
     def check_exps(exps):
         """Check to make sure that the exponents are valid"""
@@ -113,6 +156,23 @@ class BasisFunction:
             return -1
         return AM.index(self.func_type)
 
+    def num_functions(self, cartesian=False):
+        """
+        Number of contracted basis functions, counting every angular component
+        :param cartesian: use cartesian instead of spherical functions
+        """
+        if self.am == -1:
+            # The two sets of coefficients form one S and one P function
+            return num_components(self.am)
+        return self.num_coeffs * num_components(self.am, cartesian)
+
+    def num_primitives(self, cartesian=False):
+        """
+        Number of primitive Gaussians, counting every angular component
+        :param cartesian: use cartesian instead of spherical functions
+        """
+        return len(self) * num_components(self.am, cartesian)
+
     def decontracted(self):
         """
         Creates individual BasisFunctions with only a single Gaussian
@@ -126,22 +186,32 @@ class BasisFunction:
         else:
             # Note: Only needs exp as all different coeffs will produce same BasisFunction
             for exp in exps:
-                yield BasisFunction(func_type, [exp], [1])
+                yield BasisFunction.primitive(func_type, exp)
+
+    @staticmethod
+    def primitive(func_type, exp):
+        """
+        Quickly create a BasisFunction of a single primitive with a coefficient of 1
+        WARNING: skips validation, func_type and exp must already be valid
+        """
+        bf = BasisFunction.__new__(BasisFunction)
+        bf.func_type = func_type
+        bf.num_coeffs = 1
+        bf.values = np.array([[exp, 1.0]])
+        return bf
 
     def print(self, style="gaussian94", atom=""):
         """Print the BasisFunction to a string"""
         num_coeffs = self.num_coeffs
         out = ""
-        form = "{:>17.7f}" + " {:> 11.7f}" * num_coeffs
+        form = "{:>17.7f}" + " {:> 11.7f}" * num_coeffs + "\n"
         if style == "gaussian94":
             out += f"{self.func_type:<2}    {len(self)}\n"
-            for group in self.values:
-                out += form.format(*group) + "\n"
+            out += format_block(form, self.values)
         elif style == "gamess":
             out += f"{self.func_type:<2}    {len(self)}\n"
-            form = " {:>2} " + form
-            for i, group in enumerate(self.values, start=1):
-                out += form.format(i, *group) + "\n"
+            indices = np.arange(1, len(self) + 1)[:, np.newaxis]
+            out += format_block(" {:>2.0f} " + form, np.append(indices, self.values, axis=1))
         elif style == "bagel":
             vals_form = ",".join(["{:>15.8f}"] * len(self))
             c_form = ", ".join(["[" + vals_form + "]"] * num_coeffs)
@@ -152,17 +222,15 @@ class BasisFunction:
                 + c_form
                 + "]\n}}\n"
             )
-            out += bagel_form.format(self.func_type.lower(), *self.exps, *self.coeffs.flatten())
+            out += bagel_form.format(self.func_type.lower(), *self.exps, *self.coeffs.T.flatten())
         elif style == "cfour":
-            # Print exponents
-            for i, exp in enumerate(self.exps):
-                if not i % 6:
-                    out += "\n"
-                out += f" {exp:>12.7g}"
+            # Print exponents, six per line
+            for i in range(0, len(self), 6):
+                exps = self.exps[i : i + 6]
+                out += "\n" + (" {:>12.7g}" * len(exps)).format(*exps)
             out += "\n\n"
             # Print coefficients
-            for c_line in self.coeffs:
-                out += (" {:>12.7g}" * self.num_coeffs).format(*c_line) + "\n"
+            out += format_block(" {:>12.7g}" * num_coeffs + "\n", self.coeffs)
         else:
             raise ValueError(f'Only [{", ".join(SUPPORTED)}] currently supported, got:{style}.')
         return out
@@ -202,7 +270,7 @@ class Basis:
 
     def __eq__(self, other):
         """Check if the two basis are equivalent"""
-        return len(self) != len(other) and all(s == o for s, o in zip(self, other))
+        return len(self) == len(other) and all(s == o for s, o in zip(self, other))
 
     def __iter__(self):
         yield from self.basis_functions
@@ -213,15 +281,17 @@ class Basis:
     def __str__(self):
         return self.print()
 
-    def decontracted(self):
+    def decontracted(self, shell_pool=None):
         """
         Generates a decontracted Basis. See BasisFunction.decontracted()
+        :param shell_pool: ShellPool to look up (and cache) the decontracted BasisFunctions in
         :return: Basis with all BasisFunctions decontracted (duplicates removed)
         """
         basis_functions = []
         basis_functions_set = set()
         for con in self:
-            for f in con.decontracted():
+            fs = con.decontracted() if shell_pool is None else shell_pool.decontracted(con)
+            for f in fs:
                 if f not in basis_functions_set:
                     basis_functions_set.add(f)
                     basis_functions.append(f)
@@ -276,12 +346,11 @@ class Basis:
                 end_count = start_count + len(bf.exps) - 1
                 # Add exps to ex string
                 am_dict[bf.am][0] += ", " + ", ".join(f"{exp:.7f}" for exp in bf.exps)
-                # Add coeffs to co string
-                co = f"c, {start_count}.{end_count}"
-                for coef in bf.coeffs:
-                    co += f", {float(coef):9.7f}"
-                co += "\n"
-                am_dict[bf.am][1] += co
+                # Add coeffs to co string, one line per contraction
+                for coeffs in bf.coeffs.T:
+                    co = f"c, {start_count}.{end_count}"
+                    co += (", {:9.7f}" * len(coeffs)).format(*coeffs)
+                    am_dict[bf.am][1] += co + "\n"
                 # start_count for next basis function
                 start_count = end_count + 1
 
@@ -300,6 +369,7 @@ class BasisSet:
         """Atoms is a dictionary of atom:Basis"""
         self.am = "spherical"
         self.name = name
+        self.shell_pool = None
         if atoms is None:
             self.atoms = OrderedDict()
         elif isinstance(atoms, OrderedDict):
@@ -431,7 +501,9 @@ class BasisSet:
                                 "Invalid CFour format: more than 6 contracted coefficients; proceed with caution."
                             )
 
-                        coeffs = np.from_iter((list(map(float, line.split())) for line in lines[con_start:con_end]), dtype=float).T
+                        coeffs = np.array(
+                            [list(map(float, line.split())) for line in lines[con_start:con_end]]
+                        ).T
                         if len(coeffs) != con_length:
                             if len(coeffs) > con_length and not coeffs[con_length:].any():
                                 coeffs = coeffs[:con_length]
@@ -551,48 +623,373 @@ class BasisSet:
 
         return bs
 
-    def decontracted(self):
+    def decontracted(self, rtol=None):
         """
         Generates a decontracted BasisSet. See BasisFunction.decontracted()
+        Exponents are deduplicated for every atom and angular momentum in a single pass over the
+        entire BasisSet, exponents that agree to within rtol (relative) are considered the same
+        If the BasisSet uses a ShellPool, the decontractions are looked up there instead, and
+        exponents are merged with the tolerance of the ShellPool
+        :param rtol: relative tolerance for exponents to be considered the same
+            (default: the rtol of the ShellPool, otherwise 1e-7)
         :return: BasisSet with all BasisFunctions decontracted (duplicates removed)
         """
-        atoms = OrderedDict()
+        if self.shell_pool is not None:
+            if rtol is not None and rtol != self.shell_pool.rtol:
+                raise ValueError(f'rtol={rtol} differs from the rtol of the ShellPool '
+                                 f'({self.shell_pool.rtol}), which is used for its decontractions')
+            atoms = OrderedDict()
+            for atom, basis in self.atoms.items():
+                atoms[atom] = basis.decontracted(self.shell_pool)
+            bs = BasisSet(atoms, self.name)
+            bs.am = self.am
+            bs.shell_pool = self.shell_pool
+            return bs
+        if rtol is None:
+            rtol = 1e-7
+
+        # Gather the exponents of every shell, splitting SP into S and P
+        atom_ids, ams, exps = [], [], []
+        for i, basis in enumerate(self):
+            for bf in basis:
+                for func_type in ("S", "P") if bf.func_type == "SP" else (bf.func_type,):
+                    atom_ids.append(np.full(len(bf), i))
+                    ams.append(np.full(len(bf), AM.index(func_type)))
+                    exps.append(bf.exps)
+
+        atoms = OrderedDict(
+            (atom, Basis(basis.atom, [], basis.name)) for atom, basis in self.atoms.items()
+        )
+        if exps:
+            atom_ids, ams, exps = map(np.concatenate, (atom_ids, ams, exps))
+            log_exps = np.log(exps)
+
+            # Sort by atom, am, and exponent; a new exponent starts wherever any of them change
+            order = np.lexsort((log_exps, ams, atom_ids))
+            s_atoms, s_ams, s_exps = atom_ids[order], ams[order], log_exps[order]
+            new = np.ones(len(order), dtype=bool)
+            new[1:] = (s_atoms[1:] != s_atoms[:-1]) | (s_ams[1:] != s_ams[:-1])
+            new[1:] |= np.diff(s_exps) > rtol
+
+            # Keep the first occurrence of each exponent, in the original order
+            firsts = np.sort(np.minimum.reduceat(order, np.flatnonzero(new)))
+
+            bases = list(atoms.values())
+            for i, am, exp in zip(atom_ids[firsts], ams[firsts], exps[firsts]):
+                bases[i].basis_functions.append(BasisFunction.primitive(AM[am], exp))
+
+        bs = BasisSet(atoms, self.name)
+        bs.am = self.am
+        return bs
+
+    def shell_stats(self):
+        """
+        Per-atom size statistics, counting cartesian or spherical functions according to self.am
+        :return: dictionary of atom: np.array([functions, primitives, shells])
+        """
+        cartesian = self.am == "cartesian"
+        stats = {}
         for atom, basis in self.atoms.items():
-            atoms[atom] = basis.decontracted()
+            stats[atom] = np.array(
+                [
+                    sum(bf.num_functions(cartesian) for bf in basis),
+                    sum(bf.num_primitives(cartesian) for bf in basis),
+                    len(basis),
+                ]
+            )
+        return stats
 
-        return BasisSet(atoms, self.name)
+    def interned(self, shell_pool=None):
+        """
+        Generates a BasisSet whose BasisFunctions are shared via a ShellPool
+        :param shell_pool: ShellPool to intern into (share one pool to deduplicate across BasisSets)
+        :return: BasisSet with interned BasisFunctions
+        """
+        if shell_pool is None:
+            shell_pool = ShellPool()
+        return shell_pool.intern_basis_set(self)
 
     def print(self, style="gaussian94"):
         """Print the Basis to a string"""
-        out = ""
-        if style == "bagel":
-            out += ",\n\n".join([basis.print("bagel").replace("\n", "\n    ") for basis in self])
-            return "{\n" + out + "\n}"
+        return "".join(self.print_chunks(style))
 
+    def print_chunks(self, style="gaussian94"):
+        """
+        Print the Basis one atom at a time
+        :yield: strings that join to form the output of BasisSet.print()
+        """
+        if style == "bagel":
+            yield "{\n"
+            for i, basis in enumerate(self):
+                if i:
+                    yield ",\n\n"
+                yield basis.print("bagel").replace("\n", "\n    ")
+            yield "\n}"
         elif style == "molpro":
-            out += "basis={\n!\n"
+            yield "basis={\n!\n"
             for basis in self:
-                out += basis.print("molpro")
-            out += "}"
-            return out
+                yield basis.print("molpro")
+            yield "}"
         elif style in ["gaussian94", "gamess", "cfour"]:
             if style == "gaussian94":
                 separator = "****\n"
-                out = separator
+                yield separator
             elif style in ["gamess", "cfour"]:
                 separator = "\n"
             # TODO: sort according to periodic table
-            out += separator.join([basis.print(style) for basis in self])
-            return out + separator
+            for i, basis in enumerate(self):
+                if i:
+                    yield separator
+                yield basis.print(style)
+            yield separator
         else:
             raise ValueError(f'Only [{", ".join(SUPPORTED)}] currently supported, got:{style}.')
 
+    def write(self, out_file, style="gaussian94", buffering=2**20):
+        """
+        Write the BasisSet to a file, streaming one atom at a time through a buffered writer
+        :param out_file: file to write to
+        :param style: style of basis set to write
+        :param buffering: size of the write buffer in bytes
+        """
+        if style not in SUPPORTED:
+            raise ValueError(f'Only [{", ".join(SUPPORTED)}] currently supported, got:{style}.')
+        with open(out_file, "w", buffering=buffering) as f:
+            f.writelines(self.print_chunks(style))
+
     def values(self):
         """Returns a list of list of np.array(exp, coeff)"""
         vals = [[con.values for con in basis] for basis in self]
         return vals
 
 
+class ShellPool:
+    """
+    Stores each unique BasisFunction once so that identical shells can be shared across atoms,
+    basis sets, and their decontractions
+    WARNING: interned BasisFunctions are shared, modifying one modifies it everywhere it is used
+    """
+
+    def __init__(self, rtol=1e-7, atol=1e-7):
+        """
+        :param rtol: relative tolerance for exponents to be considered the same
+        :param atol: absolute tolerance for coefficients to be considered the same
+        """
+        self.rtol = rtol
+        self.atol = atol
+        self.shells = {}
+        self._decontracted = {}
+        self.num_shells = 0
+        self.num_primitives = 0
+
+    def __len__(self):
+        """Return the number of unique BasisFunctions"""
+        return len(self.shells)
+
+    def __contains__(self, bf):
+        """Check if an equivalent BasisFunction has been interned"""
+        return self.key(bf) in self.shells
+
+    def __repr__(self):
+        return f"<ShellPool {len(self)}/{self.num_shells}>"
+
+    def key(self, bf):
+        """Canonical key of a BasisFunction"""
+        return bf.canonical_key(self.rtol, self.atol)
+
+    def _store(self, bf):
+        """Store the BasisFunction if not already present and return the stored one"""
+        return self.shells.setdefault(self.key(bf), bf)
+
+    def intern(self, bf):
+        """
+        Intern a BasisFunction
+        :return: the first interned BasisFunction equivalent to bf
+        """
+        self.num_shells += 1
+        self.num_primitives += len(bf)
+        return self._store(bf)
+
+    def intern_basis(self, basis):
+        """Generates a Basis with interned BasisFunctions"""
+        return Basis(basis.atom, [self.intern(bf) for bf in basis], basis.name)
+
+    def intern_basis_set(self, basis_set):
+        """Generates a BasisSet with interned BasisFunctions that uses this pool"""
+        atoms = OrderedDict(
+            (atom, self.intern_basis(basis)) for atom, basis in basis_set.atoms.items()
+        )
+        bs = BasisSet(atoms, basis_set.name)
+        bs.am = basis_set.am
+        bs.shell_pool = self
+        return bs
+
+    def decontracted(self, bf):
+        """
+        Look up the decontraction of a BasisFunction, decontracting it only on the first request
+        :return: list of interned single primitive BasisFunctions
+        """
+        key = self.key(bf)
+        if key not in self._decontracted:
+            self._decontracted[key] = [self._store(f) for f in bf.decontracted()]
+        return self._decontracted[key]
+
+    def stats(self):
+        """
+        Deduplication statistics, unique values include primitives generated by decontraction
+        :return: dictionary of statistics
+        """
+        unique_primitives = sum(len(bf) for bf in self.shells.values())
+        num_shells, num_primitives = self.num_shells, self.num_primitives
+        return {
+            "shells": self.num_shells,
+            "unique_shells": len(self.shells),
+            "primitives": self.num_primitives,
+            "unique_primitives": unique_primitives,
+            "shell_ratio": len(self.shells) / num_shells if num_shells else 1.0,
+            "primitive_ratio": unique_primitives / num_primitives if num_primitives else 1.0,
+        }
+
+
+class SizeEstimator:
+    """
+    Estimates the size of the basis of a molecule from precomputed per-atom statistics
+    Statistics are computed once per BasisSet, so each estimate only requires counting atoms
+    """
+
+    fields = ["functions", "primitives", "shells", "aux_functions"]
+
+    def __init__(self, basis_set, aux_basis_set=None):
+        """
+        :param basis_set: BasisSet for the calculation
+        :param aux_basis_set: auxiliary (e.g. RI) BasisSet for the calculation
+        """
+        self.basis_set = basis_set
+        self.aux_basis_set = aux_basis_set
+        stats = basis_set.shell_stats()
+        aux_stats = {} if aux_basis_set is None else aux_basis_set.shell_stats()
+        self.stats = {}
+        for atom, (functions, primitives, shells) in stats.items():
+            aux_functions = aux_stats[atom][0] if atom in aux_stats else 0
+            self.stats[atom] = np.array([functions, primitives, shells, aux_functions])
+        self._labels = {}
+
+    def __repr__(self):
+        return f"<SizeEstimator {self.basis_set.name}>"
+
+    def atom_stats(self, label):
+        """
+        Statistics for a single atom, looked up by its label (e.g. 'C', 'c', or 'Carbon')
+        :return: np.array([functions, primitives, shells, aux_functions])
+        """
+        if label not in self._labels:
+            atom = ensure_short_atom_name(label)
+            if atom not in self.stats:
+                raise KeyError(f"{atom} is not in the basis set {self.basis_set.name}.")
+            if self.aux_basis_set is not None and atom not in self.aux_basis_set:
+                raise KeyError(
+                    f"{atom} is not in the auxiliary basis set {self.aux_basis_set.name}."
+                )
+            self._labels[label] = self.stats[atom]
+        return self._labels[label]
+
+    def estimate_array(self, molecule):
+        """
+        Estimate the size of the basis for a molecule
+        :param molecule: Molecule or list of atom labels
+        :return: np.array([functions, primitives, shells, aux_functions])
+        """
+        atoms = molecule.atoms if hasattr(molecule, "atoms") else molecule
+        total = np.zeros(len(self.fields), dtype=int)
+        for label, count in Counter(atoms).items():
+            total += count * self.atom_stats(label)
+        return total
+
+    def estimate(self, molecule):
+        """
+        Estimate the size of the basis for a molecule
+        :param molecule: Molecule or list of atom labels
+        :return: dictionary of functions, primitives, shells, and aux_functions
+        """
+        return dict(zip(self.fields, map(int, self.estimate_array(molecule))))
+
+    def estimate_many(self, molecules):
+        """
+        Estimate the size of the basis for many molecules
+        :param molecules: iterable of Molecules or lists of atom labels
+        :return: np.array of shape (n_molecules, 4), columns are ordered as SizeEstimator.fields
+        """
+        sizes = [self.estimate_array(molecule) for molecule in molecules]
+        return np.array(sizes, dtype=int).reshape(-1, len(self.fields))
+
+
+def output_name(in_file, style):
+    """
+    Generate the name of a converted basis set file
+    :param in_file: name of the file being converted
+    :param style: style being converted to
+    :return: in_file with its extension replaced by that of the style
+    """
+    if style not in SUPPORTED:
+        raise ValueError(f'Only [{", ".join(SUPPORTED)}] currently supported, got:{style}.')
+    name = ".".join(in_file.split(".")[:-1]) or in_file
+    return f"{name}.{EXTENSIONS[style]}"
+
+
+def convert(in_file, out_styles="bagel", in_style="gaussian94", decontract=False, out_files=None):
+    """
+    Convert a basis set file to one or more styles, only reading the input once
+    :param in_file: basis set file to convert
+    :param out_styles: style or list of styles to convert to
+    :param in_style: style of the input file
+    :param decontract: decontract the basis set before writing
+    :param out_files: names of the output files (default: generated with output_name)
+    :return: list of the files written
+    """
+    if isinstance(out_styles, str):
+        out_styles = [out_styles]
+    if out_files is None:
+        out_files = [output_name(in_file, style) for style in out_styles]
+    elif isinstance(out_files, str):
+        out_files = [out_files]
+    if len(out_files) != len(out_styles):
+        raise ValueError(f"Expected {len(out_styles)} output files, got {len(out_files)}.")
+
+    bs = BasisSet.read_file(in_file, in_style)
+    if decontract:
+        bs = bs.decontracted()
+
+    for out_file, style in zip(out_files, out_styles):
+        bs.write(out_file, style)
+
+    return out_files
+
+
+def _convert_star(args):
+    """Unpack arguments for convert (Pool.imap cannot pass multiple arguments)"""
+    return convert(*args)
+
+
+def convert_many(in_files, out_styles="bagel", in_style="gaussian94", decontract=False, nprocs=1):
+    """
+    Convert many basis set files to one or more styles
+    :param in_files: basis set files to convert
+    :param out_styles: style or list of styles to convert to
+    :param in_style: style of the input files
+    :param decontract: decontract the basis sets before writing
+    :param nprocs: number of processes to convert with
+    :return: list of the files written
+    """
+    jobs = [(in_file, out_styles, in_style, decontract) for in_file in in_files]
+    if nprocs > 1 and len(jobs) > 1:
+        with Pool(min(nprocs, len(jobs))) as pool:
+            written = pool.map(_convert_star, jobs)
+    else:
+        written = map(_convert_star, jobs)
+
+    return [out_file for out_files in written for out_file in out_files]
+
+
 class ECPFunction:
     def __init__(self, shell, tmp1, tmp2, tmp3, lmax=None):
         """
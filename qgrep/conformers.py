@@ -0,0 +1,132 @@
+"""Read the final energies and geometries of many outputs and cluster them into conformers"""
+import json
+import os
+from glob import glob
+from multiprocessing import Pool
+
+import numpy as np
+from cclib.io import ccread
+from natsort import natsorted
+
+from .atom import numbers_atomic
+from .helper import energy_conversions
+from .rmsd import centered, reorder, rmsd
+
+EV_TO_HARTREE = 1 / energy_conversions['hartree']['eV']
+
+
+def find_outputs(paths, pattern='output.dat'):
+    """
+    Find all outputs in directory trees
+    :param paths: files and directories to search
+    :param pattern: glob for the output files within the directories
+    :return: naturally sorted list of files
+    """
+    files = set()
+    for path in paths:
+        if os.path.isfile(path):
+            files.add(path)
+        else:
+            files |= {f for f in glob(f'{path}/**/{pattern}', recursive=True) if os.path.isfile(f)}
+    return natsorted(files)
+
+
+def read_conformer(file):
+    """
+    Read the final energy and geometry of an output
+    :return: energy (hartree), atoms, xyz (n_atoms, 3); or None if the file cannot be read
+    """
+    try:
+        data = ccread(file)
+        energy = data.scfenergies[-1] * EV_TO_HARTREE
+        atoms = [numbers_atomic[int(z)] for z in data.atomnos]
+        return energy, atoms, data.atomcoords[-1].tolist()
+    except Exception:
+        # Unreadable or incomplete outputs
+        return None
+
+
+def read_conformers(files, nprocs=1, cache_file=None):
+    """
+    Read the final energy and geometry of many outputs in parallel
+    Results are cached by file name, size, and modification time, so only new or changed files
+    are read again
+    :param files: outputs to read
+    :param nprocs: number of processes to use
+    :param cache_file: JSON file to cache the results in
+    :return: dictionary of file: (energy, atoms, xyz), skipping files that could not be read
+    """
+    cache = {}
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file) as f:
+            cache = json.load(f)
+
+    def key(file):
+        stat = os.stat(file)
+        return f'{os.path.abspath(file)}:{stat.st_size}:{stat.st_mtime_ns}'
+
+    keys = {file: key(file) for file in files}
+    todo = [file for file in files if keys[file] not in cache]
+    if nprocs > 1 and len(todo) > 1:
+        with Pool(min(nprocs, len(todo))) as pool:
+            results = pool.map(read_conformer, todo, chunksize=max(1, len(todo) // (4 * nprocs)))
+    else:
+        results = map(read_conformer, todo)
+    for file, result in zip(todo, results):
+        cache[keys[file]] = result
+
+    if cache_file and todo:
+        with open(cache_file, 'w') as f:
+            json.dump(cache, f)
+
+    return {file: tuple(cache[keys[file]]) for file in files if cache[keys[file]] is not None}
+
+
+def cluster(energies, atoms, frames, energy_window=1.0, threshold=0.125, reorder_atoms=False):
+    """
+    Cluster conformers into unique geometries
+    Conformers are visited from lowest to highest energy, and join the cluster of the first
+    representative (lowest energy member) within the RMSD threshold. Only representatives with
+    the same atoms and within the energy window are compared, avoiding O(n^2) comparisons.
+    :param energies: energies (hartree)
+    :param atoms: list of the atoms of each conformer
+    :param frames: list of the coordinates of each conformer (n_atoms, 3)
+    :param energy_window: maximum energy difference (kcal/mol) of equivalent conformers
+    :param threshold: maximum RMSD (Angstrom) of equivalent conformers (after alignment)
+    :param reorder_atoms: map atoms of the same element onto each other (symmetry-aware RMSD)
+    :return: list of clusters (lists of indices, starting with the representative),
+        sorted by the energy of the representative
+    """
+    energies = np.asarray(energies, dtype=float)
+    window = energy_window * energy_conversions['kcal/mol']['hartree']
+    # Representatives of each composition (or atom ordering), in increasing energy
+    reps = {}
+    clusters = {}
+    for i in np.argsort(energies, kind='stable').tolist():
+        key = tuple(sorted(atoms[i])) if reorder_atoms else tuple(atoms[i])
+        rep_ids, rep_energies, rep_frames = reps.setdefault(key, ([], [], []))
+        xyz = centered(frames[i])
+        start = np.searchsorted(rep_energies, energies[i] - window)
+        match = None
+        if start < len(rep_ids):
+            if reorder_atoms:
+                for j in range(start, len(rep_ids)):
+                    rep = rep_ids[j]
+                    order = reorder(atoms[rep], rep_frames[j], atoms[i], xyz)
+                    if rmsd(rep_frames[j], xyz[order]) <= threshold:
+                        match = rep
+                        break
+            else:
+                values = rmsd(np.array(rep_frames[start:]), xyz)
+                close = np.flatnonzero(values <= threshold)
+                if len(close):
+                    match = rep_ids[start + close[0]]
+        if match is None:
+            rep_ids.append(i)
+            rep_energies.append(energies[i])
+            rep_frames.append(xyz)
+            clusters[i] = [i]
+        else:
+            clusters[match].append(i)
+
+    return list(clusters.values())
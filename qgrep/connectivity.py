@@ -0,0 +1,291 @@
+"""Pairwise distances and bond perception"""
+from collections import deque
+from itertools import product
+
+import numpy as np
+
+from .atom import atomic_numbers, covalent_radii
+
+
+def distance_matrix(xyz):
+    """
+    Generates the matrix of all pairwise distances
+    WARNING: O(n^2) memory, use neighbor_pairs for large systems
+    :param xyz: coordinates (n_atoms, 3)
+    :return: distances (n_atoms, n_atoms)
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    return np.linalg.norm(xyz[:, np.newaxis] - xyz[np.newaxis], axis=-1)
+
+
+def neighbor_pairs(xyz, cutoff):
+    """
+    Find all pairs of atoms closer than the cutoff using a cell list
+    Atoms are binned into cubic cells with sides of length cutoff, so only atoms in the same or
+    adjacent cells need to be compared, making the search O(n) for molecules of normal density
+    :param xyz: coordinates (n_atoms, 3)
+    :param cutoff: maximum distance between atoms in a pair
+    :return: pairs (n_pairs, 2) with i < j, distances (n_pairs)
+    """
+    xyz = np.asarray(xyz, dtype=float).reshape(-1, 3)
+    n = len(xyz)
+    if n < 2 or cutoff <= 0:
+        return np.zeros((0, 2), dtype=int), np.zeros(0)
+
+    # Pad the cells by one on each side so that neighboring cells never wrap around
+    cells = np.floor((xyz - xyz.min(axis=0)) / cutoff).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    pairs = []
+    # Only half of the neighboring cells are needed as each pair of cells is visited once
+    for offset in product((-1, 0, 1), repeat=3):
+        if offset < (0, 0, 0):
+            continue
+        dx, dy, dz = offset
+        neighbor_keys = keys + (dx * dims[1] + dy) * dims[2] + dz
+        starts = np.searchsorted(sorted_keys, neighbor_keys, side='left')
+        counts = np.searchsorted(sorted_keys, neighbor_keys, side='right') - starts
+        # Every atom paired with every atom in the neighboring cell
+        i = np.repeat(np.arange(n), counts)
+        positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - starts, counts)
+        j = order[positions]
+        if offset == (0, 0, 0):
+            keep = i < j
+            i, j = i[keep], j[keep]
+        pairs.append(np.column_stack((np.minimum(i, j), np.maximum(i, j))))
+
+    pairs = np.concatenate(pairs)
+    distances = np.linalg.norm(xyz[pairs[:, 0]] - xyz[pairs[:, 1]], axis=1)
+    close = distances < cutoff
+    pairs, distances = pairs[close], distances[close]
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    return pairs[order], distances[order]
+
+
+def bridges(connectivity):
+    """
+    Find the bonds that are not in any ring (Tarjan's algorithm, iterative)
+    :return: set of bonded pairs (i, j) with i < j
+    """
+    neighbors = connectivity.neighbor_lists()
+    n = len(neighbors)
+    disc, low = [-1] * n, [0] * n
+    found = set()
+    time = 0
+    for root in range(n):
+        if disc[root] != -1:
+            continue
+        disc[root] = low[root] = time
+        time += 1
+        stack = [(root, -1, iter(neighbors[root]))]
+        while stack:
+            u, parent, it = stack[-1]
+            for w in it:
+                if w == parent:
+                    continue
+                if disc[w] == -1:
+                    disc[w] = low[w] = time
+                    time += 1
+                    stack.append((w, u, iter(neighbors[w])))
+                    break
+                low[u] = min(low[u], disc[w])
+            else:
+                stack.pop()
+                if stack:
+                    p = stack[-1][0]
+                    low[p] = min(low[p], low[u])
+                    if low[u] > disc[p]:
+                        found.add((min(p, u), max(p, u)))
+    return found
+
+
+def _shortest_path(neighbors, start, end, avoid):
+    """
+    Breadth first search for the shortest path between two atoms that does not visit avoid
+    :return: list of atoms from start to end, or None if there is no path
+    """
+    parents = {start: None, avoid: None}
+    queue = deque([start])
+    while queue:
+        a = queue.popleft()
+        for b in neighbors[a]:
+            if b in parents:
+                continue
+            parents[b] = a
+            if b == end:
+                path = [b]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                return path[::-1]
+            queue.append(b)
+    return None
+
+
+def find_rings(connectivity):
+    """
+    Find the smallest set of smallest rings (SSSR)
+    Candidates are the smallest ring through each pair of adjacent bonds (skipping bridges),
+    which are then added from smallest to largest if linearly independent (over GF(2)) of the
+    rings already added, until the number of rings equals the cyclomatic number
+    :return: list of rings, each a list of atoms in order around the ring
+    """
+    pairs = [tuple(pair) for pair in connectivity.pairs.tolist()]
+    bond_ids = {pair: k for k, pair in enumerate(pairs)}
+    n_rings = len(pairs) - connectivity.n_atoms + connectivity.n_components()
+    if n_rings == 0:
+        return []
+
+    neighbors = connectivity.neighbor_lists()
+    chain_bonds = bridges(connectivity)
+    candidates = {}
+    for u, us in enumerate(neighbors):
+        ring_neighbors = [a for a in us if (min(a, u), max(a, u)) not in chain_bonds]
+        for k, a in enumerate(ring_neighbors):
+            for b in ring_neighbors[k + 1:]:
+                path = _shortest_path(neighbors, a, b, u)
+                if path is None:
+                    continue
+                ring = [u] + path
+                edges = 0
+                for x, y in zip(ring, ring[1:] + ring[:1]):
+                    edges |= 1 << bond_ids[(min(x, y), max(x, y))]
+                candidates.setdefault(edges, ring)
+
+    # Gaussian elimination over GF(2), keyed by the highest set bit of each basis vector
+    basis = {}
+    rings = []
+    for edges, ring in sorted(candidates.items(), key=lambda item: len(item[1])):
+        while edges and edges.bit_length() in basis:
+            edges ^= basis[edges.bit_length()]
+        if edges:
+            basis[edges.bit_length()] = edges
+            rings.append(ring)
+            if len(rings) == n_rings:
+                break
+    return rings
+
+
+def ring_centers_normals(xyz, rings):
+    """
+    Find the center and normal vector of each ring
+    Rings of the same size are handled together, fitting a plane to each ring with a batched SVD
+    The normal of each ring is oriented so that its largest component is negative
+    :param xyz: coordinates (..., n_atoms, 3), e.g. (n_frames, n_atoms, 3) for many frames
+    :param rings: list of rings, each a list of atoms
+    :return: centers (..., n_rings, 3), normals (..., n_rings, 3)
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    centers = np.zeros(xyz.shape[:-2] + (len(rings), 3))
+    normals = np.zeros(xyz.shape[:-2] + (len(rings), 3))
+    sizes = np.array([len(ring) for ring in rings])
+    for size in np.unique(sizes):
+        idxs = np.flatnonzero(sizes == size)
+        coords = xyz[..., np.array([rings[i] for i in idxs]), :]
+        centers[..., idxs, :] = coords.mean(axis=-2)
+        # The normal is the direction of least variance
+        vh = np.linalg.svd(coords - centers[..., idxs, np.newaxis, :])[2]
+        normals[..., idxs, :] = vh[..., -1, :]
+
+    largest = np.take_along_axis(normals, np.abs(normals).argmax(axis=-1)[..., np.newaxis], axis=-1)
+    normals *= np.where(largest > 0, -1, 1)
+    return centers, normals
+
+
+def perceive_bonds(atoms, xyz, tolerance=0.45):
+    """
+    Find bonds, atoms are bonded if closer than the sum of their covalent radii plus the tolerance
+    :param atoms: list of atom names
+    :param xyz: coordinates (n_atoms, 3)
+    :param tolerance: distance (Angstrom) beyond the sum of the covalent radii to allow
+    :return: Connectivity
+    """
+    radii = np.array([covalent_radii[atomic_numbers[atom]] for atom in atoms])
+    if len(radii) < 2:
+        return Connectivity(len(radii), np.zeros((0, 2), dtype=int))
+    pairs, distances = neighbor_pairs(xyz, 2 * radii.max() + tolerance)
+    bonded = distances < radii[pairs[:, 0]] + radii[pairs[:, 1]] + tolerance
+    return Connectivity(len(radii), pairs[bonded], distances[bonded])
+
+
+class Connectivity:
+    def __init__(self, n_atoms, pairs, lengths=None):
+        """ Sparse adjacency of the atoms in a molecule, stored in compressed sparse row form
+
+        :param n_atoms: number of atoms
+        :param pairs: bonded pairs of atoms (n_bonds, 2)
+        :param lengths: length of each bond
+        """
+        self.n_atoms = n_atoms
+        self.pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+        self.lengths = lengths
+        # Store each bond in both directions, sorted by the first atom
+        both = np.concatenate((self.pairs, self.pairs[:, ::-1]))
+        order = np.lexsort((both[:, 1], both[:, 0]))
+        self.indices = both[order, 1]
+        self.indptr = np.zeros(n_atoms + 1, dtype=int)
+        np.cumsum(np.bincount(both[:, 0], minlength=n_atoms), out=self.indptr[1:])
+
+    def __len__(self):
+        """Return the number of bonds"""
+        return len(self.pairs)
+
+    def __repr__(self):
+        return f'<Connectivity {self.n_atoms} atoms {len(self)} bonds>'
+
+    def __iter__(self):
+        """Iterate over the bonded pairs"""
+        for i, j in self.pairs:
+            yield int(i), int(j)
+
+    def __contains__(self, pair):
+        """Check if the pair of atoms is bonded"""
+        i, j = pair
+        return j in self.neighbors(i)
+
+    def neighbors(self, i):
+        """Returns the atoms bonded to atom i"""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def rings(self):
+        """
+        The smallest set of smallest rings (see find_rings), cached after the first call
+        :return: list of rings, each a list of atoms in order around the ring
+        """
+        if getattr(self, '_rings', None) is None:
+            self._rings = find_rings(self)
+        return self._rings
+
+    def neighbor_lists(self):
+        """Returns a list of the atoms bonded to each atom"""
+        indices, indptr = self.indices.tolist(), self.indptr.tolist()
+        return [indices[indptr[i]:indptr[i + 1]] for i in range(self.n_atoms)]
+
+    def n_components(self):
+        """Number of connected components (unbonded atoms are their own component)"""
+        # Union find with path halving
+        parents = list(range(self.n_atoms))
+
+        def find(i):
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        for i, j in self:
+            parents[find(i)] = find(j)
+        return sum(1 for i in range(self.n_atoms) if find(i) == i)
+
+    @property
+    def degrees(self):
+        """Number of bonds to each atom"""
+        return np.diff(self.indptr)
+
+    def to_dense(self):
+        """Returns a dense boolean adjacency matrix"""
+        adjacency = np.zeros((self.n_atoms, self.n_atoms), dtype=bool)
+        adjacency[self.pairs[:, 0], self.pairs[:, 1]] = True
+        adjacency[self.pairs[:, 1], self.pairs[:, 0]] = True
+        return adjacency
@@ -115,84 +115,27 @@ class CoordinateConverter:
 
         return self.cartesian
 
-    def add_first_three_to_cartesian(self):
+    def zmatrix_arrays(self):
         """
-        The first three atoms in the zmatrix need to be treated differently
+        Convert the zmatrix to arrays of reference atoms and values
+        :return: refs (n_atoms, 3), values (n_atoms, 3) of distances, angles, and dihedrals
         """
-        # First atom
-        name, coords, mass = self.zmatrix[0]
-        self.cartesian = [[name, np.array([0, 0, 0]), mass]]
-
-        # Second atom
-        name, coords, mass = self.zmatrix[1]
-        distance = coords[0][1]
-        self.cartesian.append(
-            [name, np.array([distance, 0, 0]), masses[name]])
-
-        # Third atom
-        name, coords, mass = self.zmatrix[2]
-        atom1, atom2 = coords[:2]
-        atom1, distance = atom1
-        atom2, angle = atom2
-        q = np.array(self.cartesian[atom1][1])  # position of atom 1
-        r = np.array(self.cartesian[atom2][1])  # position of atom 2
-
-        # Vector pointing from q to r
-        a = r - q
-
-        # Vector of length distance pointing along the x-axis
-        d = distance * a / np.sqrt(np.dot(a, a))
-
-        # Rotate d by the angle around the z-axis
-        d = np.dot(rotation_matrix([0, 0, 1], angle), d)
-
-        # Add d to the position of q to get the new coordinates of the atom
-        p = q + d
-        atom = [name, p, masses[name]]
-        self.cartesian.append(atom)
-
-    def add_atom_to_cartesian(self, coords):
-        """Find the Cartesian coordinates of the atom"""
-        name, coords, mass = coords
-        atom1, distance = coords[0]
-        atom2, angle = coords[1]
-        atom3, dihedral = coords[2]
-
-        q = self.cartesian[atom1][1]  # atom 1
-        r = self.cartesian[atom2][1]  # atom 2
-        s = self.cartesian[atom3][1]  # atom 3
-
-        # Vector pointing from q to r
-        a = r - q
-        # Vector pointing from s to r
-        b = r - s
-
-        # Vector of length distance pointing from q to r
-        d = distance * a / np.sqrt(np.dot(a, a))
-
-        # Vector normal to plane defined by q,r,s
-        normal = np.cross(a, b)
-        # Rotate d by the angle around the normal to the plane defined by q,r,s
-        d = np.dot(rotation_matrix(normal, angle), d)
-
-        # Rotate d around a by the dihedral
-        d = np.dot(rotation_matrix(a, dihedral), d)
-
-        # Add d to the position of q to get the new coordinates of the atom
-        p = q + d
-        atom = [name, p, mass]
-
-        self.cartesian.append(atom)
+        refs = np.full((len(self.zmatrix), 3), -1)
+        values = np.zeros((len(self.zmatrix), 3))
+        for i, (name, coords, mass) in enumerate(self.zmatrix):
+            for j, coord in enumerate(coords):
+                if coord:
+                    refs[i, j], values[i, j] = coord
+        return refs, values
 
     def zmatrix_to_cartesian(self):
         """
         Convert the zmartix to Cartesian coordinates
         """
-        # Deal with first three line separately
-        self.add_first_three_to_cartesian()
-
-        for i in range(3, len(self.zmatrix)):
-            self.add_atom_to_cartesian(self.zmatrix[i])
+        refs, values = self.zmatrix_arrays()
+        xyz = zmatrix_to_xyz(refs, values)
+        self.cartesian = [[name, position, mass]
+                          for (name, coords, mass), position in zip(self.zmatrix, xyz)]
 
         self.remove_dummy_atoms()
 
@@ -200,77 +143,21 @@ class CoordinateConverter:
 
         return self.cartesian
 
-    def add_first_three_to_zmatrix(self):
-        """
-        The first three atoms need to be treated differently
-        """
-        # First atom
-        self.zmatrix = []
-        name, position, mass = self.cartesian[0]
-        self.zmatrix.append([name, [[], [], []], mass])
-
-        # Second atom
-        name, position, mass = self.cartesian[1]
-        atom1 = self.cartesian[0]
-        pos1 = atom1[1]
-        q = pos1 - position
-        distance = m.sqrt(np.dot(q, q))
-        self.zmatrix.append([name, [[0, distance], [], []], mass])
-
-        # Third atom
-        name, position, mass = self.cartesian[2]
-        atom1, atom2 = self.cartesian[:2]
-        pos1, pos2 = atom1[1], atom2[1]
-        q = pos1 - position
-        r = pos2 - pos1
-        q_u = q / np.sqrt(np.dot(q, q))
-        r_u = r / np.sqrt(np.dot(r, r))
-        distance = np.sqrt(np.dot(q, q))
-        # Angle between a and b = acos(dot product of the unit vectors)
-        angle = m.acos(np.dot(-q_u, r_u))
-        self.zmatrix.append(
-            [name, [[0, distance], [1, np.degrees(angle)], []], mass])
-
-    def add_atom_to_zmatrix(self, i, line):
+    def cartesian_to_zmatrix(self):
         """
-        Generates an atom for the zmatrix
-        (assumes that three previous atoms have been placed in the Cartesian
-        coordinates)
+        Convert the Cartesian coordinates to a zmatrix
+        Every atom is defined relative to the first three atoms
         """
-        name, position, mass = line
-        atom1, atom2, atom3 = self.cartesian[:3]
-        pos1, pos2, pos3 = atom1[1], atom2[1], atom3[1]
-        # Create vectors pointing from one atom to the next
-        q = pos1 - position
-        r = pos2 - pos1
-        s = pos3 - pos2
-        # Create unit vectors
-        q_u = q / np.sqrt(np.dot(q, q))
-        r_u = r / np.sqrt(np.dot(r, r))
-        distance = np.sqrt(np.dot(q, q))
-        # Angle between a and b = acos(dot(a, b) / (|a| |b|))
-        angle = m.acos(np.dot(-q_u, r_u))
-        # Dihedral angle = acos(dot(normal_vec1, normal_vec2) /
-        # (|normal_vec1| |normal_vec2|))
-        plane1 = np.cross(q, r)
-        plane2 = np.cross(r, s)
-        dihedral = m.acos(np.dot(plane1, plane2) / (
-            np.sqrt(np.dot(plane1, plane1)) * np.sqrt(np.dot(plane2, plane2))))
-        # Convert to signed dihedral angle
-        if np.dot(np.cross(plane1, plane2), r_u) < 0:
-            dihedral = -dihedral
-
-        coords = [[0, distance], [1, np.degrees(angle)],
-                  [2, np.degrees(dihedral)]]
-        atom = [name, coords, mass]
-        self.zmatrix.append(atom)
+        n_atoms = len(self.cartesian)
+        refs = np.tile([0, 1, 2], (n_atoms, 1))
+        xyz = np.array([position for name, position, mass in self.cartesian]).reshape(-1, 3)
+        values = xyz_to_zmatrix(xyz, refs)
+        values[:, 1:] = np.degrees(values[:, 1:])
 
-    def cartesian_to_zmatrix(self):
-        """Convert the Cartesian coordinates to a zmatrix"""
-        self.add_first_three_to_zmatrix()
-        for i in range(3, len(self.cartesian)):
-            line = self.cartesian[i]
-            self.add_atom_to_zmatrix(i, line)
+        self.zmatrix = []
+        for i, ((name, position, mass), row) in enumerate(zip(self.cartesian, values.tolist())):
+            coords = [[j, value] if j < i else [] for j, value in enumerate(row)]
+            self.zmatrix.append([name, coords, mass])
 
         return self.zmatrix
 
@@ -287,17 +174,14 @@ class CoordinateConverter:
 
     def center_cartesian(self):
         """Find the center of mass and move it to the origin"""
-        self.total_mass = 0.0
-        center_of_mass = np.array([0.0, 0.0, 0.0])
-        for atom in self.cartesian:
-            mass = atom[2]
-            self.total_mass += mass
-            center_of_mass += atom[1] * mass
-        center_of_mass /= float(self.total_mass)
+        mass = np.array([atom[2] for atom in self.cartesian], dtype=float)
+        xyz = np.array([atom[1] for atom in self.cartesian], dtype=float).reshape(-1, 3)
+        self.total_mass = mass.sum()
+        xyz -= mass @ xyz / self.total_mass
 
         # Translate each atom by the center of mass
-        for atom in self.cartesian:
-            atom[1] = atom[1] - center_of_mass
+        for atom, position in zip(self.cartesian, xyz):
+            atom[1] = position
 
     def cartesian_radians_to_degrees(self):
         for atom in self.cartesian:
@@ -363,6 +247,113 @@ class CoordinateConverter:
         return 0
 
 
+def distances(xyz, pairs):
+    """
+    Distances between pairs of atoms
+    :param xyz: coordinates (..., n_atoms, 3), e.g. (n_frames, n_atoms, 3) for many frames
+    :param pairs: atoms in each distance (n, 2)
+    :return: distances (..., n)
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+    return np.linalg.norm(xyz[..., pairs[:, 0], :] - xyz[..., pairs[:, 1], :], axis=-1)
+
+
+def angles(xyz, triples):
+    """
+    Angles (radians) between triples of atoms, with the vertex at the middle atom
+    :param xyz: coordinates (..., n_atoms, 3), e.g. (n_frames, n_atoms, 3) for many frames
+    :param triples: atoms in each angle (n, 3)
+    :return: angles (..., n)
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    triples = np.asarray(triples, dtype=int).reshape(-1, 3)
+    a = xyz[..., triples[:, 0], :] - xyz[..., triples[:, 1], :]
+    b = xyz[..., triples[:, 2], :] - xyz[..., triples[:, 1], :]
+    # atan2 is accurate for angles near 0 and 180 (unlike acos)
+    return np.arctan2(np.linalg.norm(np.cross(a, b), axis=-1), (a * b).sum(axis=-1))
+
+
+def dihedrals(xyz, quads):
+    """
+    Signed dihedral angles (radians, -pi to pi) between quadruples of atoms
+    :param xyz: coordinates (..., n_atoms, 3), e.g. (n_frames, n_atoms, 3) for many frames
+    :param quads: atoms in each dihedral (n, 4)
+    :return: dihedrals (..., n)
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    quads = np.asarray(quads, dtype=int).reshape(-1, 4)
+    b1 = xyz[..., quads[:, 1], :] - xyz[..., quads[:, 0], :]
+    b2 = xyz[..., quads[:, 2], :] - xyz[..., quads[:, 1], :]
+    b3 = xyz[..., quads[:, 3], :] - xyz[..., quads[:, 2], :]
+    n1 = np.cross(b1, b2)
+    n2 = np.cross(b2, b3)
+    y = np.linalg.norm(b2, axis=-1) * (b1 * n2).sum(axis=-1)
+    return np.arctan2(y, (n1 * n2).sum(axis=-1))
+
+
+def xyz_to_zmatrix(xyz, refs):
+    """
+    Find the internal coordinates of every atom relative to its reference atoms
+    :param xyz: coordinates (..., n_atoms, 3), e.g. (n_frames, n_atoms, 3) for many frames
+    :param refs: reference atoms (n_atoms, 3) for the distance, angle, and dihedral of each atom,
+        only the first i references are used for the first three atoms
+    :return: distances, angles, and dihedrals (radians) (..., n_atoms, 3), zero if undefined
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    refs = np.asarray(refs, dtype=int)
+    n_atoms = len(refs)
+    atoms = np.arange(n_atoms)
+    values = np.zeros(xyz.shape[:-2] + (n_atoms, 3))
+    values[..., 1:, 0] = distances(xyz, np.column_stack((atoms, refs[:, 0]))[1:])
+    values[..., 2:, 1] = angles(xyz, np.column_stack((atoms, refs[:, :2]))[2:])
+    values[..., 3:, 2] = dihedrals(xyz, np.column_stack((atoms, refs))[3:])
+    return values
+
+
+def zmatrix_to_xyz(refs, values):
+    """
+    Place the atoms of a zmatrix with the Natural Extension Reference Frame (NeRF) method
+    The first atom is at the origin, the second along the x-axis, and the third in the xy-plane
+    Atoms are placed one after another (as each depends on those before it), but all frames
+    are placed at once
+    :param refs: reference atoms (n_atoms, 3) for the distance, angle, and dihedral of each atom,
+        only the first i references are used for the first three atoms
+    :param values: distances, angles, and dihedrals (radians) (..., n_atoms, 3),
+        e.g. (n_frames, n_atoms, 3) for many frames
+    :return: coordinates (..., n_atoms, 3)
+    """
+    refs = np.asarray(refs, dtype=int)
+    values = np.asarray(values, dtype=float)
+    n_atoms = values.shape[-2]
+    xyz = np.zeros(values.shape)
+    distance, angle, dihedral = np.moveaxis(values, -1, 0)
+    if n_atoms > 1:
+        xyz[..., 1, 0] = distance[..., 1]
+    if n_atoms > 2:
+        # Rotate the bond to the first reference by the angle (clockwise) about the z-axis
+        start = xyz[..., refs[2, 0], 0]
+        direction = np.sign(xyz[..., refs[2, 1], 0] - start)
+        xyz[..., 2, 0] = start + direction * distance[..., 2] * np.cos(angle[..., 2])
+        xyz[..., 2, 1] = -direction * distance[..., 2] * np.sin(angle[..., 2])
+
+    # Position of each atom in the frame of its reference atoms, computed for all atoms at once
+    local = np.stack((-np.cos(angle),
+                      np.sin(angle) * np.cos(dihedral),
+                      np.sin(angle) * np.sin(dihedral)), axis=-1) * distance[..., np.newaxis]
+    local = np.moveaxis(local, -2, 0)
+    for i in range(3, n_atoms):
+        a, b, c = xyz[..., refs[i, 0], :], xyz[..., refs[i, 1], :], xyz[..., refs[i, 2], :]
+        bc = a - b
+        bc /= np.linalg.norm(bc, axis=-1, keepdims=True)
+        normal = np.cross(b - c, bc)
+        normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+        x, y, z = np.moveaxis(local[i], -1, 0)
+        xyz[..., i, :] = a + x[..., np.newaxis] * bc + y[..., np.newaxis] * np.cross(normal, bc) \
+            + z[..., np.newaxis] * normal
+    return xyz
+
+
 def rotation_matrix(axis, angle):
     """Euler-Rodrigues formula for rotation matrix"""
     # Normalize the axis
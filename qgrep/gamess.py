@@ -4,6 +4,7 @@ import re
 from .atom import Atom
 from .basis import BasisSet
 from .molecule import Molecule
+from .trajectory import Trajectory
 from collections import OrderedDict
 
 
@@ -55,32 +56,43 @@ def get_geom(lines, geom_type='xyz', units='angstrom'):
     return geom
 
 
-def plot(lines, geom_type='xyz'):
-    """Plots the geometries from the optimization steps"""
+def geom_blocks(lines):
+    """Returns the lines of the geometry of each optimization step"""
     start = ' COORDINATES OF ALL ATOMS ARE (ANGS)\n'
     end = '\n'
-    geoms = []
+    blocks = []
     i = 0
-    step = 0
     while i < len(lines):
         if lines[i] == start:
             i += 3
             start_num = i
             while lines[i] != end:
                 i += 1
-            end_num = i
-            geom = f'{end_num - start_num}\nStep {step}\n'
-            for line in lines[start_num:end_num]:
-                atom, num, x, y, z = line.split()
-                geom += '\t'.join([atom, x, y, z]) + '\n'
-
-            geoms.append(geom)
-            step += 1
+            blocks.append(lines[start_num:i])
         i += 1
 
+    return blocks
+
+
+def plot(lines, geom_type='xyz'):
+    """Plots the geometries from the optimization steps"""
+    geoms = []
+    for step, block in enumerate(geom_blocks(lines)):
+        geom = f'{len(block)}\nStep {step}\n'
+        for line in block:
+            atom, num, x, y, z = line.split()
+            geom += '\t'.join([atom, x, y, z]) + '\n'
+
+        geoms.append(geom)
+
     return geoms
 
 
+def get_trajectory(lines):
+    """Returns a Trajectory of the geometries from the optimization steps"""
+    return Trajectory.from_blocks(geom_blocks(lines), xyz_cols=(2, 3, 4))
+
+
 def get_energy(lines, energy_type='sp'):
     """Returns the energy"""
     energy = 0
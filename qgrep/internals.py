@@ -0,0 +1,111 @@
+"""Internal coordinates (bonds, angles, and dihedrals) evaluated for many geometries at once"""
+import re
+
+import numpy as np
+
+from .coordinate_converter import angles, dihedrals, distances
+from .molecule import Molecule
+from .trajectory import Trajectory
+
+# Number of atoms in each type of internal coordinate, linear bends (L) use the first three
+KINDS = {'B': 2, 'A': 3, 'L': 4, 'D': 4}
+KIND_BY_SIZE = {2: 'B', 3: 'A', 4: 'D'}
+
+
+def parse_definition(definition):
+    """
+    Parse the definition of an internal coordinate
+    :param definition: string such as B(O 1,C 0), A(H 1,O 0,H 2), L(C 1,C 2,N 3,C 4, 2), or
+        D(C 2,O 1,C 0,C 4) (ORCA style, atom names are optional), or a tuple of 2-4 atoms
+    :return: kind, tuple of atoms (0-indexed)
+    """
+    if not isinstance(definition, str):
+        atoms = tuple(int(atom) for atom in definition)
+        if len(atoms) not in KIND_BY_SIZE:
+            raise ValueError(f'Internal coordinates must have 2-4 atoms, got: {definition}')
+        return KIND_BY_SIZE[len(atoms)], atoms
+
+    match = re.fullmatch(r'\s*([BALD])\(([^)]*)\)\s*', definition)
+    if match is None:
+        raise SyntaxError(f'Invalid internal coordinate definition: {definition}')
+    kind, fields = match.groups()
+    atoms = tuple(int(field.split()[-1]) for field in fields.split(','))[:KINDS[kind]]
+    if len(atoms) != KINDS[kind]:
+        raise SyntaxError(f'Expected {KINDS[kind]} atoms for {kind}, got: {definition}')
+    return kind, atoms
+
+
+class InternalCoordinates:
+    def __init__(self, definitions):
+        """ A set of internal coordinates, evaluated together for any number of geometries
+
+        :param definitions: list of definitions (see parse_definition)
+        """
+        self.definitions = [parse_definition(definition) for definition in definitions]
+        # Coordinates of each kind are gathered into arrays so they are evaluated together
+        self.groups = {}
+        for kind in KINDS:
+            positions = [i for i, (k, atoms) in enumerate(self.definitions) if k == kind]
+            if positions:
+                atoms = np.array([self.definitions[i][1] for i in positions], dtype=int)
+                self.groups[kind] = (np.array(positions), atoms)
+
+    def __len__(self):
+        """Return the number of internal coordinates"""
+        return len(self.definitions)
+
+    def __repr__(self):
+        return f'<InternalCoordinates {len(self)}>'
+
+    def __iter__(self):
+        """Iterate over the (kind, atoms) of each internal coordinate"""
+        yield from self.definitions
+
+    def labels(self):
+        """Returns a label for each internal coordinate, e.g. B(1,0)"""
+        return [f'{kind}({",".join(map(str, atoms))})' for kind, atoms in self.definitions]
+
+    def evaluate(self, xyz, degrees=True):
+        """
+        Evaluate all internal coordinates for every geometry
+        :param xyz: Molecule, Trajectory, or coordinates (..., n_atoms, 3)
+        :param degrees: return angles in degrees (otherwise radians)
+        :return: values (..., n_internals), distances in the units of xyz
+        """
+        if isinstance(xyz, Trajectory):
+            xyz = xyz.frames
+        elif isinstance(xyz, Molecule):
+            xyz = xyz.xyz
+        xyz = np.asarray(xyz, dtype=float)
+        values = np.empty(xyz.shape[:-2] + (len(self),))
+        for kind, (positions, atoms) in self.groups.items():
+            if kind == 'B':
+                values[..., positions] = distances(xyz, atoms)
+                continue
+            elif kind == 'D':
+                vals = dihedrals(xyz, atoms)
+            else:
+                vals = angles(xyz, atoms[:, :3])
+            values[..., positions] = np.degrees(vals) if degrees else vals
+        return values
+
+    @staticmethod
+    def from_orca(lines):
+        """
+        Read the definitions of the last set of redundant internal coordinates in an ORCA output
+        :param lines: lines of an ORCA output file
+        """
+        start = -1
+        for i in reversed(range(len(lines))):
+            if lines[i].strip() == '--- Optimized Parameters ---':
+                start = i + 5
+                break
+        if start == -1:
+            raise SyntaxError('Cannot find the start of the redundant internals')
+
+        definitions = []
+        for line in lines[start:]:
+            if line.strip().startswith('-'):
+                break
+            definitions.append(line[line.index('.') + 1:line.index(')') + 1])
+        return InternalCoordinates(definitions)
@@ -1,5 +1,7 @@
 import numpy as np
 from qgrep.atom import atomic_masses, atomic_numbers
+from qgrep.connectivity import distance_matrix, perceive_bonds
+from qgrep import rmsd
 
 from cclib.io import ccread
 
@@ -48,9 +50,18 @@ class Molecule:
         self.xyz[i] = xyz
 
     def __delitem__(self, i):
-        """Deletes the ith atom"""
+        """
+        Deletes the ith atom, shifting the coordinates within the buffer
+        Views of shared coordinates get their own buffer instead
+        """
+        n = len(self.atoms)
+        keep = np.ones(n, dtype=bool)
+        keep[i] = False
         del self.atoms[i]
-        self.xyz = np.delete(self.xyz, i, axis=0)
+        if self._shared:
+            self._xyz, self._shared = self._xyz[:n][keep], False
+        else:
+            self._xyz[:len(self.atoms)] = self._xyz[:n][keep]
 
     def __eq__(self, other):
         if not isinstance(other, Molecule):
@@ -60,10 +71,40 @@ class Molecule:
         return True
 
     def insert(self, i, atom, xyz):
-        """Insert the atom in the specified position"""
+        """Insert the atom in the specified position, shifting the coordinates within the buffer"""
         Molecule.check_atom(atom, xyz)
+        n = len(self.atoms)
+        # Follow the semantics of list.insert for negative and out of range positions
+        i = slice(i, None).indices(n)[0]
+        self._reserve(n + 1)
+        self._xyz[i + 1:n + 1] = self._xyz[i:n]
+        self._xyz[i] = xyz
         self.atoms.insert(i, atom)
-        self.xyz = np.insert(self.xyz, i, xyz, axis=0)
+
+    @property
+    def xyz(self):
+        """The coordinates (n_atoms, 3), a view into the coordinate buffer"""
+        return self._xyz[:len(self.atoms)]
+
+    @xyz.setter
+    def xyz(self, xyz):
+        """Set the coordinates, replacing the coordinate buffer with a copy"""
+        self._xyz = np.array(xyz, dtype=float)
+        # Whether the buffer is shared (e.g. with a Trajectory) and must be copied before resizing
+        self._shared = False
+
+    def _reserve(self, n_atoms):
+        """
+        Ensure the coordinate buffer can hold n_atoms
+        Capacity is doubled when growing, making repeated appends amortized O(1)
+        Shared buffers are always replaced
+        """
+        if self._shared or self._xyz.ndim != 2 or len(self._xyz) < n_atoms:
+            buffer = np.empty((max(n_atoms, 2 * len(self._xyz), 8), 3))
+            n = len(self.atoms)
+            if n:
+                buffer[:n] = self._xyz[:n]
+            self._xyz, self._shared = buffer, False
 
     @property
     def geom(self):
@@ -73,7 +114,7 @@ class Molecule:
     @geom.setter
     def geom(self, geom):
         """Set the geometry"""
-        self.atoms, self.xyz = [], np.array([])
+        self.atoms, self.xyz = [], np.zeros((0, 3))
         if geom is not None:
             Molecule.check_geom(geom)
             atoms, xyzs = zip(*geom)
@@ -83,11 +124,36 @@ class Molecule:
     def append(self, atom, xyz):
         """Append atom to geometry"""
         Molecule.check_atom(atom, xyz)
+        n = len(self.atoms)
+        self._reserve(n + 1)
+        self._xyz[n] = xyz
         self.atoms.append(atom)
-        if len(self.xyz) > 0:
-            self.xyz = np.append(self.xyz, np.array(xyz)[np.newaxis, ...], axis=0)
-        else:
-            self.xyz = np.array(xyz)[np.newaxis, ...]
+
+    @staticmethod
+    def from_arrays(atoms, xyz):
+        """
+        Quickly make a Molecule from a list of atoms and an array of coordinates (both are copied)
+        WARNING: skips check_atom, only the shape of the coordinates is checked
+        :param atoms: list of atom names
+        :param xyz: coordinates (n_atoms, 3)
+        """
+        return Molecule._view(atoms, np.array(xyz, dtype=float))
+
+    @staticmethod
+    def _view(atoms, xyz):
+        """
+        Make a Molecule that shares the coordinates (e.g. a frame of a Trajectory)
+        Setting coordinates writes through, but deleting or inserting atoms copies them first
+        :param atoms: list of atom names (copied)
+        :param xyz: coordinates (n_atoms, 3), used as the coordinate buffer without copying
+        """
+        xyz = np.asarray(xyz, dtype=float)
+        if xyz.shape != (len(atoms), 3):
+            raise SyntaxError(f'Expected coordinates of shape ({len(atoms)}, 3), got: {xyz.shape}')
+        mol = Molecule()
+        mol.atoms = list(atoms)
+        mol._xyz, mol._shared = xyz, True
+        return mol
 
     @staticmethod
     def check_atom(atom, xyz):
@@ -124,14 +190,33 @@ class Molecule:
         # Strip off length if provided
         if lines[0].strip().isdigit():
             lines = lines[2:]
-        geom = []
+        atoms, xyz = [], []
         for line in lines:
             if line.strip() == '':
                 continue
             atom, x, y, z = line.split()[:4]
-            geom.append([atom, [float(x), float(y), float(z)]])
+            atoms.append(atom)
+            xyz.append([float(x), float(y), float(z)])
 
-        return Molecule(geom)
+        return Molecule.from_arrays(atoms, np.array(xyz).reshape(-1, 3))
+
+    @staticmethod
+    def from_xyz(xyz):
+        """
+        Make a Molecule from the first geometry in an XYZ string
+        :param xyz: string in XYZ format (number of atoms, comment, then atoms)
+        """
+        lines = xyz.splitlines()
+        n_atoms = int(lines[0])
+        atoms, coords = [], []
+        for line in lines[2:2 + n_atoms]:
+            atom, x, y, z = line.split()[:4]
+            atoms.append(atom)
+            coords.append([float(x), float(y), float(z)])
+        if len(atoms) != n_atoms:
+            raise SyntaxError(f'Expected {n_atoms} atoms, got: {len(atoms)}')
+
+        return Molecule.from_arrays(atoms, np.array(coords).reshape(-1, 3))
 
     def write(self, outfile='geom.xyz', label=True, style='xyz'):
         """
@@ -154,52 +239,98 @@ class Molecule:
         with open(outfile, 'w') as f:
             f.write(out)
 
-    def center_of_mass(self, masses=None):
+    def mass_vector(self, masses=None):
         """
-        Finds the center of mass
+        Generates an array of the mass of each atom
+        The default masses are cached until the atoms change (and are read-only)
         :param masses: a dictionary or list of masses to use
         """
-        if isinstance(masses, list):
-            masses_list = masses
+        if isinstance(masses, (list, np.ndarray)):
+            return np.asarray(masses, dtype=float)
         elif isinstance(masses, dict):
-            masses_list = [masses[atomic_numbers[atom]] for atom in self.atoms]
+            return np.array([masses[atomic_numbers[atom]] for atom in self.atoms])
         elif masses is None:
-            masses_list = [atomic_masses[atomic_numbers[atom]] for atom in self.atoms]
-        else:
-            raise ValueError(f'Expected a list or dictionary of masses, got: {type(masses)}')
-
-        com = np.zeros(3)
-        total_mass = 0
-        for mass, xyz in zip(masses_list, self.xyz):
-            com += mass*np.array(xyz)
-            total_mass += mass
-
-        return com/total_mass
+            if getattr(self, '_mass_atoms', None) != self.atoms:
+                masses = [atomic_masses[atomic_numbers[atom]] for atom in self.atoms]
+                self._masses = np.array(masses)
+                self._masses.setflags(write=False)
+                self._mass_atoms = list(self.atoms)
+            return self._masses
+        raise ValueError(f'Expected a list or dictionary of masses, got: {type(masses)}')
+
+    def center_of_mass(self, masses=None, frames=None):
+        """
+        Finds the center of mass
+        :param masses: a dictionary or list of masses to use
+        :param frames: array of geometries (n_frames, n_atoms, 3) to use instead of self.xyz
+        :return: center of mass (3) or (n_frames, 3) if frames are given
+        """
+        xyz = self.xyz if frames is None else frames
+        return center_of_mass(xyz, self.mass_vector(masses))
 
-    def moment_of_inertia_tensor(self, masses=None):
+    def moment_of_inertia_tensor(self, masses=None, frames=None):
         """
         Generates the moment of intertia tensor (3x3).
         :param masses: a dictionary or list of masses to use
-        com = self.center_of_mass(masses)
+        :param frames: array of geometries (n_frames, n_atoms, 3) to use instead of self.xyz
+        :return: tensor (3, 3) or (n_frames, 3, 3) if frames are given
         """
-        if isinstance(masses, list):
-            masses_list = masses
-        elif isinstance(masses, dict):
-            masses_list = [masses[atomic_numbers[atom]] for atom in self.atoms]
-        elif masses is None:
-            masses_list = [atomic_masses[atomic_numbers[atom]] for atom in self.atoms]
-        else:
-            raise ValueError(f'Expected a list or dictionary of masses, got: {type(masses)}')
+        xyz = self.xyz if frames is None else frames
+        return moment_of_inertia_tensor(xyz, self.mass_vector(masses))
 
-        com = self.center_of_mass(masses)
+    def distance_matrix(self):
+        """
+        Generates the matrix of all pairwise distances
+        WARNING: O(n^2) memory, use bonds for large systems
+        """
+        return distance_matrix(self.xyz)
 
-        moi_tensor = np.zeros((3, 3))
-        for mass, xyz in zip(masses_list, self.xyz):
-            x, y, z = xyz - com
-            moi_tensor += mass * np.array([[y**2 + z**2,        -x*y,        -x*z],
-                                           [       -y*x, x**2 + z**2,        -y*z],
-                                           [       -z*x,        -z*y, x**2 + y**2]])
-        return moi_tensor
+    def bonds(self, tolerance=0.45):
+        """
+        Find the bonds based on covalent radii (see connectivity.perceive_bonds)
+        The Connectivity is cached until the atoms or coordinates change
+        :param tolerance: distance (Angstrom) beyond the sum of the covalent radii to allow
+        :return: Connectivity
+        """
+        cache = getattr(self, '_bonds', None)
+        if cache is not None:
+            atoms, xyz, cached_tolerance, connectivity = cache
+            same_geom = atoms == self.atoms and np.array_equal(xyz, self.xyz)
+            if same_geom and tolerance == cached_tolerance:
+                return connectivity
+        connectivity = perceive_bonds(self.atoms, self.xyz, tolerance)
+        self._bonds = (list(self.atoms), self.xyz.copy(), tolerance, connectivity)
+        return connectivity
+
+    def rmsd(self, other, align=True, reorder=False):
+        """
+        Root mean squared deviation from another geometry of the same atoms
+        :param other: Molecule to compare to
+        :param align: find the RMSD after optimal translation and rotation (Kabsch)
+        :param reorder: find the best mapping of atoms of the same element (needs scipy)
+        :return: RMSD
+        """
+        xyz = other.xyz
+        if reorder:
+            xyz = xyz[rmsd.reorder(self.atoms, self.xyz, other.atoms, other.xyz)]
+        elif self.atoms != other.atoms:
+            raise ValueError('Cannot compare Molecules with different atoms, try reorder=True.')
+        return float(rmsd.rmsd(self.xyz, xyz, align))
+
+    def aligned(self, other, reorder=False):
+        """
+        Returns a copy of the molecule translated and rotated onto the other molecule
+        :param other: Molecule to align onto
+        :param reorder: reorder the atoms to best match the other molecule (needs scipy)
+        """
+        atoms, xyz = self.atoms, self.xyz
+        if reorder:
+            order = rmsd.reorder(other.atoms, other.xyz, self.atoms, self.xyz)
+            atoms, xyz = [atoms[i] for i in order], xyz[order]
+        elif self.atoms != other.atoms:
+            raise ValueError('Cannot align Molecules with different atoms, try reorder=True.')
+        xyz = rmsd.align(xyz, other.xyz) + other.xyz.mean(axis=0)
+        return Molecule.from_arrays(list(atoms), xyz)
 
     def reorder(self, order):
         """
@@ -214,3 +345,30 @@ class Molecule:
 
         return Molecule(geom)
 
+
+
+def center_of_mass(xyz, masses):
+    """
+    Finds the center of mass of one or many geometries
+    :param xyz: array of geometries (..., n_atoms, 3)
+    :param masses: array of masses (n_atoms)
+    :return: array of centers of mass (..., 3)
+    """
+    masses = np.asarray(masses, dtype=float)
+    return masses @ np.asarray(xyz, dtype=float) / masses.sum()
+
+
+def moment_of_inertia_tensor(xyz, masses):
+    """
+    Generates the moment of inertia tensor of one or many geometries
+    :param xyz: array of geometries (..., n_atoms, 3)
+    :param masses: array of masses (n_atoms)
+    :return: array of tensors (..., 3, 3)
+    """
+    masses = np.asarray(masses, dtype=float)
+    xyz = np.asarray(xyz, dtype=float)
+    rs = xyz - center_of_mass(xyz, masses)[..., np.newaxis, :]
+    weighted = masses[:, np.newaxis] * rs
+    # I = sum_i m_i (r_i.r_i E - r_i r_i^T)
+    r2 = np.einsum('...ij,...ij->...', weighted, rs)
+    return r2[..., np.newaxis, np.newaxis] * np.eye(3) - np.swapaxes(weighted, -1, -2) @ rs
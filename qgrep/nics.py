@@ -1,48 +1,195 @@
-import pybel
+from multiprocessing import Pool
+
 import numpy as np
-import openbabel as ob
+
+from . import orca
+from .connectivity import ring_centers_normals
+from .molecule import Molecule
+from .trajectory import XYZReader
+
+NEWGTO = {
+    'orca': 'newgto S 1 1 100000 1 end newauxJKgto S 1 1 200000 1 end',
+}
 
 
 def nics_points(molecule, verbose=False, format='orca'):
     """
     Generate the NICS(0,1, and -1) points for all rings in a geometry
-    :param molecule: a molecule that pybel can read
+    :param molecule: a Molecule or a string in XYZ format (only the first geometry is used)
     :param verbose: print out the NICS points
     :param format: format to output the NICS points
     :return: NICS(0, 1, and -1) points
     """
-    mol = pybel.readstring('xyz', molecule)
+    if isinstance(molecule, str):
+        molecule = Molecule.from_xyz(molecule)
 
     # Find centers and normal vectors of rings to generate ghost atom positions
-    c, n1, n2 = ob.vector3(), ob.vector3(), ob.vector3()
-    centers, normals, ghost_atoms = [], [], []
-    for i, ring in enumerate(mol.sssr):
-        atoms = [a for a in range(len(mol.atoms)) if ring.IsInRing(a + 1)]
-        ring.findCenterAndNormal(c, n1, n2)
-        center = np.array([ c.GetX(),  c.GetY(),  c.GetZ()])
-        normal = np.array([n1.GetX(), n1.GetY(), n1.GetZ()])
-        normal /= np.linalg.norm(normal)
-        centers.append(center)
-        normals.append(normal)
-        if verbose:
+    rings = molecule.bonds().rings()
+    centers, normals = ring_centers_normals(molecule.xyz, rings)
+    if verbose:
+        for i, (ring, center, normal) in enumerate(zip(rings, centers, normals)):
             print('-'*51)
             print(f'Ring {i}')
-            print(f'Atoms {atoms}')
+            print(f'Atoms {ring}')
             print('C:  {:>15.10f} {:>15.10f} {:>15.10f}'.format(*center))
             print('N1: {:>15.10f} {:>15.10f} {:>15.10f}'.format(*normal))
-        ghost_atoms += center, center + normal, center - normal
+
+    ghost_atoms = list(ghost_points(centers, normals))
 
     # Print ghost atoms
     if verbose:
-        format = format.lower()
-        if format == 'orca':
-            newgto = 'newgto S 1 1 100000 1 end newauxJKgto S 1 1 200000 1 end'
+        try:
+            lines = ghost_atom_lines(ghost_atoms, format)
             print('-'*51)
             print('Ghost atoms for NICS')
-            for i, (x, y, z) in enumerate(ghost_atoms):
-                comment = ['Center', 'Top', 'Bottom'][i % 3]
-                print(f'H:  {x:>15.10f} {y:>15.10f} {z:>15.10f} {newgto} # {comment}')
-        else:
-            print(f'{format} is not currently supported.')
+            print('\n'.join(lines))
+        except ValueError as e:
+            print(e)
 
     return ghost_atoms
+
+
+def ghost_points(centers, normals):
+    """
+    The center, top, and bottom of each ring (NICS(0), NICS(1), and NICS(-1))
+    :param centers: ring centers (..., n_rings, 3)
+    :param normals: ring normals (..., n_rings, 3)
+    :return: ghost atom positions (..., 3*n_rings, 3)
+    """
+    points = np.stack((centers, centers + normals, centers - normals), axis=-2)
+    return points.reshape(points.shape[:-3] + (-1, 3))
+
+
+def ghost_atom_lines(ghost_atoms, format='orca'):
+    """
+    Format ghost atoms for an input file
+    :param ghost_atoms: ghost atom positions, in groups of center, top, and bottom
+    :param format: format to output the ghost atoms
+    :return: list of lines
+    """
+    format = format.lower()
+    if format not in NEWGTO:
+        raise ValueError(f'{format} is not currently supported.')
+    newgto = NEWGTO[format]
+    lines = []
+    for i, (x, y, z) in enumerate(ghost_atoms):
+        comment = ['Center', 'Top', 'Bottom'][i % 3]
+        lines.append(f'H:  {x:>15.10f} {y:>15.10f} {z:>15.10f} {newgto} # {comment}')
+    return lines
+
+
+def cached_rings(molecule, cache=None):
+    """
+    Find the rings of a molecule, reusing the rings of any molecule with the same connectivity
+    :param molecule: Molecule
+    :param cache: dictionary of rings keyed by atoms and bonds (default: not cached)
+    :return: list of rings, key of the connectivity
+    """
+    cache = {} if cache is None else cache
+    bonds = molecule.bonds()
+    key = (tuple(molecule.atoms), bonds.pairs.tobytes())
+    if key not in cache:
+        cache[key] = bonds.rings()
+    return cache[key], key
+
+
+def nics_frames(molecules, cache=None):
+    """
+    Generate the NICS points for many geometries
+    Frames that share connectivity share their rings, and their ring centers and normals are found
+    together
+    :param molecules: iterable of Molecules
+    :param cache: dictionary of rings keyed by atoms and bonds (default: only for this call)
+    :return: list of (rings, ghost atoms (3*n_rings, 3)) for each frame
+    """
+    molecules = list(molecules)
+    cache = {} if cache is None else cache
+    groups = {}
+    for i, mol in enumerate(molecules):
+        rings, key = cached_rings(mol, cache)
+        groups.setdefault(key, (rings, []))[1].append(i)
+
+    results = [None] * len(molecules)
+    for rings, frames in groups.values():
+        xyz = np.array([molecules[i].xyz for i in frames])
+        points = ghost_points(*ring_centers_normals(xyz, rings))
+        for i, frame_points in zip(frames, points):
+            results[i] = (rings, frame_points)
+    return results
+
+
+def nics_input(molecule, ghost_atoms, format='orca', **template_args):
+    """
+    Make an input file with the ghost atoms appended to the geometry
+    :param molecule: Molecule
+    :param ghost_atoms: ghost atom positions
+    :param format: program to make the input for
+    :param template_args: passed to the program's template (e.g. theory, basis, other)
+    :return: input file as a string
+    """
+    if format.lower() != 'orca':
+        raise ValueError(f'{format} is not currently supported.')
+    lines = [f'    {line}' for line in str(molecule).splitlines()]
+    lines += [f'    {line}' for line in ghost_atom_lines(ghost_atoms, format)]
+    template_args.setdefault('jobtype', 'NMR')
+    return orca.template('\n'.join(lines), **template_args)
+
+
+def read_frames(infile):
+    """
+    Read all geometries from an XYZ file, or the final geometry from an output file
+    :return: list of Molecules
+    """
+    if infile.endswith('.xyz'):
+        with XYZReader(infile) as reader:
+            return list(reader)
+    return [Molecule.read_from(infile)]
+
+
+def nics_file(infile, outfile_form='{name}_nics{frame}.inp', format='orca', **template_args):
+    """
+    Write NICS inputs for every geometry in a file
+    :param infile: XYZ file (all frames are used) or output file (final geometry is used)
+    :param outfile_form: format string for the input files, filled with the name of infile
+        (without extension) and the frame (empty if there is only one)
+    :param format: program to make the inputs for
+    :param template_args: passed to the program's template (e.g. theory, basis, other)
+    :return: list of the files written
+    """
+    name = '.'.join(infile.split('.')[:-1]) or infile
+    molecules = read_frames(infile)
+    outfiles = []
+    for i, (mol, (rings, ghost_atoms)) in enumerate(zip(molecules, nics_frames(molecules))):
+        frame = f'_{i}' if len(molecules) > 1 else ''
+        outfile = outfile_form.format(name=name, frame=frame)
+        with open(outfile, 'w') as f:
+            f.write(nics_input(mol, ghost_atoms, format, **template_args))
+        outfiles.append(outfile)
+    return outfiles
+
+
+def _nics_file_star(args):
+    """Unpack the arguments for nics_file (Pool.map only passes a single argument)"""
+    infile, outfile_form, format, template_args = args
+    return nics_file(infile, outfile_form, format, **template_args)
+
+
+def nics_many(infiles, outfile_form='{name}_nics{frame}.inp', format='orca', nprocs=1,
+              **template_args):
+    """
+    Write NICS inputs for every geometry in many files
+    :param infiles: files to read the geometries from (see nics_file)
+    :param outfile_form: format string for the input files (see nics_file)
+    :param format: program to make the inputs for
+    :param nprocs: number of processes to use
+    :param template_args: passed to the program's template (e.g. theory, basis, other)
+    :return: list of the files written
+    """
+    jobs = [(infile, outfile_form, format, template_args) for infile in infiles]
+    if nprocs > 1 and len(jobs) > 1:
+        with Pool(min(nprocs, len(jobs))) as pool:
+            written = pool.map(_nics_file_star, jobs)
+    else:
+        written = map(_nics_file_star, jobs)
+
+    return [outfile for outfiles in written for outfile in outfiles]
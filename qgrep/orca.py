@@ -1,9 +1,12 @@
 """Source for all orca related functions"""
 import re
 
+import numpy as np
+
 from collections import OrderedDict
 
 from .molecule import Molecule
+from .trajectory import Trajectory
 from .convergence import Convergence, Step
 
 
@@ -51,8 +54,8 @@ def get_geom(lines, geom_type='xyz', units='angstrom'):
     return geom
 
 
-def plot(lines, geom_type='xyz'):
-    """Plots the geometries from the optimization steps"""
+def geom_blocks(lines):
+    """Returns the lines of the geometry of each optimization step"""
     start = 'CARTESIAN COORDINATES (ANGSTROEM)\n'
     end = 'CARTESIAN COORDINATES (A.U.)\n'
 
@@ -64,16 +67,15 @@ def plot(lines, geom_type='xyz'):
         if end == lines[i]:
             geoms_end.append(i - 2)
 
+    return [lines[start:end] for start, end in zip(geoms_start, geoms_end)]
+
+
+def plot(lines, geom_type='xyz'):
+    """Plots the geometries from the optimization steps"""
     geoms = []
-    length = geoms_end[0] - geoms_start[0]
-    for i in range(len(geoms_start)):
-        start = geoms_start[i]
-        end = geoms_end[i]
-        if end - start != length:
-            length = end - start
-
-        geom = f'{length}\nStep {i}\n'
-        for line in lines[start:end]:
+    for i, block in enumerate(geom_blocks(lines)):
+        geom = f'{len(block)}\nStep {i}\n'
+        for line in block:
             geom += '\t'.join(line.split()) + '\n'
 
         geoms.append(geom)
@@ -81,6 +83,11 @@ def plot(lines, geom_type='xyz'):
     return geoms
 
 
+def get_trajectory(lines):
+    """Returns a Trajectory of the geometries from the optimization steps"""
+    return Trajectory.from_blocks(geom_blocks(lines))
+
+
 def check_convergence(lines):
     """Returns all the geometry convergence results"""
     convergence_result = 'Geometry convergence'
@@ -419,14 +426,15 @@ def get_molecule(lines):
     if geom_start == -1:
         return ''
 
-    mol = Molecule()
+    atoms, xyzs = [], []
     for line in lines[geom_start:]:
         if end == line:
             break
         atom, *xyz = line.split()[:4]
-        mol.append(atom, list(map(float, xyz)))
+        atoms.append(atom)
+        xyzs.append(list(map(float, xyz)))
 
-    return mol
+    return Molecule.from_arrays(atoms, np.array(xyzs).reshape(-1, 3))
 
 
 def get_charge(lines):
@@ -3,20 +3,79 @@ import re
 import numpy as np
 
 from itertools import zip_longest
+from multiprocessing import Pool
 from collections import defaultdict
+from functools import cached_property
 
-from more_itertools import peekable
+try:
+    from scipy.sparse import csr_matrix
+except ImportError:
+    # Only needed for sparse bond order matrices
+    csr_matrix = None
+
+
+# Line of the NAO table and the first line after it
+nao_re = re.compile(r'^\s*\d+\s+([A-Z][a-z]?)\s*(\d+)\s+(\S+)\s+(\w+)\(\s*(\w+)\)'
+                    r'\s+(-?\d+\.\d+)\s+(-?\d+\.\d+)', re.M)
+nao_end_re = re.compile(r'^[ \t]*[^\s\d]', re.M)
+# Line of the NPA table, atom and the charge, core, valence, rydberg, and total populations
+npa_re = re.compile(r'^\s*([A-Z][a-z]?)\s*\d+((?:\s+-?\d+\.\d+){5})', re.M)
+
+
+def _stack(arrays, labels, pad=False):
+    """
+    Stack arrays, padding the ends with zeros if their lengths differ
+    :param arrays: arrays to stack
+    :param labels: labels of the rows of each array (e.g. atoms), must all match unless padding
+    :param pad: allow differing labels and pad the shorter arrays with zeros
+    """
+    if not pad:
+        for i, array_labels in enumerate(labels[1:], 1):
+            if array_labels != labels[0]:
+                raise ValueError(f'The atoms of set {i} differ from those of set 0 '
+                                 '(use pad=True to pad with zeros)')
+    length = max((len(array) for array in arrays), default=0)
+    shape = (len(arrays), length) + (np.shape(arrays[0])[1:] if arrays else ())
+    stacked = np.zeros(shape)
+    for i, array in enumerate(arrays):
+        stacked[i, :len(array)] = array
+    return stacked
+
+
+def _read_file(cls, file):
+    """
+    Read a file with the given class (NAOs or NPA)
+    """
+    with open(file) as f:
+        return cls(lines=f.readlines())
+
+
+def _read_many(cls, files, nprocs=1):
+    """
+    Read many files with the given class (NAOs or NPA), in parallel if nprocs > 1
+    """
+    if nprocs > 1 and len(files) > 1:
+        with Pool(min(nprocs, len(files))) as pool:
+            return pool.starmap(_read_file, [(cls, file) for file in files])
+    return [_read_file(cls, file) for file in files]
 
 
 class NAOs:
-    """Natural Atomic Orbitals"""
+    """
+    Natural Atomic Orbitals
+
+    Stored as arrays of the atom numbers, occupancies, and energies, along with lists of the
+    atoms, orbitals (e.g. px), types (e.g. Val), and shells (e.g. 2p) of each NAO.
+    """
     def __init__(self, lines):
         """
+        :param lines: lines of an output file to read
         """
-        self.vals = NAOs.read(lines)
+        (self.atoms, self.numbers, self.orbs, self.types, self.shells,
+         self.occupancies, self.energies) = NAOs.read(lines)
 
     def __len__(self):
-        return len(self.vals)
+        return len(self.occupancies)
 
     def __iter__(self):
         for ao_vals in self.vals:
@@ -28,39 +87,59 @@ class NAOs:
         """
         raise NotImplementedError
 
+    @property
+    def vals(self):
+        """
+        List of [atom, number, orbital, type, shell, occupancy, energy] of each NAO
+        """
+        return [list(vals) for vals in zip(self.atoms, self.numbers.tolist(), self.orbs, self.types,
+                                           self.shells, self.occupancies.tolist(),
+                                           self.energies.tolist())]
+
+    @staticmethod
+    def stack(naos_list, pad=False):
+        """
+        Stack the occupancies of many NAOs
+        :param pad: allow differing NAOs, padding with zeros (the padded values are meaningless)
+        :return: np.array (n_naos_list, max number of NAOs)
+        """
+        labels = [list(zip(naos.atoms, naos.numbers.tolist(), naos.orbs, naos.shells))
+                  for naos in naos_list]
+        return _stack([naos.occupancies for naos in naos_list], labels, pad)
+
+    @staticmethod
+    def read_many(files, nprocs=1):
+        """
+        Read the NAOs of many outputs
+        :param files: outputs to read
+        :param nprocs: number of processes to use
+        :return: list of NAOs
+        """
+        return _read_many(NAOs, files, nprocs)
+
     @staticmethod
     def read(lines):
-        """ Reads the lines of a NAO output
+        """ Reads the lines of a NAO output (the last one if there are multiple)
   NAO Atom No lang   Type(AO)    Occupancy      Energy
  ---------------------------------------------------------
    1    C  1  s      Cor( 1s)     1.99916     -10.15626
    2    C  1  s      Val( 2s)     0.94193      -0.30622
+:return: atoms, atom numbers, orbitals, types, shells, occupancies, energies
 """
-        start = -1
-        for i, line in enumerate(lines):
-            if line.strip() == 'NAO Atom No lang   Type(AO)    Occupancy      Energy':
-                start = i + 2
+        text = ''.join(lines)
+        start = text.rfind('NAO Atom No lang   Type(AO)    Occupancy      Energy')
         if start == -1:
             raise Exception('Cannot find the start of NAO')
+        # Skip the header and the dashed line
+        start = text.find('\n', text.find('\n', start) + 1) + 1
+        end = nao_end_re.search(text, start)
+        block = text[start:end.start() if end else len(text)]
 
-        vals = []
-        atom = ''
-        for line in lines[start:]:
-            if not line.strip():
-                continue
-            try:
-                idx, atom, num, orb, orb_type, *shell, occupancy, energy = line.split()
-            except ValueError as e:
-                break
-            if not shell:
-                orb_type, shell = orb_type.split('(')
-            else:
-                shell = shell[0]
-                orb_type = orb_type.strip('(')
-            shell = shell.strip(')')
-            vals.append([atom, int(num), orb, orb_type, shell, float(occupancy), float(energy)])
-
-        return vals
+        # Transpose the rows into columns
+        columns = list(zip(*nao_re.findall(block))) or [()] * 7
+        atoms, numbers, orbs, types, shells, occupancies, energies = columns
+        return (list(atoms), np.array(numbers, dtype=int), list(orbs), list(types), list(shells),
+                np.array(occupancies, dtype=float), np.array(energies, dtype=float))
 
 
 class NPA:
@@ -140,20 +219,14 @@ class NPA:
         """
         if form not in ['+', '-']:
             raise ValueError("form must be '+' or '-'")
-        atoms = []
-        charges = []
         # Allow combination even if the dimensions don't match
-        for (atom1, charges1), (atom2, charges2) in zip_longest(self, other, fillvalue=['', np.zeros(5)]):
-            atoms.append(f'{atom1:>2}{form}{atom2:<2}')
-
-            if form == '-':
-                charges.append(charges1 - charges2)
-            else:
-                charges.append(charges1 + charges2)
+        atoms = [f'{atom1:>2}{form}{atom2:<2}'
+                 for atom1, atom2 in zip_longest(self.atoms, other.atoms, fillvalue='')]
+        charges1, charges2 = NPA.stack([self, other], pad=True)
 
         if form == '-':
-            return NPA_Diff(atoms, charges)
-        return NPA_Sum(atoms, charges)
+            return NPA_Diff(atoms, charges1 - charges2)
+        return NPA_Sum(atoms, charges1 + charges2)
 
     def append(self, atom, *vals):
         """
@@ -164,6 +237,28 @@ class NPA:
             raise SyntaxError('Invalid number of charges')
         self.charges = np.array(list(self.charges).append(list(vals)))
 
+    @staticmethod
+    def stack(npas, pad=False):
+        """
+        Stack the charges of many NPAs of the same atoms
+            charges = NPA.stack(NPA.read_many(files))[:, :, 0]
+            charge_flow = charges - charges[0]
+        :param pad: allow differing atoms, padding with zeros (the padded values are meaningless)
+        :return: np.array (n_npas, max number of atoms, 5)
+        """
+        return _stack([np.reshape(npa.charges, (-1, 5)) for npa in npas],
+                      [list(npa.atoms) for npa in npas], pad)
+
+    @staticmethod
+    def read_many(files, nprocs=1):
+        """
+        Read the NPA of many outputs
+        :param files: outputs to read
+        :param nprocs: number of processes to use
+        :return: list of NPAs
+        """
+        return _read_many(NPA, files, nprocs)
+
     @staticmethod
     def read(lines):
         """Read the natural population analysis from an output file
@@ -178,28 +273,21 @@ class NPA:
     O  3   -0.42097      1.99976     6.38932    0.03189     8.42097
 ...
 """
-
         # Find the NPA Section
-        start = -1
-        for i, line in enumerate(lines):
-            if line == '  Atom No    Charge        Core      Valence    Rydberg      Total\n':
-                start = i + 2
-                break
+        text = ''.join(lines)
+        start = text.find('\n  Atom No    Charge        Core      Valence    Rydberg      Total\n')
         if start == -1:
             raise Exception('Unable to find the start of NPA analysis')
+        # Skip the header and the dashed line
+        start = text.find('\n', text.find('\n', start + 1) + 1) + 1
+        end = text.find('\n ' + '=' * 49, start)
+        block = text[start:end if end != -1 else len(text)]
 
-        npa = []
-        atoms = []
-        # Interpret the NPA
-        for line in lines[start:]:
-            if line[:50] == " " + "=" * 49:
-                break
-            atom, num, *others = line.split()
-            atoms.append(atom)
-            num = int(num)
-            charge, core, valence, rydberg, total, *ns = map(float, others)
-            npa.append([charge, core, valence, rydberg, total])
-        return atoms, np.array(npa)
+        # Interpret the NPA (ignoring any further columns)
+        rows = npa_re.findall(block)
+        atoms = [atom for atom, _ in rows]
+        npa = np.array(' '.join(charges for _, charges in rows).split(), dtype=float)
+        return atoms, npa.reshape(-1, 5)
 
 
 class NPA_Diff(NPA):
@@ -221,15 +309,17 @@ class Orbital:
     """
     Base class for all orbitals
     """
-    def __init__(self, occupation, atom, atom_n):
+    def __init__(self, occupation, atom, atom_n, hybrids=None):
         """
         :param occupation: orbital occupation
         :param atom: the primary atom of the orbital (more atoms allowed in subclasses)
         :param atom_n: index of the primary atom
+        :param hybrids: hybridization of the atom [(orbital, hybridicity, percent), ...]
         """
         self.occupation = occupation
         self.atom = atom
         self.atom_n = int(atom_n)
+        self.hybrids = hybrids
         self.type = self.__class__.__name__
 
     def __repr__(self):
@@ -261,8 +351,8 @@ class RY(Orbital):
 
 class RYs(Orbital):
     """Rydberg* Orbital"""
-    def __init__(self):
-        super().__init__(occupation, atom, atom_n)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.type = "RY*"
 
 
@@ -280,53 +370,171 @@ class NBO(Orbital):
         :param hybrids: hybridization of both atoms
         :param densities: densities of both atoms
         """
-        super().__init__(occupation, atom1, atom1_n)
+        super().__init__(occupation, atom1, atom1_n, hybrids)
         self.atom2 = atom2
         self.atom2_n = int(atom2_n)
-        self.hybrids = hybrids
         self.densities = densities
 
     def __repr__(self):
-        return f'<NBO {self.atom1}{self.atom1_n}--{self.atom2}{self.atom2_n}>'
+        return f'<{self.type} {self.atom}{self.atom_n}--{self.atom2}{self.atom2_n}>'
 
     def __str__(self):
-        return f'{self.type:4} {self.occupation:>7.5f} {self.atom_n:>3} {self.atom:2}--{self.atom2_n:>3} {self.atom:2}'
+        return f'{self.type:4} {self.occupation:>7.5f} {self.atom_n:>3} {self.atom:2}' \
+               f'--{self.atom2_n:>3} {self.atom2:2}'
 
 
 class NBOs(NBO):
-    def __init__(self):
-        super().__init__(occupation, atom1, atom1_n, atom2, atom2_n)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.type = "NBO*"
 
 
+# Angular momentum of the hybrids and the maximum number of atoms in an NBO (3C bonds)
+hybrid_types = 'spdfg'
+max_centers = 3
+
+nbo_section_re = re.compile(r'\(Occupancy\)\s+Bond orbital\s*/\s*Coefficients\s*/\s*Hybrids')
+# 1. (1.92050) BD ( 1)Fe  1- C  2
+nbo_re = re.compile(r'\s*(\d+)\.\s*\(\s*(-?\d+\.\d+)\)\s*(\w+\*?)\s*\(\s*(\d+)\)(.*)')
+# ( 32.17%)   0.5672*Fe  1 s( 33.10%)p 0.00(  0.02%)d 2.02( 66.88%)
+center_re = re.compile(r'\s*\(\s*(\d+\.\d+)%\)\s*(-?\d+\.\d+)\*\s*([A-Z][a-z]?)\s*(\d+)(.*)')
+atom_re = re.compile(r'([A-Z][a-z]?)\s*(\d+)')
+hybridicity_re = re.compile(r'([spdfg])\s*(\d+\.\d+)?\(\s*(\d+\.\d+)%\)')
+coefficients_re = re.compile(r'\s+-?\d+\.\d+(\s+-?\d+\.\d+)*\s*$')
+
+
 class NBOSet:
-    """Natural Bond Orbital class"""
+    """
+    Natural Bond Orbital class
+
+    The NBOs are stored as arrays, with centers (atom numbers, 0 if absent), polarizations (%),
+    coefficients (of the hybrid on each center), hybrids (% of each of hybrid_types), and
+    hybridicities (as printed, nan if not printed) for up to max_centers atoms per NBO.
+    The NAO coefficients of the hybrid on center j of the ith NBO
+    are nao_coefficients[nao_offsets[i*max_centers + j]:nao_offsets[i*max_centers + j + 1]].
+    The Orbital objects (NBO, LP, CR, ...) are only made when accessed, changes to them are not
+    written back to the NBOSet.
+    """
 
     def __init__(self, file_iter):
         """
         :param file_iter: file to be read from an output file
         """
-        self.orbitals = self.read(file_iter)
+        self.__dict__.update(self.read(file_iter))
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._orbital(range(len(self))[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._orbital(i)
 
     def __str__(self):
         out = 'Index Type  Occup   atom   Other info \n'
-        for i, nbo in enumerate(self.orbitals):
+        for i, nbo in enumerate(self):
             out += f'{i:>5} {nbo}\n'
         return out
 
+    @cached_property
+    def orbitals(self):
+        """Read-only tuple of the Orbital objects (made on the first access)"""
+        return tuple(self)
+
+    def _hybrids(self, i, center):
+        """Hybridization of a center of the ith NBO as [(orbital, hybridicity, percent), ...]"""
+        percents = self.hybrids[i, center].tolist()
+        hybridicities = self.hybridicities[i, center].tolist()
+        return [(orbital, hybridicity, percent) for orbital, hybridicity, percent
+                in zip(hybrid_types, hybridicities, percents) if not np.isnan(hybridicity)]
+
+    def _nao_coefficients(self, i, center):
+        """NAO coefficients of the hybrid on a center of the ith NBO"""
+        k = i * max_centers + center
+        return self.nao_coefficients[self.nao_offsets[k]:self.nao_offsets[k + 1]].tolist()
+
+    def _orbital(self, i):
+        """Make the Orbital object of the ith NBO"""
+        nbo_type = str(self.types[i])
+        occupation = float(self.occupancies[i])
+        centers = self.centers[i][self.centers[i] > 0].tolist()
+        atoms = [self.atoms[n - 1] for n in centers]
+        if len(centers) > 1:
+            hybrids = [self._hybrids(i, j) for j in range(len(centers))]
+            densities = [self._nao_coefficients(i, j) for j in range(len(centers))]
+            orbital_class = NBOs if nbo_type.endswith('*') else NBO
+            return orbital_class(occupation, atoms[0], centers[0], atoms[1], centers[1],
+                                 hybrids, densities)
+
+        single_center = {'CR': CR, 'LP': LP, 'LV': LV, 'RY': RY, 'RY*': RYs}
+        if nbo_type not in single_center:
+            raise Exception(f'Cannot parse nbo type {nbo_type}')
+        return single_center[nbo_type](occupation, atoms[0], centers[0], self._hybrids(i, 0))
+
+    def _bond_contributions(self):
+        """
+        Contributions of each two-center NBO to the bond orders, (occ x BD - occ x BD*)/2
+        :return: atom numbers of both centers (lower, higher), contributions
+        """
+        bonds = (self.centers[:, 1] > 0) & (self.centers[:, 2] == 0)
+        signs = np.where(np.char.endswith(self.types[bonds], '*'), -1, 1)
+        return np.sort(self.centers[bonds, :2], axis=1), signs * self.occupancies[bonds] / 2
+
     def bond_orders(self):
         """
         Determines the bond orders of all bonds based on (occ x BD - occ x BD*)/2
+        :return: dictionary of (lower atom number, higher atom number): bond order
         """
+        pairs, contributions = self._bond_contributions()
+        pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+        orders = np.bincount(inverse.reshape(-1), weights=contributions, minlength=len(pairs))
         bos = defaultdict(int)
-        for orbital in self.orbitals:
-            if isinstance(orbital, NBOs):
-                bos[(orbital.atom_n, orbital.atom2_n)] -= orbital.occupation/2
-            elif isinstance(orbital, NBO):
-                bos[(orbital.atom_n, orbital.atom2_n)] += orbital.occupation/2
-
+        bos.update(zip(map(tuple, pairs.tolist()), orders.tolist()))
         return bos
 
+    def bond_order_matrix(self, n_atoms=None):
+        """
+        Bond orders as a sparse symmetric matrix (0-indexed atoms)
+        :param n_atoms: number of atoms (default: the highest atom number in the NBOs)
+        :return: scipy.sparse.csr_matrix (n_atoms, n_atoms)
+        """
+        if csr_matrix is None:
+            raise ImportError('scipy is needed for sparse bond order matrices.')
+        pairs, contributions = self._bond_contributions()
+        n_atoms = len(self.atoms) if n_atoms is None else n_atoms
+        rows = np.concatenate([pairs[:, 0], pairs[:, 1]]) - 1
+        cols = np.concatenate([pairs[:, 1], pairs[:, 0]]) - 1
+        # Duplicate entries are summed
+        return csr_matrix((np.tile(contributions, 2), (rows, cols)), shape=(n_atoms, n_atoms))
+
+    @staticmethod
+    def bond_orders_many(nbo_sets):
+        """
+        Bond orders of many NBOSets (e.g. along a reaction path) for comparison
+            pairs, orders = NBOSet.bond_orders_many(nbo_sets)
+            changes = orders - orders[0]
+        :return: atom numbers of each bond (n_bonds, 2) as (lower, higher),
+            np.array of the bond orders (n_sets, n_bonds), 0 where there is no bond
+        """
+        # Start with empty arrays in case there are no bonds
+        pairs, contributions = [np.zeros((0, 2), dtype=int)], [np.zeros(0)]
+        sets = [np.zeros(0, dtype=int)]
+        for i, nbo_set in enumerate(nbo_sets):
+            set_pairs, set_contributions = nbo_set._bond_contributions()
+            pairs.append(set_pairs)
+            contributions.append(set_contributions)
+            sets.append(np.full(len(set_contributions), i))
+
+        pairs, inverse = np.unique(np.concatenate(pairs), axis=0, return_inverse=True)
+        orders = np.zeros((len(nbo_sets), len(pairs)))
+        indices = (np.concatenate(sets), inverse.reshape(-1))
+        np.add.at(orders, indices, np.concatenate(contributions))
+        return pairs, orders
+
     @staticmethod
     def read(file_iter):
         """
@@ -352,87 +560,86 @@ class NBOSet:
                ( 67.83%)   0.8236*Fe  1 s( 33.10%)p 0.00(  0.02%)d 2.02( 66.88%)
                                                   f 0.00(  0.00%)
     ...
+
+        The lines are streamed once, each is matched against precompiled patterns, and the
+        NAO coefficients are converted to floats all at once at the end.
+        :return: dictionary of the arrays (see the class docstring)
         """
-        file_iter = peekable(iter(file_iter))
-        for line in file_iter:
-            if line == '     (Occupancy)   Bond orbital / Coefficients / Hybrids\n':
+        lines = iter(file_iter)
+        for line in lines:
+            if nbo_section_re.search(line):
                 break
-        try:
-            file_iter.peek()
-        except StopIteration:
+        else:
             raise Exception('Could not find NBO section.')
 
-        single_center = {'CR': CR, 'LP': LP, 'LV': LV, 'RY': RY, 'RY*': RYs}
-
-        orbitals = []
-        while line:
-            # Start of a new block for parsing
-            if re.search('\s*\d+\. \(', line):
-                idx, occup, nbo_type, *other = line.split()
-                idx = int(idx[:-1])
-                occup = float(occup[1:-1])
-                nbo_type = nbo_type.strip('(')
-
-                atom_re = ' ?(\w{1,2})\s+(\d+)'
-                hybridicity_regex = '(\w)\s*(\d+\.\d+)\(\s*(\d+\.\d+)'
-
-                if nbo_type in ['BD', 'BD*']:
-                    """
-   4. (1.99999) BD ( 1) H  1- O  2
-               ( 41.34%)   0.6429* H  1 s(100.00%)
-                                         1.0000
-               ( 58.66%)   0.7659* O  2 s( 12.16%)p 7.22( 87.84%)
-                                         0.0000  0.3487  0.0000 -0.0650 -0.9350
-"""
-                    regex = fr'\( ?(\d+)\){atom_re}-{atom_re}'
-                    number, atom1, atom1_n, atom2, atom2_n = re.search(regex, line).groups()
-
-                    regex = fr'\(\s*(\d+\.\d+)%\)\s+(-?\d\.\d+)\*{atom_re}\s+(\w)\(\s*(\d+\.\d+)'
-                    # For each atom block within the BD/BD*
-                    # while not re.search('\s*\d+\.\s', file_iter.peek()):
-                    hybrids = []
-                    densities = []  # TODO: Figure out what this actually is
-                    # TODO: Adapt for three atom bonds?
-                    for i in range(2):
-                        line = next(file_iter)
-                        percent, val, atom, atom_n, orbital1, percent = re.search(regex, line).groups()
-                        assert (atom in [atom1, atom2]) and (atom_n in [atom1_n, atom2_n])
-
-                        hybrids.append([(orbital1, 1.0, float(percent))])
-                        finder = lambda l: re.findall(hybridicity_regex, l)
-                        matches = finder(line)
-                        while matches:
-                            for orbital, hybridicity, percent in matches:
-                                hybrids[i].append((orbital, float(hybridicity), float(percent)))
-                            matches = finder(file_iter.peek())
-                            if not matches:
-                                break
-                            next(file_iter)
-
-                        densities.append([])
-                        line = file_iter.peek()
-                        while line[:40] == ' '*40:
-                            densities[i] += map(float, re.findall('-?\d\.\d+', line))
-                            next(file_iter)
-                            line = file_iter.peek()
-
-                    orbitals.append(NBO(occup, atom1, atom1_n, atom2, atom2_n, hybrids, densities))  # [idx, occup, nbo_type, int(number), atom1, int(atom1_n), atom2, int(atom2_n), hybrids, densities])
-
-                elif nbo_type in single_center:
-                    """90. (0.01241) RY*( 1)Fe  1             s(  0.00%)p 1.00(  3.05%)d31.77( 96.89%)"""
-                    regex = fr'\( ?(\d+)\){atom_re}\s+(\w)\(\s*(\d+\.\d+)'
-                    try:
-                        number, atom, atom_n, orbital1, percent = re.search(regex, line).groups()
-                        hybrids = [(orbital1, 1.0, float(percent))]
-                        finder = lambda l: re.findall(hybridicity_regex, l)
-                        matches = finder(line) + finder(file_iter.peek())
-                        for orbital, hybridicity, percent in matches:
-                            hybrids.append((orbital, float(hybridicity), float(percent)))
-                    except Exception as e:
-                        raise ValueError from e
-                    orbitals.append(single_center[nbo_type](occup, atom, atom_n))
-                else:
-                    raise Exception(f'Cannot parse nbo type {nbo_type}')
-            line = next(file_iter).strip()
-
-        return orbitals
+        types, numbers, occupancies = [], [], []
+        centers, polarizations, coefficients, hybrids, n_naos = [], [], [], [], []
+        hybridicities = []
+        nao_coefficients = []
+        atoms = {}
+        center = 0
+        for line in lines:
+            if not line.strip():
+                break
+            # Most lines are NAO coefficients
+            if types and coefficients_re.match(line):
+                tokens = line.split()
+                nao_coefficients += tokens
+                n_naos[-1][max(center, 0)] += len(tokens)
+                continue
+            match = nbo_re.match(line)
+            if match:
+                # Start of a new NBO
+                idx, occupancy, nbo_type, number, rest = match.groups()
+                types.append(nbo_type)
+                numbers.append(int(number))
+                occupancies.append(float(occupancy))
+                # Single center orbitals have their hybrids on the same line
+                hybrid = hybridicity_re.search(rest)
+                nbo_atoms = atom_re.findall(rest[:hybrid.start()] if hybrid else rest)
+                if len(nbo_atoms) > max_centers:
+                    raise ValueError(f'Cannot parse NBOs with more than {max_centers} atoms')
+                for atom, atom_n in nbo_atoms:
+                    atoms[int(atom_n)] = atom
+                centers.append([int(atom_n) for _, atom_n in nbo_atoms]
+                               + [0] * (max_centers - len(nbo_atoms)))
+                polarizations.append([0.0] * max_centers)
+                coefficients.append([0.0] * max_centers)
+                hybrids.append([[0.0] * len(hybrid_types) for _ in range(max_centers)])
+                hybridicities.append([[np.nan] * len(hybrid_types) for _ in range(max_centers)])
+                n_naos.append([0] * max_centers)
+                center = 0
+                if not hybrid:
+                    center = -1
+                    continue
+                polarizations[-1][0], coefficients[-1][0] = 100.0, 1.0
+                line = rest
+            else:
+                match = center_re.match(line)
+                if match:
+                    # Next center of a multi-center NBO
+                    polarization, coefficient, atom, atom_n, line = match.groups()
+                    center += 1
+                    polarizations[-1][center] = float(polarization)
+                    coefficients[-1][center] = float(coefficient)
+
+            for orbital, hybridicity, percent in hybridicity_re.findall(line):
+                j = hybrid_types.index(orbital)
+                hybrids[-1][max(center, 0)][j] = float(percent)
+                # The first orbital is printed without a hybridicity (i.e. 1)
+                hybridicities[-1][max(center, 0)][j] = float(hybridicity or 1)
+
+        return {
+            'types': np.array(types, dtype=str),
+            'numbers': np.array(numbers, dtype=int),
+            'occupancies': np.array(occupancies, dtype=float),
+            'centers': np.array(centers, dtype=int).reshape(-1, max_centers),
+            'polarizations': np.array(polarizations, dtype=float).reshape(-1, max_centers),
+            'coefficients': np.array(coefficients, dtype=float).reshape(-1, max_centers),
+            'hybrids': np.array(hybrids, dtype=float).reshape(-1, max_centers, len(hybrid_types)),
+            'hybridicities': np.array(hybridicities, dtype=float).reshape(
+                -1, max_centers, len(hybrid_types)),
+            'nao_offsets': np.concatenate([[0], np.cumsum(n_naos, dtype=int).reshape(-1)]),
+            'nao_coefficients': np.array(nao_coefficients, dtype=float),
+            'atoms': [atoms.get(n, '') for n in range(1, max(atoms, default=0) + 1)],
+        }
@@ -1,69 +1,403 @@
 """Source for all Löwdin orbital analysis related functions"""
-import re
+import mmap
 import numpy as np
 
 from re import search
-from copy import deepcopy
 
 am_types = 'spdfghi'
 
 
+def _encode(labels):
+    """
+    Encode labels as integers
+    :return: the unique labels, code of each label
+    """
+    uniques, codes = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+    return uniques, codes.reshape(-1)
+
+
+def _offsets(mos, n_mos):
+    """Offsets of the contributions of each MO, from the MO position of each contribution"""
+    return np.concatenate([[0], np.cumsum(np.bincount(mos, minlength=n_mos))])
+
+
+def _arrays(mo_index, spin, energy, occupation, counts, atom_index, atoms, aos, val):
+    """
+    Make the columnar arrays of an OrbitalPopulation
+    :param counts: number of contributions of each MO
+    :param atoms: atom label of each contribution
+    :param aos: AO label of each contribution
+    """
+    atom_labels, atom_code = _encode(atoms)
+    ao_labels, ao_code = _encode(aos)
+    return {
+        'mo_index': np.array(mo_index, dtype=int),
+        'spin': np.array(spin, dtype=int),
+        'energy': np.array(energy, dtype=float),
+        'occupation': np.array(occupation, dtype=float),
+        'offsets': np.concatenate([[0], np.cumsum(counts, dtype=int)]),
+        'atom_index': np.array(atom_index, dtype=int),
+        'atom_code': atom_code,
+        'ao_code': ao_code,
+        'val': np.array(val, dtype=float),
+        'atom_labels': atom_labels,
+        'ao_labels': ao_labels,
+    }
+
+
+def _orbital_arrays(orb_list):
+    """Columnar arrays of a list of MOrbitals"""
+    contribs = [aoc for orb in orb_list for aoc in orb.contributions]
+    return _arrays([orb.index for orb in orb_list], [orb.spin or 0 for orb in orb_list],
+                   [orb.energy for orb in orb_list], [orb.occupation for orb in orb_list],
+                   [len(orb) for orb in orb_list], [aoc.index for aoc in contribs],
+                   [aoc.atom for aoc in contribs], [aoc.ao for aoc in contribs],
+                   [aoc.val for aoc in contribs])
+
+
+def _homo(occupation):
+    """Position of the HOMO (the orbital before the first that is not doubly occupied)"""
+    idxs = np.flatnonzero(np.asarray(occupation) < 2)
+    return int(idxs[0]) - 1 if len(idxs) else None
+
+
+def _lumo(occupation):
+    """Position of the LUMO (the first unoccupied orbital)"""
+    idxs = np.flatnonzero(np.asarray(occupation) == 0)
+    return int(idxs[0]) if len(idxs) else None
+
+
+def _window(occupation, mo_range):
+    """
+    Positions of the orbitals in a range
+    :param mo_range: (low, high) as in range, an int n for HOMO - n + 1 to LUMO + n,
+        or None for all orbitals
+    :return: start, end
+    """
+    if mo_range is None:
+        return 0, len(occupation)
+    if isinstance(mo_range, int):
+        mo_range = (_homo(occupation) - mo_range + 1, _lumo(occupation) + mo_range)
+    positions = np.arange(len(occupation))[slice(*mo_range)]
+    return (int(positions[0]), int(positions[-1]) + 1) if len(positions) else (0, 0)
+
+
+def _codes(keys):
+    """
+    Number the unique rows of keys in order of their first appearance
+    :param keys: integer array (n, n_columns)
+    :return: code of each row, the unique rows (in order of first appearance)
+    """
+    uniques, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[inverse.reshape(-1)], uniques[order].reshape(-1, keys.shape[1])
+
+
 class OrbitalPopulation:
-    """Löwdin Orbital Population class (OP for short)"""
+    """
+    Löwdin Orbital Population class (OP for short)
 
-    def __init__(self, file_name='', orb_list=None, method='lowdin'):
+    Stored as columnar arrays, with one entry per MO (mo_index, spin, energy, occupation) and
+    one per nonzero AO contribution (atom_index, atom_code, ao_code, val), where the
+    contributions of the ith MO are offsets[i]:offsets[i + 1]. Atom and AO labels are coded as
+    indices into atom_labels and ao_labels. MOrbitals and AO_Contribs are only made on access,
+    as read-only views (see orb_list).
+    """
+
+    def __init__(self, file_name='', orb_list=None, method='lowdin', mo_range=None):
         if file_name:
-            self.orb_list = self.read(file_name)
-        elif orb_list is not None:
-            self.orb_list = orb_list
+            self._set_arrays(**self.read(file_name, method, mo_range))
         else:
-            self.orb_list = []
+            self.orb_list = orb_list if orb_list is not None else []
+
+    def _set_arrays(self, mo_index, spin, energy, occupation, offsets,
+                    atom_index, atom_code, ao_code, val, atom_labels, ao_labels):
+        self.mo_index = mo_index
+        self.spin = spin
+        self.energy = energy
+        self.occupation = occupation
+        self.offsets = offsets
+        self.atom_index = atom_index
+        self.atom_code = atom_code
+        self.ao_code = ao_code
+        self.val = val
+        self.atom_labels = atom_labels
+        self.ao_labels = ao_labels
+        # Indexes for queries, built when first needed
+        self._indexes = {}
+
+    @staticmethod
+    def from_arrays(mo_index, spin, energy, occupation, offsets,
+                    atom_index, atom_code, ao_code, val, atom_labels, ao_labels):
+        """
+        Make an OrbitalPopulation from columnar arrays (see the class docstring)
+        WARNING: the arrays are not copied or checked
+        :param spin: spin of each MO (1 for α, -1 for β, 0 for restricted)
+        """
+        op = OrbitalPopulation.__new__(OrbitalPopulation)
+        op._set_arrays(mo_index, spin, energy, occupation, offsets,
+                       atom_index, atom_code, ao_code, val, atom_labels, ao_labels)
+        return op
+
+    def arrays(self):
+        """The columnar arrays (can be passed to from_arrays)"""
+        return {
+            'mo_index': self.mo_index,
+            'spin': self.spin,
+            'energy': self.energy,
+            'occupation': self.occupation,
+            'offsets': self.offsets,
+            'atom_index': self.atom_index,
+            'atom_code': self.atom_code,
+            'ao_code': self.ao_code,
+            'val': self.val,
+            'atom_labels': self.atom_labels,
+            'ao_labels': self.ao_labels,
+        }
+
+    @property
+    def orb_list(self):
+        """
+        Read-only tuple of MOrbital views (whose contributions are made when accessed)
+        Views are not written back, modify the population with __setitem__, append, or by
+        assigning a new orb_list
+        """
+        return tuple(self)
+
+    @orb_list.setter
+    def orb_list(self, orb_list):
+        self._set_arrays(**_orbital_arrays(orb_list))
+
+    @property
+    def atoms(self):
+        """Atom label of each contribution"""
+        return self.atom_labels[self.atom_code]
+
+    @property
+    def aos(self):
+        """AO label of each contribution"""
+        return self.ao_labels[self.ao_code]
+
+    def mo_positions(self):
+        """Position of the MO of each contribution"""
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
 
     def __eq__(self, other):
-        return self.orb_list == other.orb_list
+        return len(self) == len(other) \
+            and np.array_equal(self.offsets, other.offsets) \
+            and np.array_equal(self.mo_index, other.mo_index) \
+            and np.allclose(self.energy, other.energy) \
+            and np.allclose(self.occupation, other.occupation) \
+            and np.array_equal(self.atom_index, other.atom_index) \
+            and np.array_equal(self.atoms, other.atoms) \
+            and np.array_equal(self.aos, other.aos) \
+            and np.array_equal(self.val, other.val)
 
     def __iter__(self):
-        for orb in self.orb_list:
-            yield orb
+        for i in range(len(self)):
+            yield MOrbital._view(self, i)
 
     def __len__(self):
-        return len(self.orb_list)
+        return len(self.mo_index)
 
     def __getitem__(self, index):
-        return self.orb_list[index]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return MOrbital._view(self, range(len(self))[index])
 
     def __setitem__(self, index, value):
-        if not isinstance(value, Orbital):
-            raise SyntaxError(f'Must be an Orbital, got: {type(value)}')
-        self.orb_list[index] = value
+        if not isinstance(value, MOrbital):
+            raise SyntaxError(f'Must be an MOrbital, got: {type(value)}')
+        index = range(len(self))[index]
+        self._set_arrays(**OrbitalPopulation.concatenate([
+            self.range(0, index), OrbitalPopulation(orb_list=[value]), self.range(index + 1, None)
+        ]).arrays())
 
     def __str__(self):
-        return '\n\n'.join([f'{orb}' for orb in self.orb_list])
+        return '\n\n'.join([f'{orb}' for orb in self])
 
     def __sub__(self, other):
-        # TODO: Fix MOrbital indexing problem
-        if len(self) != len(other):
-            Warning(f'Differing number of orbitals ({len(self)} != {len(other)}), '
-                     'output will be truncated')
+        """
+        Subtract the energies, occupations and contributions of another OP
+        Orbitals are matched by (spin, index) and contributions by (atom index, atom, AO),
+        missing values are taken as 0
+        """
+        mo_codes, ao_codes, mo_keys, ao_keys, atom_labels, ao_labels = \
+            OrbitalPopulation._align_keys([self, other])
+        energy, occupation = np.zeros(len(mo_keys)), np.zeros(len(mo_keys))
+        energy[mo_codes[0]] += self.energy
+        energy[mo_codes[1]] -= other.energy
+        occupation[mo_codes[0]] += self.occupation
+        occupation[mo_codes[1]] -= other.occupation
+
+        mos = np.concatenate([mo_codes[0][self.mo_positions()], mo_codes[1][other.mo_positions()]])
+        aos = np.concatenate(ao_codes)
+        _, first, inverse = np.unique(mos * len(ao_keys) + aos, return_index=True,
+                                      return_inverse=True)
+        val = np.bincount(inverse.reshape(-1), weights=np.concatenate([self.val, -other.val]),
+                          minlength=len(first))
+        # Contributions are ordered as in self, followed by those only in other
+        order = np.lexsort((first, mos[first]))
+        first, val = first[order], val[order]
+        keys = ao_keys[aos[first]]
+        return OrbitalPopulation.from_arrays(mo_keys[:, 1], mo_keys[:, 0], energy, occupation,
+                                             _offsets(mos[first], len(mo_keys)), keys[:, 0],
+                                             keys[:, 1], keys[:, 2], val, atom_labels, ao_labels)
+
+    @staticmethod
+    def _align_keys(populations):
+        """
+        Code the orbitals by (spin, index) and the contributions by (atom index, atom, AO)
+        :return: MO codes and contribution codes of each OP, MO keys (n_mos, 2) as (spin, index),
+            AO keys (n_aos, 3) as (atom index, atom code, AO code), atom_labels, ao_labels
+        """
+        mo_keys = np.concatenate([np.stack([op.spin, op.mo_index], axis=1) for op in populations])
+        mo_codes, mo_keys = _codes(mo_keys)
+        atom_labels, atom_code = _encode(np.concatenate([op.atoms for op in populations]))
+        ao_labels, ao_code = _encode(np.concatenate([op.aos for op in populations]))
+        atom_index = np.concatenate([op.atom_index for op in populations])
+        ao_codes, ao_keys = _codes(np.stack([atom_index, atom_code, ao_code], axis=1))
+
+        mo_splits = np.cumsum([len(op) for op in populations])[:-1]
+        ao_splits = np.cumsum([len(op.val) for op in populations])[:-1]
+        return (np.split(mo_codes, mo_splits), np.split(ao_codes, ao_splits), mo_keys, ao_keys,
+                atom_labels, ao_labels)
 
-        min_len = min(len(self), len(other))
-        orb_list = [s - o for s, o in zip(self[:min_len], other[:min_len][:min_len])]
+    @staticmethod
+    def align(populations):
+        """
+        Align the contributions of many OPs (e.g. along a reaction path) for comparison
+        Orbitals are matched by (spin, index) and contributions by (atom index, atom, AO),
+        contract first (e.g. atom_contract) to compare large systems
+            mo_keys, ao_keys, contributions = OrbitalPopulation.align(ops)
+            changes = np.diff(contributions, axis=0)
+        :return: MO keys as a list of (spin, index), AO keys as a list of (atom index, atom, AO),
+            np.array of the contributions (n_populations, n_mos, n_aos) with 0 where missing
+        """
+        mo_codes, ao_codes, mo_keys, ao_keys, atom_labels, ao_labels = \
+            OrbitalPopulation._align_keys(populations)
+        contributions = np.zeros((len(populations), len(mo_keys), len(ao_keys)))
+        for i, (op, mos, aos) in enumerate(zip(populations, mo_codes, ao_codes)):
+            contributions[i, mos[op.mo_positions()], aos] = op.val
+
+        mo_keys = [(spin or None, index) for spin, index in mo_keys.tolist()]
+        ao_keys = [(index, str(atom_labels[atom]), str(ao_labels[ao]))
+                   for index, atom, ao in ao_keys.tolist()]
+        return mo_keys, ao_keys, contributions
+
+    def _contributions(self, i):
+        """AO_Contribs of the ith MO"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        spin = int(self.spin[i]) or None
+        atoms = self.atom_labels[self.atom_code[start:end]].tolist()
+        aos = self.ao_labels[self.ao_code[start:end]].tolist()
+        return [AO_Contrib(index, atom, ao, val, spin) for index, atom, ao, val in
+                zip(self.atom_index[start:end].tolist(), atoms, aos, self.val[start:end].tolist())]
+
+    def _take(self, idxs, mos=None):
+        """
+        Make an OP with only the specified contributions
+        :param idxs: indices of the contributions to keep, grouped by MO
+        :param mos: MO positions of the kept contributions
+        """
+        if mos is None:
+            mos = self.mo_positions()[idxs]
+        arrays = self.arrays()
+        arrays['offsets'] = _offsets(mos, len(self))
+        for key in ['atom_index', 'atom_code', 'ao_code', 'val']:
+            arrays[key] = arrays[key][idxs]
+        return OrbitalPopulation.from_arrays(**arrays)
+
+    def _contract(self, keys, shape, ao_code, ao_labels):
+        """
+        Make an OP with the contributions of the same key added
+        :param keys: flat index of each contribution into an array of shape (n_mos, *shape)
+        :param ao_code: AO code of each key along the last axis of shape
+        :return: contracted OP, sorted by key
+        """
+        size = len(self) * int(np.prod(shape))
+        matrix = np.bincount(keys, weights=self.val, minlength=size)
+        present = np.flatnonzero(np.bincount(keys, minlength=size))
+        mos, *idxs = np.unravel_index(present, (len(self), *shape))
+
+        # Label each atom by its first contribution
+        atoms, first = np.unique(self.atom_index, return_index=True)
+        atom_code = np.zeros(shape[0], dtype=int)
+        atom_code[atoms] = self.atom_code[first]
+
+        arrays = self.arrays()
+        arrays['spin'] = np.zeros_like(self.spin)
+        arrays['offsets'] = _offsets(mos, len(self))
+        arrays['atom_index'] = idxs[0]
+        arrays['atom_code'] = atom_code[idxs[0]]
+        arrays['ao_code'] = ao_code[idxs[-1]] if len(shape) > 1 else np.zeros_like(idxs[0])
+        arrays['val'] = matrix[present]
+        arrays['ao_labels'] = ao_labels
+        return OrbitalPopulation.from_arrays(**arrays)
+
+    def _am(self):
+        """Index into am_types of each contribution (the first character of the AO label)"""
+        ao_am = np.array([am_types.index(ao[0]) for ao in self.ao_labels], dtype=int)
+        return ao_am[self.ao_code]
+
+    @property
+    def n_atoms(self):
+        """Number of atoms (assuming the last atom contributes to an MO)"""
+        return int(self.atom_index.max()) + 1 if len(self.atom_index) else 0
+
+    def atom_matrix(self):
+        """
+        Contributions of each atom to each MO
+        :return: array of shape (n_mos, n_atoms)
+        """
+        keys = self.mo_positions() * self.n_atoms + self.atom_index
+        return np.bincount(keys, weights=self.val,
+                           minlength=len(self) * self.n_atoms).reshape(len(self), self.n_atoms)
+
+    def am_matrix(self):
+        """
+        Contributions of each am type (see am_types) on each atom to each MO
+        :return: array of shape (n_mos, n_atoms, len(am_types))
+        """
+        shape = (len(self), self.n_atoms, len(am_types))
+        keys = (self.mo_positions() * self.n_atoms + self.atom_index) * len(am_types) + self._am()
+        return np.bincount(keys, weights=self.val, minlength=int(np.prod(shape))).reshape(shape)
 
-        return OrbitalPopulation(orb_list=orb_list)
+    @staticmethod
+    def concatenate(populations):
+        """Join the orbitals of multiple OPs"""
+        arrays = _arrays(*[np.concatenate([getattr(op, key) for op in populations]) for key in
+                           ['mo_index', 'spin', 'energy', 'occupation']],
+                         np.concatenate([np.diff(op.offsets) for op in populations]),
+                         np.concatenate([op.atom_index for op in populations]),
+                         np.concatenate([op.atoms for op in populations]),
+                         np.concatenate([op.aos for op in populations]),
+                         np.concatenate([op.val for op in populations]))
+        return OrbitalPopulation.from_arrays(**arrays)
 
     def csv(self):
-        return '\n\n'.join([orb.csv() for orb in self.orb_list])
+        return '\n\n'.join([orb.csv() for orb in self])
 
     def write(self, file_name, format='str'):
         """
         Write to a file
-        """
-        if format == 'str':
+        :param format: str, csv, latex, or npz (binary, the columnar arrays)
+        """
+        if format == 'npz':
+            # The extension is needed to read it back (and np.savez would append it to the name)
+            if not file_name.endswith('.npz'):
+                raise SyntaxError(f'npz files must end with .npz, got: {file_name}')
+            with open(file_name, 'wb') as f:
+                np.savez(f, **self.arrays())
+            return
+        elif format == 'str':
             out = f'{self}'
         elif format == 'csv':
             out = self.csv()
         elif format == 'latex':
-            out = '\n\n'.join([orb.latex() for orb in self.orb_list])
+            out = '\n\n'.join([orb.latex() for orb in self])
         else:
             raise SyntaxError(f'Invalid write format: {format}')
 
@@ -78,38 +412,63 @@ class OrbitalPopulation:
         Generates a sorted ROP
         """
         if key == 'index':
-            sort_key = lambda x: x.index
+            sort_key = self.atom_index
         elif key == 'atom':
-            sort_key = lambda x: x.atom
+            sort_key = np.argsort(np.argsort(self.atom_labels))[self.atom_code]
         elif key == 'ao':
-            sort_key = lambda x: x.ao
+            sort_key = np.argsort(np.argsort(self.ao_labels))[self.ao_code]
         elif key == 'contribution':
-            sort_key = lambda x: x.val
+            sort_key = self.val
         elif key == 'spin':
-            sort_key = lambda x: x.spin
+            sort_key = self.spin[self.mo_positions()]
         else:
             raise SyntaxError(f'Invalid key given to sorted: {key}')
 
-        orb_list = []
-        for mo in self.orb_list:
-            contribs = sorted(mo.contributions, key=sort_key, reverse=True)
-            orb_list.append(MOrbital(mo.index, mo.spin, mo.energy, mo.occupation, contribs))
-
-        return OrbitalPopulation(orb_list=orb_list)
+        # Stable descending sort within each MO
+        return self._take(np.lexsort((-sort_key, self.mo_positions())))
+
+    def _index(self, key):
+        """
+        Get an index for queries, building it the first time
+        WARNING: the indexes are not updated if the arrays are modified in place
+        """
+        if key not in self._indexes:
+            if key == 'fermi':
+                somo = np.flatnonzero(self.occupation == 1).tolist()
+                index = (_homo(self.occupation), _lumo(self.occupation), somo)
+            elif key == 'frontier':
+                # Highest occupied and lowest unoccupied orbital of each spin
+                index = {}
+                for spin in np.unique(self.spin).tolist():
+                    positions = np.flatnonzero(self.spin == spin)
+                    occupied = self.occupation[positions] > 0
+                    homo = int(positions[occupied][-1]) if occupied.any() else None
+                    lumo = int(positions[~occupied][0]) if not occupied.all() else None
+                    index[spin or None] = (homo, lumo)
+            elif key == 'atoms':
+                # Atom indices of each label
+                index = {}
+                atoms, first = np.unique(self.atom_index, return_index=True)
+                for atom, label in zip(atoms.tolist(), self.atoms[first].tolist()):
+                    index.setdefault(label, []).append(atom)
+            elif key == 'atom_matrix':
+                index = self.atom_matrix()
+            elif key == 'am_matrix':
+                index = self.am_matrix()
+            else:
+                raise ValueError(f'Unknown index: {key}')
+            self._indexes[key] = index
+        return self._indexes[key]
 
     @property
     def homo(self):
         """
         Returns the index of the HOMO
-        Does not work for UHF (the HOMO is not well defined)
+        Does not work for UHF (the HOMO is not well defined), see frontier
 
         WARNING: 0-indexed
         """
-        for i, orb in enumerate(self):
-            if orb.occupation < 2:
-                return i - 1
-
-        return None
+        return self._index('fermi')[0]
 
     @property
     def lumo(self):
@@ -118,11 +477,7 @@ class OrbitalPopulation:
 
         WARNING: 0-indexed
         """
-        for i, orb in enumerate(self):
-            if orb.occupation == 0:
-                return i
-
-        return None
+        return self._index('fermi')[1]
 
     @property
     def somo(self):
@@ -131,12 +486,63 @@ class OrbitalPopulation:
 
         WARNING: 0-indexed
         """
-        somos = []
-        for i, orb in enumerate(self):
-            if orb.occupation == 1:
-                somos.append(i)
+        return list(self._index('fermi')[2])
+
+    def frontier(self, spin=None):
+        """
+        Returns the indices of the highest occupied and lowest unoccupied orbitals of a spin
+
+        WARNING: 0-indexed
+        :param spin: 1 for α, -1 for β, None for restricted
+        :return: homo, lumo (None if there is no such orbital)
+        """
+        return self._index('frontier').get(spin, (None, None))
+
+    def occupied(self, spin=None):
+        """
+        Returns the indices of the occupied orbitals
+
+        WARNING: 0-indexed
+        :param spin: 1 for α, -1 for β, None for all
+        """
+        if spin is None:
+            return np.flatnonzero(self.occupation > 0)
+        return np.flatnonzero((self.occupation > 0) & (self.spin == spin))
+
+    def _atom_indices(self, atom):
+        """Indices of the atoms matching an atom index or label"""
+        if isinstance(atom, str):
+            return self._index('atoms').get(atom, [])
+        elif isinstance(atom, (int, np.integer)):
+            return [atom] if 0 <= atom < self.n_atoms else []
+        raise SyntaxError(f'Atom specifier must be either an int or str, got: {type(atom)}')
+
+    def atom_sum(self, atom, mos=None):
+        """
+        Sum over all the contributions from an atom to each orbital
+        :param atom: atom index, or atom label (sums over all atoms with the label)
+        :param mos: indices of the orbitals (default: all)
+        :return: np.array of the contribution to each orbital
+        """
+        matrix = self._index('atom_matrix')
+        matrix = matrix if mos is None else matrix[mos]
+        return matrix[:, self._atom_indices(atom)].sum(axis=1)
 
-        return somos
+    def orbital_type_sum(self, atom, am_type, mos=None):
+        """
+        Sum over all the contributions from am_type on the specified atom to each orbital
+        e.g. the d character of Fe in all occupied orbitals
+            op.orbital_type_sum('Fe', 'd', op.occupied())
+        :param atom: atom index, or atom label (sums over all atoms with the label)
+        :param am_type: angular momentum type (see am_types)
+        :param mos: indices of the orbitals (default: all)
+        :return: np.array of the contribution to each orbital
+        """
+        if am_type not in am_types:
+            raise Exception(f'Invalid am_type, got: {am_type}, expected {am_types}')
+        matrix = self._index('am_matrix')[..., am_types.index(am_type)]
+        matrix = matrix if mos is None else matrix[mos]
+        return matrix[:, self._atom_indices(atom)].sum(axis=1)
 
     def append(self, orbital):
         """
@@ -144,55 +550,73 @@ class OrbitalPopulation:
         """
         if not isinstance(orbital, MOrbital):
             raise SyntaxError(f'You may only append Orbitals, got: type{orbital}')
-        self.orb_list.append(orbital)
+        other = OrbitalPopulation(orb_list=[orbital])
+        self._set_arrays(**OrbitalPopulation.concatenate([self, other]).arrays())
 
     def atom_contract(self):
         """
         Contracts all atom AO_Contributions together (i.e. adds)
         """
-        return OrbitalPopulation(orb_list=[orb.atom_contract() for orb in self])
+        keys = self.mo_positions() * self.n_atoms + self.atom_index
+        return self._contract(keys, (self.n_atoms,), None, np.array(['']))
 
     def am_contract(self):
         """
         Contracts all AO_Contributions of the same am together (i.e. adds)
         """
-        return OrbitalPopulation(orb_list=[orb.am_contract() for orb in self])
+        am = self._am()
+        keys = (self.mo_positions() * self.n_atoms + self.atom_index) * len(am_types) + am
+        shape = (self.n_atoms, len(am_types))
+        return self._contract(keys, shape, np.arange(len(am_types)), np.array(list(am_types)))
 
     def crop(self, max_num=5, min_num=2, cutoff=5):
         """
         Make an ROP that removes the smallest contributors
         """
-        orb_list = []
-        for mo in self.orb_list:
-            contribs = []
-            for contrib in sorted(mo.contributions, key=lambda x: x.val, reverse=True):
-                if contrib.val < cutoff and len(contribs) >= min_num:
-                    break
-
-                contribs.append(contrib)
-
-                if len(contribs) == max_num:
-                    break
-            orb_list.append(MOrbital(mo.index, mo.spin, mo.energy, mo.occupation, contribs))
-
-        return OrbitalPopulation(orb_list=orb_list)
+        mos = self.mo_positions()
+        order = np.lexsort((-self.val, mos))
+        # Rank of each contribution within its MO (from largest to smallest)
+        rank = np.arange(len(order)) - self.offsets[mos]
+        keep = (rank < max_num) & ((rank < min_num) | (self.val[order] >= cutoff))
+        return self._take(order[keep], mos[keep])
 
     def range(self, low, high):
         """
         Make an OP with a restricted range of orbitals
         """
-        return OrbitalPopulation(orb_list=self.orb_list[low:high])
+        positions = np.arange(len(self))[low:high]
+        start, end = (positions[0], positions[-1] + 1) if len(positions) else (0, 0)
+        arrays = self.arrays()
+        for key in ['mo_index', 'spin', 'energy', 'occupation']:
+            arrays[key] = arrays[key][start:end]
+        arrays['offsets'] = self.offsets[start:end + 1] - self.offsets[start]
+        for key in ['atom_index', 'atom_code', 'ao_code', 'val']:
+            arrays[key] = arrays[key][self.offsets[start]:self.offsets[end]]
+        return OrbitalPopulation.from_arrays(**arrays)
 
     @staticmethod
-    def read(file_name, method='lowdin'):
-        """Read the orbital populations"""
-        if file_name.split('.')[-1] == 'csv':
-            return OrbitalPopulation._read_csv(file_name, method=method)
+    def read(file_name, method='lowdin', mo_range=None):
+        """
+        Read the orbital populations
+        :param mo_range: only read the orbitals in (low, high) (as in range), or if an int n,
+            the n orbitals below and above the Fermi level (HOMO - n + 1 to LUMO + n)
+        :return: dictionary of the columnar arrays (see from_arrays)
+        """
+        extension = file_name.split('.')[-1]
+        if extension in ['csv', 'npz']:
+            if extension == 'csv':
+                arrays = OrbitalPopulation._read_csv(file_name, method=method)
+            else:
+                arrays = OrbitalPopulation._read_npz(file_name)
+            if mo_range is None:
+                return arrays
+            low, high = _window(arrays['occupation'], mo_range)
+            return OrbitalPopulation.from_arrays(**arrays).range(low, high).arrays()
         else:
-            return OrbitalPopulation._read_orca(file_name, method=method)
+            return OrbitalPopulation._read_orca(file_name, method=method, mo_range=mo_range)
 
     @staticmethod
-    def _read_orca(file_name, method='lowdin'):
+    def _read_orca(file_name, method='lowdin', mo_range=None):
         """Löwdin
 ------------------------------------------
 LOEWDIN REDUCED ORBITAL POPULATIONS PER MO
@@ -211,81 +635,129 @@ SPIN UP
 
 ...
 Three blank lines
-"""
-        orb_list = []
-        spin = None
 
-        lowdin_re = r'''LOEWDIN REDUCED ORBITAL POPULATIONS PER MO.*?\n\n\n'''
-        if method == 'lowdin':
-            orb_pop_re = lowdin_re
-        else:
+The last analysis is found with a reverse search of the memory-mapped file and each block of
+(up to) 6 MOs is parsed all at once. Only blocks with orbitals in mo_range are parsed, the
+headers of the others are only read to find the Fermi level.
+"""
+        if method != 'lowdin':
             raise NotImplementedError('Only Löwdin Reduced Orbital Population Analysis is implemented')
 
-        with open(file_name) as f:
-            output = f.read()
-        matches = re.findall(orb_pop_re, output, re.MULTILINE + re.DOTALL)
-
-        first = True
-        if matches:
-            match = matches[-1].strip()
+        with open(file_name, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                mm = b''
+            try:
+                return OrbitalPopulation._parse_orca(mm, mo_range)
+            finally:
+                if isinstance(mm, mmap.mmap):
+                    mm.close()
 
-            blocks = match.split('\n\n')
-            for block in blocks:
-                lines = block.splitlines()
+    @staticmethod
+    def _parse_orca(mm, mo_range=None):
+        """Parse the last Löwdin reduced orbital population analysis in a memory-mapped output"""
+        start = mm.rfind(b'LOEWDIN REDUCED ORBITAL POPULATIONS PER MO')
+        # The analysis ends with three blank lines
+        end = mm.find(b'\n\n\n', start) if start >= 0 else -1
+        if end < 0:
+            raise Exception('Unable to find the start of Reduced Orbital Population analysis')
 
-                # Remove excess from the first block
-                if first:
-                    lines = lines[3:]
-                    first = False
+        # Skip the title, dashes and threshold
+        pos = start
+        for _ in range(3):
+            pos = mm.find(b'\n', pos, end) + 1
+
+        # Read the headers of every block, blocks are separated by a blank line
+        spin = 0
+        blocks = []
+        mo_index, spins, energies, occupations = [], [], [], []
+        while 0 < pos < end:
+            block_end = mm.find(b'\n\n', pos, end)
+            block_end = end if block_end < 0 else block_end
+            header = []
+            while len(header) < 4 and pos < block_end:
+                line_end = mm.find(b'\n', pos, block_end)
+                line_end = block_end if line_end < 0 else line_end
+                line = mm[pos:line_end].decode().strip()
+                pos = line_end + 1
                 # If open shell, an extra line is printed
-                if lines[0] == 'SPIN UP':
+                if line == 'SPIN UP':
                     spin = 1
-                    lines = lines[1:]
-                elif lines[0] == 'SPIN DOWN':
+                elif line == 'SPIN DOWN':
                     spin = -1
-                    lines = lines[1:]
-
-                # Parse out the header
-                indexes = map(int, lines[0].split())
-                orb_es = map(float, lines[1].split())
-                occs = map(float, lines[2].split())
-
-                # Generate orbitals (occupations added in next section)
-                orbs = [MOrbital(idx, spin, orb_e, occ) for idx, orb_e, occ in zip(indexes, orb_es, occs)]
-
-                # Parse out the orbital contributions
-                for line in lines[4:]:
-                    index, atom, ao, *vals = line.split()
-                    index = int(index)
-                    vals = map(float, vals)
-                    for i, val in enumerate(vals):
-                        # If there is occupation, this deletes all the appearances of 0.0
-                        # Due to rounding, the occupations will not add up to 100
-                        if val > 0:
-                            orbs[i].contributions.append(AO_Contrib(index, atom, ao, val, spin))
-
-                orb_list += orbs
-        else:
-            raise Exception('Unable to find the start of Reduced Orbital Population analysis')
-        return orb_list
+                else:
+                    header.append(line.split())
+            indexes, orb_es, occs, _ = header
+            blocks.append((len(mo_index), len(indexes), pos, block_end))
+            mo_index += indexes
+            energies += orb_es
+            occupations += occs
+            spins += [spin] * len(indexes)
+            pos = block_end + 2
+
+        occupation = np.array(occupations, dtype=float)
+        low, high = _window(occupation, mo_range)
+
+        # Start with empty arrays in case no blocks are in the window
+        counts, vals = [np.zeros(0, dtype=int)], [np.zeros(0)]
+        atom_index, atoms, aos = ([np.zeros(0, dtype=str)] for _ in range(3))
+        for first, n_mos, rows_start, block_end in blocks:
+            # Columns of the block in the window
+            col_low, col_high = max(low - first, 0), min(high - first, n_mos)
+            if col_low >= col_high:
+                continue
+            # Each row has the atom index, atom, AO, and a value for each MO in the block
+            tokens = mm[rows_start:block_end].decode().split()
+            width = 3 + n_mos
+            labels = [np.array(tokens[i::width], dtype=str) for i in range(3)]
+            for i in range(3):
+                del tokens[::width - i]
+            block_vals = np.array(tokens, dtype=float).reshape(-1, n_mos)[:, col_low:col_high]
+            # Only keep nonzero contributions, grouped by MO
+            # Due to rounding, the occupations will not add up to 100
+            cols, idxs = np.nonzero(block_vals.T > 0)
+            counts.append(np.bincount(cols, minlength=col_high - col_low))
+            atom_index.append(labels[0][idxs])
+            atoms.append(labels[1][idxs])
+            aos.append(labels[2][idxs])
+            vals.append(block_vals[idxs, cols])
+
+        return _arrays(mo_index[low:high], spins[low:high], energies[low:high],
+                       occupation[low:high], np.concatenate(counts), np.concatenate(atom_index),
+                       np.concatenate(atoms), np.concatenate(aos), np.concatenate(vals))
+
+    @staticmethod
+    def _read_npz(file_name):
+        """Read the columnar arrays written with write(format='npz')"""
+        with np.load(file_name) as data:
+            return {key: data[key] for key in data.files}
 
     @staticmethod
     def _read_csv(file_name, method='lowdin'):
         """Read the CSV output by the OrbitalPopulation class"""
         with open(file_name) as f:
             csv = f.read()
-        orb_list = []
+        spin_codes = {'α': 1, 'β': -1}
+        mo_index, spins, energies, occupations, counts = [], [], [], [], []
+        atom_index, atoms, aos, vals = [], [], [], []
         for block in csv.split('\n\n'):
             lines = block.strip().splitlines()
-            mo_index, spin, orb_e, occ = lines[0].split(',')
-            mo_index, orb_e, occ = int(mo_index), float(orb_e), round(float(occ))
-            aocs = []
+            index, spin, orb_e, occ = lines[0].split(',')
+            mo_index.append(int(index))
+            spins.append(spin_codes.get(spin.strip(), 0))
+            energies.append(float(orb_e))
+            occupations.append(round(float(occ)))
+            counts.append(len(lines) - 1)
             for line in lines[1:]:
                 index, atom, ao, val = line.split(',')
-                aocs.append(AO_Contrib(int(index), atom.strip(), ao.strip(), float(val), spin))
-            orb_list.append(MOrbital(mo_index, spin, orb_e, occ, aocs))
+                atom_index.append(int(index))
+                atoms.append(atom.strip())
+                aos.append(ao.strip())
+                vals.append(float(val))
 
-        return orb_list
+        return _arrays(mo_index, spins, energies, occupations, counts, atom_index, atoms, aos, vals)
 
 
 class MOrbital:
@@ -299,6 +771,33 @@ class MOrbital:
         self.energy = energy
         self.occupation = occupation
         self.contributions = contributions if contributions is not None else []
+        # (OrbitalPopulation, position) of views, whose contributions are made on access
+        self._source = None
+
+    @staticmethod
+    def _view(population, i):
+        """
+        View of the ith MO of an OrbitalPopulation
+        Changes to the view are not written back to the OrbitalPopulation, so its contributions
+        are a read-only tuple
+        """
+        spin = int(population.spin[i]) or None
+        orb = MOrbital(int(population.mo_index[i]), spin, float(population.energy[i]),
+                       float(population.occupation[i]))
+        orb._contributions = None
+        orb._source = (population, i)
+        return orb
+
+    @property
+    def contributions(self):
+        if self._contributions is None:
+            population, i = self._source
+            self._contributions = tuple(population._contributions(i))
+        return self._contributions
+
+    @contributions.setter
+    def contributions(self, contributions):
+        self._contributions = contributions
 
     def __eq__(self, other):
         """
@@ -315,6 +814,9 @@ class MOrbital:
         return False
 
     def __len__(self):
+        if self._contributions is None:
+            population, i = self._source
+            return int(population.offsets[i + 1] - population.offsets[i])
         return len(self.contributions)
 
     def __repr__(self):
@@ -325,23 +827,18 @@ class MOrbital:
         return f'{self.index: >2d}{self.gspin} {self.energy: >8.5f} {self.occupation:>3.2f}\n{contrib_str}'
 
     def __sub__(self, other):
-        if len(self) != len(other):
-            Warning('The MOrbitals are of different lengths.')
-            # raise ValueError('The MOrbitals are of different lengths.')
-        min_len = min(len(self), len(other))
+        """
+        Subtract another MOrbital, contributions are matched by (atom index, atom, AO)
+        """
+        orb = OrbitalPopulation(orb_list=[self])
+        other_orb = OrbitalPopulation(orb_list=[other])
+        # Always subtract, even if the MOrbitals differ
+        other_orb.mo_index, other_orb.spin = orb.mo_index, orb.spin
+        diff = (orb - other_orb)[0]
 
         index = self.index if self.index == other.index else 0
-        energy = self.energy - other.energy
-        occupation = self.occupation - other.occupation
-        contributions = []
-        for s, o in zip(self.contributions[:min_len], other.contributions[:min_len]):
-            contributions.append(s - o)
-
-        # Only appends from one list (the other is maxed out and returns an empty list)
-        contributions += self.contributions[min_len:] + other.contributions[min_len:]
-
         spin = self.spin if self.spin == other.spin else None
-        return MOrbital(index, spin, energy, occupation, contributions)
+        return MOrbital(index, spin, diff.energy, diff.occupation, list(diff.contributions))
 
     @property
     def gspin(self):
@@ -371,46 +868,23 @@ class MOrbital:
         """
         Contracts all atom AO_Contributions together (i.e. adds)
         """
-        # Dictionary of contracted ao_contributions
-        atoms = {}
-        for aoc in self.contributions:
-            index, val = aoc.index, aoc.val
-            if index in atoms:
-                atoms[index].val += val
-            else:
-                aoc = deepcopy(aoc)
-                aoc.ao = ''
-                atoms[index] = aoc
-
-        # Sort by atom index
-        contribs = sorted(atoms.values(), key=lambda x: x.index)
-        return MOrbital(self.index, None, self.energy, self.occupation, contribs)
+        orb = OrbitalPopulation(orb_list=[self]).atom_contract()[0]
+        return MOrbital(self.index, None, self.energy, self.occupation, orb.contributions)
 
     def am_contract(self):
         """
         Contracts all AO_Contributions of the same am together (i.e. adds)
         """
-        # Dictionary of contracted ao_contributions
-        atoms = {}
-        for aoc in self.contributions:
-            # First non-number corresponds to the am
-            index, am, val = aoc.index, aoc.ao[0], aoc.val
-            if (index, am) in atoms:
-                atoms[(index, am)].val += val
-            else:
-                aoc = deepcopy(aoc)
-                aoc.ao = am
-                atoms[(index, am)] = aoc
-
-        # Sort by atom index and then am_type
-        key = lambda x: (x.index, am_types.index(x.ao[0]))
-        contribs = sorted(atoms.values(), key=key)
-        return MOrbital(self.index, None, self.energy, self.occupation, contribs)
+        orb = OrbitalPopulation(orb_list=[self]).am_contract()[0]
+        return MOrbital(self.index, None, self.energy, self.occupation, orb.contributions)
 
     def atom_sum(self, atom):
         """
         Sum over all the contributions from an atom
         """
+        if self._contributions is None:
+            population, i = self._source
+            return float(population.atom_sum(atom, [i])[0])
         val = 0
         if isinstance(atom, str):
             for ao_contrib in self.contributions:
@@ -429,6 +903,9 @@ class MOrbital:
         """
         Sum over all the contributions from am_type on the specified atom
         """
+        if self._contributions is None:
+            population, i = self._source
+            return float(population.orbital_type_sum(atom, am_type, [i])[0])
         if am_type not in am_types:
             raise Exception(f'Invalid am_type, got: {am_type}, expected {am_types}')
         val = 0
@@ -450,6 +927,8 @@ class AO_Contrib:
     """
     Simple class containing an AO and its contribution to an MOrbital
     """
+    __slots__ = ('index', 'atom', 'ao', 'val', 'spin')
+
     def __init__(self, index, atom, ao, val, spin=None):
         self.index = index
         self.atom = atom
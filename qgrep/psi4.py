@@ -1,4 +1,5 @@
 """Source for all psi4 related functions"""
+from .trajectory import Trajectory
 
 
 def get_geom(lines, geom_type='xyz', units='Angstroms'):
@@ -57,8 +58,8 @@ def get_geom(lines, geom_type='xyz', units='Angstroms'):
         return geom
 
 
-def plot(lines, geom_type='xyz'):
-    """Plots the geometries from the optimization steps"""
+def geom_blocks(lines):
+    """Returns the lines of the geometry of each optimization step"""
     start = '\tCartesian Geometry (in Angstrom)\n'
     end = '\t\t\t OPTKING Finished Execution \n'
 
@@ -70,22 +71,20 @@ def plot(lines, geom_type='xyz'):
         if end == lines[i]:
             geoms_end.append(i - 1)
 
+    blocks = [lines[start:end] for start, end in zip(geoms_start, geoms_end)]
     # Last optimization step has an extra line after it
-    geoms = []
-    length = geoms_end[0] - geoms_start[0]
-    last = False
-    for i in range(len(geoms_start)):
-        if i == len(geoms_start) - 1 and completed(lines):
-            last = True
+    if blocks and completed(lines):
+        blocks[-1] = blocks[-1][:-1]
 
-        start = geoms_start[i]
-        end = geoms_end[i]
-        if end - start != length:
-            length = end - start
+    return blocks
 
-        geom = f'{length}\nStep {i}\n'
 
-        for line in lines[start:end - int(last)]:
+def plot(lines, geom_type='xyz'):
+    """Plots the geometries from the optimization steps"""
+    geoms = []
+    for i, block in enumerate(geom_blocks(lines)):
+        geom = f'{len(block)}\nStep {i}\n'
+        for line in block:
             geom += '\t'.join(line.split()) + '\n'
 
         geoms.append(geom)
@@ -93,6 +92,11 @@ def plot(lines, geom_type='xyz'):
     return geoms
 
 
+def get_trajectory(lines):
+    """Returns a Trajectory of the geometries from the optimization steps"""
+    return Trajectory.from_blocks(geom_blocks(lines))
+
+
 def check_convergence(lines):
     """Returns all the geometry convergence results"""
     convergence_result = '  ==> Convergence Check <==\n'
@@ -1,73 +1,125 @@
-import re
+import numpy as np
 
 from more_itertools import collapse
 
+from .internals import KINDS, parse_definition
+
+# Coordinates that are compared together, linear bends are compared with the other angles
+GROUPS = {'Bond': 'B', 'Angle': 'AL', 'Dihedral': 'D'}
+METRICS = ['sad', 'mad', 'rmsd', 'max']
+
+
+def canonical_id(kind, atoms, component=None):
+    """
+    Canonical ID of an internal coordinate, the same in either direction through the atoms
+    :param kind: B, A, L, or D
+    :param atoms: atom indices
+    :param component: component of a linear bend
+    :return: tuple of the kind, atoms, and component (if given)
+    """
+    atoms = tuple(atoms)
+    # Linear bends are defined by the first three atoms, the fourth only sets the plane
+    n = 3 if kind == 'L' else len(atoms)
+    if atoms[n - 1] < atoms[0]:
+        atoms = atoms[:n][::-1] + atoms[n:]
+    if component is not None:
+        return (kind,) + atoms + (component,)
+    return (kind,) + atoms
+
 
 class RedundantInternals:
     """Redundant Internal Coordinates"""
     def __init__(self, lines):
-        self.bond_vals, self.angle_vals, self.linear_vals, self.dihredal_vals = RedundantInternals.read(lines)
+        self.ids, self.values, self.atom_names, self.constrained = RedundantInternals.read(lines)
+        self.index = {cid: i for i, cid in enumerate(self.ids)}
+
+    def __len__(self):
+        """Return the number of internal coordinates"""
+        return len(self.ids)
+
+    def vals(self, kinds):
+        """
+        Values in the old list format, e.g. [(idx1, atom1), (idx2, atom2), final] for bonds
+        :param kinds: kinds of coordinates to include (e.g. 'AL' for angles and linear bends)
+        """
+        out = []
+        for cid, final in zip(self.ids, self.values.tolist()):
+            if cid[0] in kinds:
+                n = KINDS[cid[0]]
+                atoms = [(idx, self.atom_names[idx]) for idx in cid[1:1 + n]]
+                out.append(atoms + list(cid[1 + n:]) + [final])
+        return out
+
+    @property
+    def bond_vals(self):
+        return self.vals('B')
+
+    @property
+    def angle_vals(self):
+        return self.vals('A')
+
+    @property
+    def linear_vals(self):
+        return self.vals('L')
+
+    @property
+    def dihedral_vals(self):
+        return self.vals('D')
+
+    def format(self, cid, value, decimals=4):
+        """Format a coordinate as idx1 atom1-idx2 atom2... = value"""
+        atoms = cid[1:1 + KINDS[cid[0]]]
+        f = '-'.join(['{:>3} {:<2}']*len(atoms)) + f' = {{:> {decimals + 1}.{decimals}f}}'
+        return f.format(*collapse((idx, self.atom_names[idx]) for idx in atoms), value)
 
     def print(self, bonds=True, angles=False, dihedrals=False):
         """ Print values """
         out = ''
-        if bonds:
-            for *atoms, final in self.bond_vals:
-                f = '-'.join(['{:>3} {:<2}']*int(len(atoms))) + f' = {final:> 5.4f}\n'
-                out += f.format(*collapse(atoms))
-
-        if angles:
-            for val in self.angle_vals + self.linear_vals:
-                pass
-        if dihedrals:
-            for val in self.dihedral_vals:
-                pass
+        for group, decimals, include in zip(GROUPS.values(), (4, 2, 2), (bonds, angles, dihedrals)):
+            if include:
+                for cid, final in zip(self.ids, self.values.tolist()):
+                    if cid[0] in group:
+                        out += self.format(cid, final, decimals) + '\n'
 
         return out
 
-
     def diffs(self, other, thresh=(3, 2, 2)):
         """
         Difference between two sets of redundant internals
-        Warning, must be exactly the same numbering of the geometry
+        Coordinates are matched by their atoms, so both must use the same numbering
         :param thresh: list of threshold values for comparison printing
                         if thresh[i] = None, no cutting will be done
+        :return: number of coordinates only in one of the sets for each group
         """
-        def check(vals1, vals2, thresh=3):
-            mismatch = 0
-            for (*atoms1, final1), (*atoms2, final2) in zip(vals1, vals2):
-                if atoms1 != atoms2:
-                    mismatch += 1
-                    continue
-                if thresh is None or abs(final2 - final1) > 10**-thresh:
-                    f = '-'.join(['{:>3} {:<2}']*int(len(atoms1))) + (' = {:> 5.' + f'{thresh}' + 'f}').format(final2 - final1)
-                    print(f.format(*collapse(atoms1)))
-            return mismatch
-        print('Bonds')
-        mismatch = check(self.bond_vals, other.bond_vals, thresh=thresh[0])
-        print(f'Bond Mismatch: {mismatch}')
-        #print('\nAngles')
-        #mistmatch = check(self.angle_vals, other.angle_vals, thresh=thresh[1])
-        #print(f'Angle Mismatch: {mismatch}')
-
-    def diff_metric(self, other, metric='sad'):
-        mismatch = 0
-        diff = 0
-        for (*atoms1, final1), (*atoms2, final2) in zip(self.bond_vals, other.bond_vals):
-            if atoms1 != atoms2:
-                mismatch += 1
-                continue
-            # Sum of absolute deviation
-            if metric == 'sad':
-                diff += abs(final2 - final1)
+        mismatches = []
+        for (group, kinds), t in zip(GROUPS.items(), thresh):
+            ids, values = align([self, other], kinds)
+            diff = deviations(ids, values, 0)[1]
+            decimals = 3 if t is None else t
+            print(f'{group}s')
+            for cid, d in zip(ids, diff.tolist()):
+                if not np.isnan(d) and (t is None or abs(d) > 10**-t):
+                    print(self.format(cid, d, decimals))
+            mismatches.append(int(np.isnan(diff).sum()))
+            print(f'{group} Mismatch: {mismatches[-1]}')
+        return mismatches
+
+    def diff_metric(self, other, metric='sad', kinds='B'):
+        """
+        Compare two sets of redundant internals with a metric (see diff_matrix)
+        :return: value of the metric
+        """
+        ids, values = align([self, other], kinds)
+        diff = reduce_deviations(deviations(ids, values, 0)[1], metric)
         print(diff)
-        print(f'Bond Mismatch: {mismatch}')
+        print(f'Mismatch: {int(np.isnan(values).any(axis=0).sum())}')
+        return diff
 
-
-    def read(lines, sort=True):
+    @staticmethod
+    def read(lines):
         """
-        Parse the Redundant Internal Coordinates from an Orca output file
-        TODO: Make work for Dihedrals
+        Parse the last set of Redundant Internal Coordinates from an Orca output file
+        :return: canonical IDs, final values, dictionary of atom names, constrained flags
         """
         """
     ---------------------------------------------------------------------------
@@ -82,6 +134,7 @@ class RedundantInternals:
     37. A(C   4,C   0,C  17)          113.60 -0.000000   -0.00    113.60
     92. L(C  21,C  22,N  23,C  24, 2) 179.99 -0.000002    0.00    179.99
     97. D(C   2,O   1,C   0,C   4)     -0.02 -0.000001    0.00     -0.02
+     6. B(F   5,C   0)                2.7429  0.001320 -0.0000    2.7429 C
 """
 
         start = -1
@@ -92,47 +145,102 @@ class RedundantInternals:
         if start == -1:
             raise Exception('Cannot find the start of the redundant internals')
 
-        regex = r'\d+\.\s+(\w)\((\w+)\s+(\d+),(\w+)\s+(\d+)(,\w+\s+\d+)?(,\w+\s+\d+)?(,\s*\d+)?\)\s+(-?\d+\.\d+)\s+(-?\d+\.\d+)\s+(-?\d+\.\d+)\s+(\d+\.\d+)'
-
-        bond_vals = []
-        angle_vals = []
-        linear_vals = []
-        dihedral_vals = []
+        ids, values, constrained = [], [], []
+        atom_names = {}
         for line in lines[start:]:
             line = line.strip()
-            if line[0] == '-':
+            if not line or line[0] == '-':
                 break
 
-            try:
-                t, atom1, idx1, atom2, idx2, atom_idx3, atom_idx4, other, old, slope, step, final = re.search(regex, line).groups()
-            except AttributeError as e:
-                pass
-
-            if atom_idx3:
-                atom3, idx3 = atom_idx3[1:].split()
-                if atom_idx4:
-                    atom4, idx4 = atom_idx4[1:].split()
-                    if other:
-                        other = other[1:].strip()
-
-            if t == 'B':
-                pair1, pair2 = sorted(((int(idx1), atom1), (int(idx2), atom2)))
-                bond_vals.append([pair1, pair2, float(final)])
-            elif t == 'A':
-                pair1, pair2, pair3 = sorted(((int(idx1), atom1), (int(idx2), atom2), (int(idx3), atom3)))
-                angle_vals.append([pair1, pair2, pair3, float(final)])
-            elif t == 'L':
-                pair1, pair2, pair3, pair4 = sorted(((int(idx1), atom1), (int(idx2), atom2), (int(idx3), atom3), (int(idx4), atom4)))
-                linear_vals.append([pair1, pair2, pair3, pair4, other, float(final)])
-            elif t == 'D':
-                pair1, pair2, pair3, pair4 = sorted(((int(idx1), atom1), (int(idx2), atom2), (int(idx3), atom3), (int(idx4), atom4)))
-                dihedral_vals.append([pair1, pair2, pair3, pair4, float(final)])
-            else:
-                raise ValueError('Cannot identify coordinate type')
-
-        #bond_vals = sorted(bond_vals)
-        #angle_vals = sorted(angle_vals)
-        #linear_vals = sorted(linear_vals)
-        #dihedral_vals = sorted(dihedral_vals)
-
-        return bond_vals, angle_vals, linear_vals, dihedral_vals
+            end = line.index(')') + 1
+            definition = line[line.index('.') + 1:end].strip()
+            kind, atoms = parse_definition(definition)
+            fields = definition[2:-1].split(',')
+            for field in fields[:len(atoms)]:
+                name, idx = field.split()
+                atom_names[int(idx)] = name
+            component = int(fields[-1]) if len(fields) > len(atoms) else None
+
+            old, slope, step, final, *flags = line[end:].split()
+            ids.append(canonical_id(kind, atoms, component))
+            values.append(float(final))
+            constrained.append(flags == ['C'])
+
+        return ids, np.array(values), atom_names, np.array(constrained, dtype=bool)
+
+
+def align(internals, kinds='BALD'):
+    """
+    Align the coordinates of many sets of redundant internals by their canonical IDs
+    :param internals: list of RedundantInternals
+    :param kinds: kinds of coordinates to include
+    :return: list of IDs, values (n_sets, n_ids) that are nan where a set lacks a coordinate
+    """
+    index = {}
+    for ri in internals:
+        for cid in ri.ids:
+            if cid[0] in kinds and cid not in index:
+                index[cid] = len(index)
+
+    values = np.full((len(internals), len(index)), np.nan)
+    for i, ri in enumerate(internals):
+        columns = np.array([index.get(cid, -1) for cid in ri.ids], dtype=int)
+        keep = columns >= 0
+        values[i, columns[keep]] = ri.values[keep]
+    return list(index), values
+
+
+def deviations(ids, values, i):
+    """
+    Deviations of every set from the ith set, with dihedral differences wrapped to [-180, 180)
+    :param ids: list of canonical IDs
+    :param values: aligned values (n_sets, n_ids)
+    :param i: index of the reference set
+    :return: deviations (n_sets, n_ids), [j] is values[j] - values[i]
+    """
+    diff = values - values[i]
+    periodic = np.array([cid[0] == 'D' for cid in ids], dtype=bool)
+    diff[:, periodic] = (diff[:, periodic] + 180) % 360 - 180
+    return diff
+
+
+def reduce_deviations(diff, metric='sad'):
+    """
+    Reduce deviations with a metric over the last axis, skipping missing (nan) coordinates
+    :param diff: deviations (..., n_ids)
+    :param metric: see diff_matrix
+    :return: value of the metric (...)
+    """
+    if metric not in METRICS:
+        raise ValueError(f'Only [{", ".join(METRICS)}] currently supported, got: {metric}')
+    diff = np.abs(diff)
+    shared = ~np.isnan(diff)
+    diff[~shared] = 0
+    if metric == 'sad':
+        return diff.sum(axis=-1)
+    elif metric == 'max':
+        return diff.max(axis=-1, initial=0)
+    count = shared.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if metric == 'mad':
+            return diff.sum(axis=-1) / count
+        return np.sqrt((diff**2).sum(axis=-1) / count)
+
+
+def diff_matrix(internals, metric='sad', kinds='B'):
+    """
+    Compare every pair of sets of redundant internals, one row at a time to limit memory use
+    Only coordinates present in both sets of a pair are compared
+    :param internals: list of RedundantInternals (e.g. of many conformers or methods)
+    :param metric: sad (sum of absolute deviations), mad (mean absolute deviation),
+        rmsd (root mean squared deviation), or max (maximum absolute deviation)
+    :param kinds: kinds of coordinates to compare (mixing bonds and angles mixes units)
+    :return: matrix of the metric (n_sets, n_sets)
+    """
+    if metric not in METRICS:
+        raise ValueError(f'Only [{", ".join(METRICS)}] currently supported, got: {metric}')
+    ids, values = align(internals, kinds)
+    matrix = np.zeros((len(values), len(values)))
+    for i in range(len(values)):
+        matrix[i] = reduce_deviations(deviations(ids, values, i), metric)
+    return matrix
@@ -0,0 +1,180 @@
+"""Kabsch alignment and RMSD between geometries"""
+from itertools import product
+from multiprocessing import Pool
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    # Only needed for reordering atoms
+    linear_sum_assignment = None
+
+
+def centered(xyz):
+    """Translate the geometries so that their centroids are at the origin"""
+    xyz = np.asarray(xyz, dtype=float)
+    return xyz - xyz.mean(axis=-2, keepdims=True)
+
+
+def kabsch(p, q):
+    """
+    Find the rotation that best aligns p onto q (Kabsch algorithm), both should be centered
+    :param p: geometries (..., n_atoms, 3)
+    :param q: geometries (..., n_atoms, 3)
+    :return: rotation matrices (..., 3, 3), such that p @ R.T is aligned with q
+    """
+    u, s, vt = np.linalg.svd(np.swapaxes(p, -1, -2) @ q)
+    # Flip the smallest singular vector if needed to avoid reflections
+    d = np.sign(np.linalg.det(u @ vt))
+    vt[..., -1, :] *= np.where(d == 0, 1, d)[..., np.newaxis]
+    return np.swapaxes(u @ vt, -1, -2)
+
+
+def align(p, q):
+    """
+    Align p onto q (after centering both)
+    :param p: geometries (..., n_atoms, 3)
+    :param q: geometries (..., n_atoms, 3)
+    :return: p centered and rotated onto the centered q
+    """
+    p, q = centered(p), centered(q)
+    return p @ np.swapaxes(kabsch(p, q), -1, -2)
+
+
+def rmsd(p, q, align=True):
+    """
+    Root mean squared deviation between geometries, broadcasting over leading dimensions
+    :param p: geometries (..., n_atoms, 3)
+    :param q: geometries (..., n_atoms, 3)
+    :param align: find the RMSD after optimal translation and rotation
+    :return: RMSDs (...)
+    """
+    p, q = np.asarray(p, dtype=float), np.asarray(q, dtype=float)
+    if not align:
+        return np.sqrt(((p - q)**2).sum(axis=(-1, -2)) / p.shape[-2])
+    p, q = centered(p), centered(q)
+    # The optimal rotation overlaps the geometries by the sum of the (signed) singular values
+    h = np.swapaxes(p, -1, -2) @ q
+    s = np.linalg.svd(h, compute_uv=False)
+    s[..., -1] *= np.where(np.linalg.det(h) < 0, -1, 1)
+    msd = ((p**2).sum(axis=(-1, -2)) + (q**2).sum(axis=(-1, -2)) - 2 * s.sum(axis=-1))
+    return np.sqrt(np.maximum(msd, 0) / p.shape[-2])
+
+
+def _rmsd_rows(args):
+    """
+    RMSDs between a block of centered geometries and all later geometries
+    All covariance matrices of the block are found with a single matrix multiplication
+    """
+    frames, start, end = args
+    block, later = frames[start:end], frames[start:]
+    n_atoms = frames.shape[1]
+    rows = np.swapaxes(block, 1, 2).reshape(-1, n_atoms)
+    h = rows @ np.swapaxes(later, 0, 1).reshape(n_atoms, -1)
+    h = h.reshape(len(block), 3, len(later), 3).transpose(0, 2, 1, 3)
+    s = np.linalg.svd(h, compute_uv=False)
+    s[..., -1] *= np.where(np.linalg.det(h) < 0, -1, 1)
+    g = (frames**2).sum(axis=(1, 2))
+    msd = g[start:end, np.newaxis] + g[np.newaxis, start:] - 2 * s.sum(axis=-1)
+    return np.sqrt(np.maximum(msd, 0) / n_atoms)
+
+
+def _reorder_rmsd_rows(args):
+    """RMSDs between a block of geometries and all later geometries, reordering atoms"""
+    atoms, frames, start, end = args
+    out = np.zeros((end - start, len(frames) - start))
+    for i in range(start, end):
+        for j in range(i + 1, len(frames)):
+            order = reorder(atoms[i], frames[i], atoms[j], frames[j])
+            out[i - start, j - start] = rmsd(frames[i], frames[j][order])
+    return out
+
+
+def rmsd_matrix(frames, atoms=None, reorder_atoms=False, nprocs=1, block_size=64):
+    """
+    RMSD between all pairs of geometries (after alignment)
+    Without reordering, each block of rows is computed with one batched SVD
+    :param frames: geometries (n_frames, n_atoms, 3)
+    :param atoms: list of the atoms of each frame (only needed when reordering)
+    :param reorder_atoms: find the best mapping of the atoms for each pair (see reorder)
+    :param nprocs: number of processes to use
+    :param block_size: number of rows to compute at a time
+    :return: RMSDs (n_frames, n_frames)
+    """
+    frames = centered(frames)
+    n = len(frames)
+    if reorder_atoms:
+        if atoms is None:
+            raise ValueError('The atoms of each frame are needed to reorder atoms.')
+        jobs = [(atoms, frames, i, min(i + block_size, n)) for i in range(0, n, block_size)]
+        func = _reorder_rmsd_rows
+    else:
+        jobs = [(frames, i, min(i + block_size, n)) for i in range(0, n, block_size)]
+        func = _rmsd_rows
+
+    if nprocs > 1 and len(jobs) > 1:
+        with Pool(min(nprocs, len(jobs))) as pool:
+            rows = pool.map(func, jobs)
+    else:
+        rows = map(func, jobs)
+
+    # Only the upper triangle is computed
+    matrix = np.zeros((n, n))
+    for (*_, start, end), block in zip(jobs, rows):
+        matrix[start:end, start:] = block
+    matrix = np.triu(matrix, 1)
+    return matrix + matrix.T
+
+
+def _principal_axes(xyz):
+    """Principal axes of a centered geometry (columns), from largest to smallest extent"""
+    return np.linalg.eigh(xyz.T @ xyz)[1][:, ::-1]
+
+
+def _assign(atoms1, xyz1, atoms2, xyz2):
+    """Match atoms of the same element by minimizing the total squared distance (Hungarian)"""
+    order = np.zeros(len(atoms1), dtype=int)
+    for atom in np.unique(atoms1):
+        idxs1 = np.flatnonzero(atoms1 == atom)
+        idxs2 = np.flatnonzero(atoms2 == atom)
+        cost = ((xyz1[idxs1, np.newaxis] - xyz2[np.newaxis, idxs2])**2).sum(axis=-1)
+        rows, cols = linear_sum_assignment(cost)
+        order[idxs1[rows]] = idxs2[cols]
+    return order
+
+
+def reorder(atoms1, xyz1, atoms2, xyz2, iterations=3):
+    """
+    Find the mapping of the atoms of the second geometry onto the first that minimizes the RMSD
+    Only atoms of the same element are mapped onto each other. The geometries are first aligned
+    by their principal axes (trying all sign choices), and then the Hungarian assignment and
+    Kabsch alignment are alternated.
+    :param atoms1: atoms of the first geometry
+    :param xyz1: coordinates of the first geometry (n_atoms, 3)
+    :param atoms2: atoms of the second geometry
+    :param xyz2: coordinates of the second geometry (n_atoms, 3)
+    :param iterations: maximum number of assignment and alignment iterations
+    :return: order such that atoms2[order] == atoms1 and xyz2[order] best matches xyz1
+    """
+    if linear_sum_assignment is None:
+        raise ImportError('scipy is needed to reorder atoms.')
+    atoms1, atoms2 = np.asarray(atoms1), np.asarray(atoms2)
+    if sorted(atoms1) != sorted(atoms2):
+        raise ValueError('Cannot reorder geometries with different atoms.')
+    p, q = centered(xyz1), centered(xyz2)
+
+    best_order, best_rmsd = None, np.inf
+    axes_p, axes_q = _principal_axes(p), _principal_axes(q)
+    for signs in product((1, -1), repeat=3):
+        guess = q @ (axes_q * signs) @ axes_p.T
+        order = _assign(atoms1, p, atoms2, guess)
+        for _ in range(iterations):
+            value = rmsd(p, q[order])
+            if value < best_rmsd:
+                best_order, best_rmsd = order, value
+            new_order = _assign(atoms1, p, atoms2, align(q[order], p)[np.argsort(order)])
+            if (new_order == order).all():
+                break
+            order = new_order
+    return best_order
@@ -0,0 +1,278 @@
+"""Multi-frame geometries (e.g. optimizations, scans, and MD) with shared atoms"""
+import mmap
+
+import numpy as np
+
+from .molecule import Molecule
+
+
+class Trajectory:
+    def __init__(self, atoms, frames, comments=None):
+        """ Multiple geometries of the same atoms
+
+        :param atoms: list of atom names shared by all frames
+        :param frames: array of coordinates (n_frames, n_atoms, 3)
+        :param comments: list of comments for each frame (default: Step {i})
+        """
+        frames = np.asarray(frames, dtype=float)
+        if frames.ndim != 3 or frames.shape[1:] != (len(atoms), 3):
+            raise SyntaxError(
+                f'Expected frames of shape (n_frames, {len(atoms)}, 3), got: {frames.shape}'
+            )
+        if comments is not None and len(comments) != len(frames):
+            raise SyntaxError(f'Expected {len(frames)} comments, got: {len(comments)}')
+        self.atoms = list(atoms)
+        self.frames = frames
+        self.comments = comments
+
+    def __len__(self):
+        """Return the number of frames"""
+        return len(self.frames)
+
+    def __repr__(self):
+        return f'<Trajectory {len(self)}x{self.n_atoms}>'
+
+    def __getitem__(self, i):
+        """
+        Returns the ith frame as a Molecule, or a Trajectory if given a slice or list of frames
+        Both share their coordinates with the Trajectory (except for lists of frames)
+        """
+        if isinstance(i, (int, np.integer)):
+            return Molecule._view(self.atoms, self.frames[i])
+        frames = self.frames[i]
+        comments = None
+        if self.comments is not None:
+            comments = [self.comments[j] for j in np.arange(len(self))[i]]
+        return Trajectory(self.atoms, frames, comments)
+
+    def __iter__(self):
+        """Iterate over the frames as Molecules"""
+        for frame in self.frames:
+            yield Molecule._view(self.atoms, frame)
+
+    @property
+    def n_atoms(self):
+        return len(self.atoms)
+
+    def comment(self, i):
+        """Returns the comment for the ith frame"""
+        if self.comments is None:
+            return f'Step {i}'
+        return self.comments[i]
+
+    @staticmethod
+    def from_molecules(molecules, comments=None):
+        """
+        Make a Trajectory from Molecules with the same atoms
+        :param molecules: list of Molecules
+        :param comments: list of comments for each frame
+        """
+        if len(molecules) == 0:
+            raise SyntaxError('Cannot make a Trajectory without any Molecules.')
+        atoms = molecules[0].atoms
+        for mol in molecules:
+            if mol.atoms != atoms:
+                raise SyntaxError('All Molecules in a Trajectory must have the same atoms.')
+        return Trajectory(atoms, np.array([mol.xyz for mol in molecules]), comments)
+
+    @staticmethod
+    def from_blocks(blocks, atom_col=0, xyz_cols=(1, 2, 3), comments=None):
+        """
+        Make a Trajectory from blocks of geometry lines, one block per frame
+        :param blocks: list of lists of lines
+        :param atom_col: column of the atom names
+        :param xyz_cols: columns of the coordinates
+        :param comments: list of comments for each frame
+        """
+        if len(blocks) == 0:
+            raise SyntaxError('Cannot make a Trajectory without any frames.')
+        atoms = [line.split()[atom_col] for line in blocks[0]]
+        frames = np.empty((len(blocks), len(atoms), 3))
+        for i, block in enumerate(blocks):
+            if len(block) != len(atoms):
+                raise SyntaxError(f'Frame {i} has {len(block)} atoms, expected {len(atoms)}.')
+            rows = [line.split() for line in block]
+            frames[i] = [[row[j] for j in xyz_cols] for row in rows]
+        return Trajectory(atoms, frames, comments)
+
+    def xyz_chunks(self, form='{:<4}' + ' {:> 13.8f}' * 3, separator=''):
+        """
+        Generates the multi-XYZ representation one frame at a time
+        Each frame is formatted with a single call to format
+        :param form: format of each atom line (atom, x, y, z)
+        :param separator: string added after each frame (e.g. a blank line)
+        :yield: XYZ string of each frame
+        """
+        frame_form = '\n'.join([form] * self.n_atoms) + '\n' + separator
+        values = [None] * (4 * self.n_atoms)
+        values[::4] = self.atoms
+        for i, frame in enumerate(self.frames):
+            for j, column in enumerate(frame.T.tolist(), start=1):
+                values[j::4] = column
+            yield f'{self.n_atoms}\n{self.comment(i)}\n' + frame_form.format(*values)
+
+    def write(self, outfile='geom.xyz', buffering=2**20, **kwargs):
+        """
+        Writes all frames to a multi-XYZ file, streaming one frame at a time
+        :param outfile: file to write to
+        :param buffering: size of the write buffer in bytes
+        :param kwargs: formatting options passed to xyz_chunks
+        """
+        with open(outfile, 'w', buffering=buffering) as f:
+            f.writelines(self.xyz_chunks(**kwargs))
+
+    def write_frames(self, outfile_form='geom_{}.xyz'):
+        """
+        Writes each frame to a separate XYZ file
+        :param outfile_form: format string for the file names, filled with the frame index
+        :return: list of the files written
+        """
+        outfiles = []
+        for i, chunk in enumerate(self.xyz_chunks()):
+            outfile = outfile_form.format(i)
+            with open(outfile, 'w') as f:
+                f.write(chunk)
+            outfiles.append(outfile)
+        return outfiles
+
+
+class XYZReader:
+    def __init__(self, infile, chunk_size=2**26):
+        """ Lazy, random access reader for multi-frame XYZ files
+
+        The file is memory-mapped and the offset of every frame is found in a single pass
+        over the file, only frames that are accessed are parsed.
+        A trailing frame that is incomplete (e.g. still being written) is ignored.
+
+        :param infile: multi-frame XYZ file to read
+        :param chunk_size: number of bytes to search for newlines at a time while indexing
+        """
+        self.infile = infile
+        self._file = open(infile, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._mm = b''
+        try:
+            self.offsets, self.n_atoms = self._index(chunk_size)
+        except SyntaxError:
+            # The memory map cannot be closed while the traceback references it
+            self._file.close()
+            raise
+
+    def __len__(self):
+        """Return the number of frames"""
+        return len(self.offsets)
+
+    def __repr__(self):
+        return f'<XYZReader {self.infile} {len(self)}>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getitem__(self, i):
+        """
+        Returns the ith frame as a Molecule, or a Trajectory if given a slice or list of frames
+        """
+        if isinstance(i, (int, np.integer)):
+            atoms, xyz, comment = self._read_frame(i)
+            return Molecule._view(atoms, xyz)
+        return self.read(i)
+
+    def __iter__(self):
+        """Iterate over the frames as Molecules"""
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        """Close the memory map and file"""
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def _index(self, chunk_size):
+        """
+        Find the byte offset and number of atoms of every frame
+        Newlines are found chunk by chunk with numpy, only frame headers are parsed in python
+        :return: np.array of offsets, np.array of numbers of atoms
+        """
+        mm = self._mm
+        offsets, n_atoms = [], []
+        # Index of the next header line, index of the first line in the chunk, start of that line
+        header, line, line_start = 0, 0, 0
+        for chunk_start in range(0, len(mm), chunk_size):
+            count = min(chunk_size, len(mm) - chunk_start)
+            chunk = np.frombuffer(mm, dtype=np.uint8, count=count, offset=chunk_start)
+            newlines = np.flatnonzero(chunk == ord('\n')) + chunk_start
+            while header < line + len(newlines):
+                j = header - line
+                start = line_start if j == 0 else newlines[j - 1] + 1
+                header_str = mm[start:newlines[j]].strip()
+                if not header_str:
+                    # Blank lines between frames (or at the end of the file)
+                    header += 1
+                    continue
+                try:
+                    n = int(header_str)
+                except ValueError:
+                    raise SyntaxError(f'Invalid XYZ header on line {header + 1}: {header_str}')
+                offsets.append(start)
+                n_atoms.append(n)
+                header += n + 2
+            if len(newlines):
+                line_start = newlines[-1] + 1
+            line += len(newlines)
+
+        # Drop an incomplete final frame (allowing a missing newline at the end of the file)
+        if header > 0 and offsets:
+            last_complete = line + (line_start < len(mm))
+            if header > last_complete:
+                offsets.pop()
+                n_atoms.pop()
+
+        return np.array(offsets, dtype=np.int64), np.array(n_atoms, dtype=int)
+
+    def _read_frame(self, i):
+        """
+        Parse the ith frame
+        :return: atoms, xyz (n_atoms, 3), comment
+        """
+        i = range(len(self))[i]
+        n = self.n_atoms[i]
+        end = self.offsets[i + 1] if i + 1 < len(self) else len(self._mm)
+        header, comment, *lines = self._mm[self.offsets[i]:end].split(b'\n', n + 2)[:n + 2]
+        rows = [line.split()[:4] for line in lines]
+        atoms = [row[0].decode() for row in rows]
+        xyz = np.array([row[1:] for row in rows], dtype=float).reshape(-1, 3)
+        return atoms, xyz, comment.decode().strip()
+
+    def comment(self, i):
+        """Returns the comment line of the ith frame"""
+        return self._read_frame(i)[2]
+
+    def read(self, frames=slice(None)):
+        """
+        Read the selected frames into a Trajectory
+        :param frames: slice or list of frame indices
+        :return: Trajectory of the selected frames
+        """
+        indices = np.arange(len(self))[frames]
+        if len(indices) == 0:
+            raise SyntaxError('Cannot make a Trajectory without any frames.')
+        if len(set(self.n_atoms[indices])) != 1:
+            raise SyntaxError('All frames in a Trajectory must have the same number of atoms.')
+        atoms = None
+        coords = np.empty((len(indices), self.n_atoms[indices[0]], 3))
+        comments = []
+        for j, i in enumerate(indices):
+            frame_atoms, coords[j], comment = self._read_frame(i)
+            if atoms is None:
+                atoms = frame_atoms
+            elif frame_atoms != atoms:
+                raise SyntaxError(f'Frame {i} has different atoms than frame {indices[0]}.')
+            comments.append(comment)
+        return Trajectory(atoms, coords, comments)
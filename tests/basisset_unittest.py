@@ -9,7 +9,7 @@ from numpy.testing import assert_array_almost_equal as aaa_equal
 
 path.insert(0, '..')
 
-from qgrep.basis import Basis, BasisFunction, BasisSet, ECP, ECPFunction, ECPSet
+from qgrep.basis import Basis, BasisFunction, num_components, BasisSet, ECP, ECPFunction, ECPSet, ShellPool, SizeEstimator, convert, convert_many, output_name
 
 
 class TestBasisFunction(unittest.TestCase):
@@ -272,6 +272,185 @@ class TestBasisSet(unittest.TestCase):
         self.assertEqual(vals[0][0][0][1], self.basis_set.values()[0][0][0][1])
         self.assertEqual(vals[0][1][1][0], self.basis_set.values()[0][1][1][0])
 
+    def test_decontracted(self):
+        """Test decontraction of the entire BasisSet"""
+        bfsp = BasisFunction('SP', [0.1, 0.4, 3], [[0.2, 0.3, 0.5], [0.1, 0.3, 0.6]])
+        self.basis_set['C'].basis_functions.append(bfsp)
+        decon = self.basis_set.decontracted()
+        self.assertEqual(['H', 'C'], list(decon.atoms))
+        for atom, basis in self.basis_set.atoms.items():
+            self.assertEqual(basis.decontracted(), decon[atom])
+        self.assertEqual(['S', 'S', 'P', 'P', 'P', 'S'], [bf.func_type for bf in decon['C']])
+        self.assertEqual([0.1, 0.4, 0.1, 0.4, 3, 3], [bf.exps[0] for bf in decon['C']])
+
+        # Exponents within the tolerance are merged
+        self.basis_set['H'].basis_functions.append(BasisFunction('S', [1 + 1e-9, 4], [0.5, 0.5]))
+        self.assertEqual(6, len(self.basis_set.decontracted()['H']))
+        self.assertEqual(7, len(self.basis_set.decontracted(rtol=1e-12)['H']))
+
+        self.assertEqual(0, len(BasisSet().decontracted().atoms))
+
+        self.basis_set.am = 'cartesian'
+        self.assertEqual('cartesian', self.basis_set.decontracted().am)
+        self.assertEqual('cartesian', self.basis_set.interned().decontracted().am)
+
+
+class TestShellPool(unittest.TestCase):
+    """Test the ShellPool class"""
+    def setUp(self):
+        bfs = BasisFunction('S', [1, 2], [0.5, 0.5])
+        bfp = BasisFunction('P', [0.01, 0.2, 1], [0.3, 0.4, 0.3])
+        self.h = Basis('H', [bfs, bfp], 'simple')
+        bfs = BasisFunction('S', [1, 2 + 1e-10], [0.5, 0.5])
+        bfp = BasisFunction('P', [0.1, 0.4, 3], [0.2, 0.3, 0.5])
+        self.c = Basis('C', [bfs, bfp], 'simple')
+        self.basis_set = BasisSet(OrderedDict([('H', self.h), ('C', self.c)]))
+
+    def test_canonical_key(self):
+        """Test canonical_key"""
+        bf1 = BasisFunction('S', [1, 2], [0.5, 0.5])
+        bf2 = BasisFunction('S', [1 + 1e-10, 2], [0.5, 0.5 - 1e-10])
+        bf3 = BasisFunction('S', [1.1, 2], [0.5, 0.5])
+        bf4 = BasisFunction('P', [1, 2], [0.5, 0.5])
+        self.assertEqual(bf1.canonical_key(), bf2.canonical_key())
+        self.assertNotEqual(bf1.canonical_key(), bf3.canonical_key())
+        self.assertNotEqual(bf1.canonical_key(), bf4.canonical_key())
+
+    def test_intern(self):
+        """Test interning of BasisFunctions and BasisSets"""
+        pool = ShellPool()
+        bs = self.basis_set.interned(pool)
+        self.assertEqual(self.basis_set, bs)
+        self.assertIs(pool, bs.shell_pool)
+        self.assertIs(bs['H'][0], bs['C'][0])
+        self.assertIsNot(bs['H'][1], bs['C'][1])
+        self.assertEqual(3, len(pool))
+        self.assertIn(BasisFunction('P', [0.1, 0.4, 3], [0.2, 0.3, 0.5]), pool)
+        self.assertNotIn(BasisFunction('D', [0.1, 0.4, 3], [0.2, 0.3, 0.5]), pool)
+
+        # Interning a second BasisSet into the same pool shares shells between them
+        bs2 = self.basis_set.interned(pool)
+        self.assertIs(bs['C'][1], bs2['C'][1])
+        stats = pool.stats()
+        self.assertEqual(8, stats['shells'])
+        self.assertEqual(3, stats['unique_shells'])
+        self.assertEqual(20, stats['primitives'])
+        self.assertEqual(8, stats['unique_primitives'])
+        self.assertAlmostEqual(3 / 8, stats['shell_ratio'])
+
+    def test_decontracted(self):
+        """Test decontraction through a ShellPool"""
+        bs = self.basis_set.interned()
+        decon = bs.decontracted()
+        self.assertEqual(self.basis_set.decontracted(), decon)
+        self.assertIs(bs.shell_pool, decon.shell_pool)
+        self.assertIs(decon['H'][0], decon['C'][0])
+        self.assertIs(bs.shell_pool.decontracted(bs['C'][1])[0], decon['C'][2])
+        self.assertEqual(5, len(decon['C'].decontracted(bs.shell_pool)))
+
+        # The tolerance of the ShellPool is used
+        self.assertEqual(decon, bs.decontracted(rtol=bs.shell_pool.rtol))
+        self.assertRaises(ValueError, bs.decontracted, 1e-12)
+
+
+class TestSizeEstimator(unittest.TestCase):
+    """Test the SizeEstimator class"""
+    def setUp(self):
+        bfs = BasisFunction('S', [1, 2], [0.5, 0.5])
+        bfp = BasisFunction('P', [0.01, 0.2, 1], [0.3, 0.4, 0.3])
+        self.h = Basis('H', [bfs, bfp], 'simple')
+        bfs = BasisFunction('S', [0.1, 0.4], [[0.6, 0.4], [0.2, 0.8]])
+        bfsp = BasisFunction('SP', [0.1, 0.4, 3], [[0.2, 0.3, 0.5], [0.1, 0.3, 0.6]])
+        bfd = BasisFunction('D', [0.8], [1])
+        self.c = Basis('C', [bfs, bfsp, bfd], 'simple')
+        self.basis_set = BasisSet(OrderedDict([('H', self.h), ('C', self.c)]))
+        aux = Basis('H', [BasisFunction('F', [1], [1])])
+        self.aux_basis_set = BasisSet(OrderedDict([('H', aux), ('C', aux)]))
+        self.water = ['H', 'C', 'H']
+
+    def test_num_components(self):
+        """Test num_components"""
+        self.assertEqual([1, 3, 5, 7], [num_components(am) for am in range(4)])
+        self.assertEqual([1, 3, 6, 10], [num_components(am, True) for am in range(4)])
+        self.assertEqual(4, num_components(-1))
+
+    def test_shell_stats(self):
+        """Test shell_stats"""
+        stats = self.basis_set.shell_stats()
+        self.assertEqual([4, 11, 2], list(stats['H']))
+        self.assertEqual([2 + 4 + 5, 2 + 12 + 5, 3], list(stats['C']))
+        self.basis_set.am = 'cartesian'
+        self.assertEqual([2 + 4 + 6, 2 + 12 + 6, 3], list(self.basis_set.shell_stats()['C']))
+
+    def test_estimate(self):
+        """Test estimating the size of molecules"""
+        estimator = SizeEstimator(self.basis_set, self.aux_basis_set)
+        size = {'functions': 19, 'primitives': 41, 'shells': 7, 'aux_functions': 21}
+        self.assertEqual(size, estimator.estimate(self.water))
+        self.assertEqual(size, estimator.estimate(['h', 'Carbon', 'H']))
+        sizes = estimator.estimate_many([self.water, ['H'], []])
+        self.assertEqual((3, 4), sizes.shape)
+        self.assertEqual([4, 11, 2, 7], list(sizes[1]))
+        self.assertEqual([0, 0, 0, 0], list(sizes[2]))
+        self.assertEqual(0, SizeEstimator(self.basis_set).estimate(self.water)['aux_functions'])
+        self.assertRaises(KeyError, estimator.estimate, ['O'])
+
+
+class TestConvert(unittest.TestCase):
+    """Test the conversion of basis set files"""
+    def setUp(self):
+        bfs = BasisFunction('S', [1, 2], [0.5, 0.5])
+        bfp = BasisFunction('P', [0.01, 0.2, 1], [0.3, 0.4, 0.3])
+        h = Basis('H', [bfs, bfp], 'simple')
+        bfs = BasisFunction('S', [0.1, 0.4, 0.8, 1.6, 3.2, 6.4, 12.8], [0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1])
+        bfp = BasisFunction('P', [0.1, 0.4, 3], [0.2, 0.3, 0.5])
+        c = Basis('C', [bfs, bfp], 'simple')
+        self.basis_set = BasisSet(OrderedDict([('H', h), ('C', c)]))
+
+        self.in_files = ['my_basis_a.gbs.tmp', 'my_basis_b.gbs.tmp']
+        for in_file in self.in_files:
+            self.basis_set.write(in_file, 'gaussian94')
+
+    def tearDown(self):
+        for tmp_file in set(glob('*.tmp') + glob('my_basis_*.gbs.*')):
+            os.remove(tmp_file)
+
+    def test_write(self):
+        """Test that write matches print"""
+        for style in ['gaussian94', 'gamess', 'bagel', 'cfour', 'molpro']:
+            self.basis_set.write('my_basis_write.tmp', style)
+            with open('my_basis_write.tmp') as f:
+                self.assertEqual(self.basis_set.print(style), f.read())
+        self.assertRaises(ValueError, self.basis_set.write, 'my_basis_write.tmp', 'turbomole')
+
+    def test_output_name(self):
+        """Test output_name"""
+        self.assertEqual('basis.json', output_name('basis.gbs', 'bagel'))
+        self.assertEqual('my.basis.GENBAS', output_name('my.basis.gbs', 'cfour'))
+        self.assertEqual('basis.bas', output_name('basis', 'molpro'))
+        self.assertRaises(ValueError, output_name, 'basis.gbs', 'turbomole')
+
+    def test_convert(self):
+        """Test converting a single file to multiple styles"""
+        styles = ['gamess', 'bagel', 'cfour', 'molpro']
+        out_files = convert(self.in_files[0], styles)
+        self.assertEqual([output_name(self.in_files[0], style) for style in styles], out_files)
+        for out_file, style in zip(out_files, styles):
+            self.assertEqual(self.basis_set, BasisSet.read_file(out_file, style))
+
+        out_files = convert(self.in_files[0], 'gamess', out_files='my_basis_c.gamess.tmp')
+        self.assertEqual(['my_basis_c.gamess.tmp'], out_files)
+        self.assertRaises(ValueError, convert, self.in_files[0], ['gamess', 'bagel'], out_files=['a.tmp'])
+
+    def test_convert_many(self):
+        """Test converting many files in parallel"""
+        styles = ['gamess', 'bagel']
+        for nprocs in [1, 2]:
+            out_files = convert_many(self.in_files, styles, nprocs=nprocs)
+            self.assertEqual(4, len(out_files))
+            for out_file, style in zip(out_files, styles * 2):
+                self.assertEqual(self.basis_set, BasisSet.read_file(out_file, style))
+
 
 class TestECPFunction(unittest.TestCase):
     def setUp(self):
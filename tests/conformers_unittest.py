@@ -0,0 +1,71 @@
+import os
+import json
+import unittest
+import numpy as np
+
+from sys import path
+
+path.insert(0, '..')
+
+from qgrep.conformers import cluster, find_outputs, read_conformers
+
+
+class TestConformers(unittest.TestCase):
+    """Tests reading and clustering conformers"""
+
+    def setUp(self):
+        """Set up for every test"""
+        rng = np.random.default_rng(0)
+        self.atoms = ['C', 'O', 'H', 'H']
+        base = rng.normal(size=(4, 3))
+        other = rng.normal(size=(4, 3))
+        c, s = np.cos(1), np.sin(1)
+        rotation = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+        # Two conformers, each found several times (rotated, translated, or with noise)
+        self.frames = [base, other, base @ rotation.T + 3, other + 0.01, base + 0.01, base]
+        self.energies = [-1.0, -1.002, -1.0001, -1.0021, -1.0002, -1.1]
+
+    def tearDown(self):
+        if os.path.exists('conformers.json.tmp'):
+            os.remove('conformers.json.tmp')
+
+    def test_cluster(self):
+        """Test cluster"""
+        atoms = [self.atoms] * len(self.frames)
+        clusters = cluster(self.energies, atoms, self.frames)
+        self.assertEqual([[5], [3, 1], [4, 2, 0]], clusters)
+
+        # Larger energy windows join the lowest energy conformer
+        clusters = cluster(self.energies, atoms, self.frames, energy_window=100)
+        self.assertEqual([[5, 4, 2, 0], [3, 1]], clusters)
+
+        # Reordered atoms only match when reordering
+        swapped = [self.atoms] * 6
+        frames = self.frames[:5] + [self.frames[0][[0, 1, 3, 2]]]
+        energies = self.energies[:5] + [-1.00015]
+        self.assertEqual(3, len(cluster(energies, swapped, frames, reorder_atoms=False)))
+        self.assertEqual(2, len(cluster(energies, swapped, frames, reorder_atoms=True)))
+
+        # Different compositions are never compared
+        mixed = [self.atoms] * 5 + [['C', 'O', 'H', 'F']]
+        self.assertEqual(3, len(cluster(self.energies, mixed, self.frames, energy_window=100)))
+
+    def test_read_conformers(self):
+        """Test read_conformers and its cache"""
+        files = find_outputs(['orca'], '*.out')
+        self.assertEqual(3, len(files))
+        files = [f for f in files if 'H2O' in f] + ['helper_unittest.py']
+        conformers = read_conformers(files, cache_file='conformers.json.tmp')
+        self.assertEqual([files[0]], list(conformers))
+        energy, atoms, xyz = conformers[files[0]]
+        self.assertAlmostEqual(-76.30, energy, 2)
+        self.assertEqual(['O', 'H', 'H'], atoms)
+        self.assertEqual((3, 3), np.shape(xyz))
+
+        with open('conformers.json.tmp') as f:
+            self.assertEqual(2, len(json.load(f)))
+        self.assertEqual(conformers, read_conformers(files, cache_file='conformers.json.tmp'))
+
+
+if __name__ == '__main__':
+    unittest.main()
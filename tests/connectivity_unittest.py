@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+
+from sys import path
+from numpy.testing import assert_almost_equal
+
+path.insert(0, '..')
+
+from qgrep.connectivity import (Connectivity, bridges, distance_matrix, find_rings, neighbor_pairs,
+                                perceive_bonds, ring_centers_normals)
+from qgrep.molecule import Molecule
+
+
+class TestConnectivity(unittest.TestCase):
+    """Tests pairwise distances and bond perception"""
+
+    def setUp(self):
+        """Set up for every test"""
+        self.water = Molecule([['O', [0, 0, 0]],
+                               ['H', [0.757, 0.586, 0]],
+                               ['H', [-0.757, 0.586, 0]]])
+        rng = np.random.default_rng(0)
+        self.cloud = rng.uniform(0, 10, (500, 3))
+
+    def test_distance_matrix(self):
+        """Test distance_matrix"""
+        dists = distance_matrix(self.water.xyz)
+        self.assertEqual((3, 3), dists.shape)
+        assert_almost_equal(np.diag(dists), 0)
+        assert_almost_equal(dists[1, 2], 1.514)
+        assert_almost_equal(self.water.distance_matrix(), dists)
+
+    def test_neighbor_pairs(self):
+        """Test the cell list against all pairwise distances"""
+        dists = distance_matrix(self.cloud)
+        for cutoff in [0.5, 1.3, 4]:
+            pairs, distances = neighbor_pairs(self.cloud, cutoff)
+            expected = np.argwhere(np.triu(dists < cutoff, k=1))
+            np.testing.assert_array_equal(expected, pairs)
+            assert_almost_equal(dists[pairs[:, 0], pairs[:, 1]], distances)
+        self.assertEqual((0, 2), neighbor_pairs(self.cloud[:1], 2)[0].shape)
+
+    def test_perceive_bonds(self):
+        """Test perceive_bonds and Connectivity"""
+        bonds = perceive_bonds(self.water.atoms, self.water.xyz)
+        self.assertEqual(2, len(bonds))
+        self.assertEqual([(0, 1), (0, 2)], list(bonds))
+        self.assertIn((1, 0), bonds)
+        self.assertNotIn((1, 2), bonds)
+        self.assertEqual([1, 2], list(bonds.neighbors(0)))
+        self.assertEqual([2, 1, 1], list(bonds.degrees))
+        np.testing.assert_array_equal(bonds.to_dense(), [[0, 1, 1], [1, 0, 0], [1, 0, 0]])
+        self.assertEqual(0, len(perceive_bonds(self.water.atoms, self.water.xyz, -0.5)))
+        self.assertEqual(0, len(perceive_bonds(['H'], [[0, 0, 0]])))
+
+        empty = Connectivity(2, [])
+        self.assertEqual([], list(empty.neighbors(1)))
+
+    def test_molecule_bonds(self):
+        """Test caching of bonds on a Molecule"""
+        bonds = self.water.bonds()
+        self.assertIs(bonds, self.water.bonds())
+        self.assertIsNot(bonds, self.water.bonds(0.1))
+        self.water.xyz[1] = [5, 5, 5]
+        self.assertEqual(1, len(self.water.bonds()))
+
+    def test_find_rings(self):
+        """Test SSSR ring perception"""
+        self.assertEqual([], find_rings(self.water.bonds()))
+        # Two fused squares with a tail: 0-1-2-3-0, 2-3-4-5-2 and 5-6
+        pairs = [(0, 1), (1, 2), (2, 3), (0, 3), (3, 4), (4, 5), (2, 5), (5, 6)]
+        bonds = Connectivity(8, pairs)
+        self.assertEqual({(5, 6)}, bridges(bonds))
+        self.assertEqual(2, bonds.n_components())
+        rings = bonds.rings()
+        self.assertIs(rings, bonds.rings())
+        self.assertEqual([{0, 1, 2, 3}, {2, 3, 4, 5}], sorted(map(set, rings), key=sorted))
+        for ring in rings:
+            for i, j in zip(ring, ring[1:] + ring[:1]):
+                self.assertIn((i, j), bonds)
+
+        # Cube, the SSSR only has five of the six faces
+        cube = np.array([[i, j, k] for i in (0, 1.5) for j in (0, 1.5) for k in (0, 1.5)])
+        rings = perceive_bonds(['C'] * 8, cube).rings()
+        self.assertEqual([4] * 5, [len(ring) for ring in rings])
+
+    def test_ring_centers_normals(self):
+        """Test ring centers and normals"""
+        angles = np.arange(6) * np.pi / 3
+        hexagon = np.column_stack((np.cos(angles), np.sin(angles), np.zeros(6)))
+        square = [[5, 0, 0], [5, 0, 1], [6, 0, 1], [6, 0, 0]]
+        xyz = np.concatenate((hexagon, square))
+        centers, normals = ring_centers_normals(xyz, [[6, 7, 8, 9], list(range(6))])
+        assert_almost_equal(centers, [[5.5, 0, 0.5], [0, 0, 0]])
+        assert_almost_equal(normals, [[0, -1, 0], [0, 0, -1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
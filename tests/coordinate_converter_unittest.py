@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+
+from sys import path
+from numpy.testing import assert_almost_equal
+
+path.insert(0, '..')
+
+from qgrep.coordinate_converter import (CoordinateConverter, angles, dihedrals, distances,
+                                        xyz_to_zmatrix, zmatrix_to_xyz)
+
+
+class TestCoordinateConverter(unittest.TestCase):
+    """Tests conversion between zmatrices and Cartesian coordinates"""
+
+    def setUp(self):
+        """Set up for every test"""
+        self.hooh = np.array([[0.0, 0.0, 0.0],
+                              [1.4, 0.0, 0.0],
+                              [-0.3, 0.9, 0.2],
+                              [1.7, 0.1, 0.9]])
+        self.refs = [[-1, -1, -1], [0, -1, -1], [0, 1, -1], [1, 0, 2]]
+
+    def test_internals(self):
+        """Test distances, angles, and dihedrals"""
+        assert_almost_equal(distances(self.hooh, [[0, 1], [1, 0]]), [1.4, 1.4])
+        assert_almost_equal(angles(self.hooh, [[1, 0, 2]]), [np.arccos(-0.3 / np.sqrt(0.94))])
+        square = [[1, 0, 0], [0, 0, 0], [0, 1, 0], [0, 1, 1]]
+        assert_almost_equal(angles(square, [[0, 1, 2]]), [np.pi / 2])
+        assert_almost_equal(dihedrals(square, [[0, 1, 2, 3], [3, 2, 1, 0]]), [-np.pi / 2] * 2)
+        assert_almost_equal(dihedrals(np.multiply(square, [1, 1, -1]), [[0, 1, 2, 3]]), [np.pi / 2])
+        frames = np.array([self.hooh, self.hooh * 2])
+        assert_almost_equal(distances(frames, [[0, 1]]), [[1.4], [2.8]])
+
+    def test_round_trip(self):
+        """Test that converting to a zmatrix and back only moves the molecule rigidly"""
+        rng = np.random.default_rng(0)
+        frames = self.hooh + rng.normal(scale=0.1, size=(20, 4, 3))
+        values = xyz_to_zmatrix(frames, self.refs)
+        self.assertEqual((20, 4, 3), values.shape)
+        xyz = zmatrix_to_xyz(self.refs, values)
+        assert_almost_equal(xyz[:, 0], 0)
+        assert_almost_equal(xyz[:, 1, 1:], 0)
+        assert_almost_equal(xyz[:, 2, 2], 0)
+        assert_almost_equal(xyz_to_zmatrix(xyz, self.refs), values)
+        for frame, new in zip(frames, xyz):
+            dists = np.linalg.norm(frame[:, np.newaxis] - frame, axis=-1)
+            assert_almost_equal(np.linalg.norm(new[:, np.newaxis] - new, axis=-1), dists)
+
+    def test_converter(self):
+        """Test the CoordinateConverter zmatrix and Cartesian conversions"""
+        conv = CoordinateConverter()
+        conv.cartesian = [[atom, position, 1] for atom, position in zip('OOHH', self.hooh)]
+        zmatrix = conv.cartesian_to_zmatrix()
+        self.assertEqual(['O', [[], [], []], 1], zmatrix[0])
+        self.assertEqual([[0, 1.4], [], []], zmatrix[1][1])
+        self.assertEqual([0, 1, 2], [coord[0] for coord in zmatrix[3][1]])
+
+        # Back to Cartesian coordinates (angles in radians)
+        for atom in conv.zmatrix:
+            for coord in atom[1][1:]:
+                if coord:
+                    coord[1] = np.radians(coord[1])
+        cartesian = conv.zmatrix_to_cartesian()
+        new = np.array([position for atom, position, mass in cartesian])
+        assert_almost_equal(new.mean(axis=0), 0)
+        assert_almost_equal(np.linalg.norm(new - new[0], axis=1),
+                            np.linalg.norm(self.hooh - self.hooh[0], axis=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -24,5 +24,17 @@ class TestGamess(unittest.TestCase):
         self.assertEqual(len(checklist), 6)
         self.assertEqual('\n'.join(checklist), ''.join(self.files['CH2_opt.check']).strip())
 
+    def test_get_trajectory(self):
+        """Testing get_trajectory"""
+        traj = gamess.get_trajectory(self.files['CH2_opt.out'])
+        geoms = gamess.plot(self.files['CH2_opt.out'])
+        self.assertEqual(7, len(traj))
+        self.assertEqual(len(geoms), len(traj))
+        for geom, mol in zip(geoms, traj):
+            lines = geom.splitlines()[2:]
+            self.assertEqual([line.split()[0] for line in lines], mol.atoms)
+            self.assertEqual([[float(x) for x in line.split()[1:]] for line in lines],
+                             mol.xyz.tolist())
+
 if __name__ == '__main__':
     unittest.main()
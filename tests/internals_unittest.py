@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+
+from sys import path
+from numpy.testing import assert_almost_equal
+
+path.insert(0, '..')
+
+from qgrep import orca
+from qgrep.internals import InternalCoordinates, parse_definition
+from qgrep.molecule import Molecule
+from qgrep.trajectory import Trajectory
+
+
+class TestInternalCoordinates(unittest.TestCase):
+    """Tests evaluation of internal coordinates"""
+
+    def setUp(self):
+        """Set up for every test"""
+        self.square = np.array([[1, 0, 0], [0, 0, 0], [0, 1, 0], [0, 1, 1]], dtype=float)
+        self.internals = InternalCoordinates(['D(C 0,C 1,C 2,C 3)', (0, 1), 'A(0,1,2)', (1, 2)])
+
+    def test_parse_definition(self):
+        """Test parse_definition"""
+        self.assertEqual(('B', (1, 0)), parse_definition('B(O   1,C   0)'))
+        self.assertEqual(('A', (1, 0, 2)), parse_definition(' A(H   1,O   0,H   2) '))
+        self.assertEqual(('L', (21, 22, 23, 24)), parse_definition('L(C  21,C  22,N  23,C  24, 2)'))
+        self.assertEqual(('D', (3, 2, 1, 0)), parse_definition([3, 2, 1, 0]))
+        self.assertRaises(SyntaxError, parse_definition, 'X(1,2)')
+        self.assertRaises(SyntaxError, parse_definition, 'A(1,2)')
+        self.assertRaises(ValueError, parse_definition, (1,))
+
+    def test_evaluate(self):
+        """Test evaluate for single and many geometries"""
+        self.assertEqual(4, len(self.internals))
+        self.assertEqual(['D(0,1,2,3)', 'B(0,1)', 'A(0,1,2)', 'B(1,2)'], self.internals.labels())
+        assert_almost_equal(self.internals.evaluate(self.square), [-90, 1, 90, 1])
+        assert_almost_equal(self.internals.evaluate(self.square, degrees=False),
+                            [-np.pi / 2, 1, np.pi / 2, 1])
+
+        frames = np.array([self.square, 2 * self.square, self.square * [1, 1, -1]])
+        values = self.internals.evaluate(Trajectory(['C'] * 4, frames))
+        self.assertEqual((3, 4), values.shape)
+        assert_almost_equal(values, [[-90, 1, 90, 1], [-90, 2, 90, 2], [90, 1, 90, 1]])
+        mol = Molecule.from_arrays(['C'] * 4, self.square)
+        assert_almost_equal(self.internals.evaluate(mol), values[0])
+
+    def test_from_orca(self):
+        """Test reading the definitions from an ORCA output"""
+        with open('orca/H2O_hybrid_hess.out') as f:
+            lines = f.readlines()
+        internals = InternalCoordinates.from_orca(lines)
+        self.assertEqual(['B(1,0)', 'B(2,0)', 'A(1,0,2)'], internals.labels())
+        values = internals.evaluate(orca.get_trajectory(lines))
+        self.assertEqual((5, 3), values.shape)
+        assert_almost_equal(values[-1], [0.9723, 0.9721, 104.42], decimal=3)
+        self.assertRaises(SyntaxError, InternalCoordinates.from_orca, lines[:10])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,13 @@ from numpy.testing import assert_almost_equal
 
 path.insert(0, '..')
 
-from qgrep.molecule import Molecule
+from qgrep.molecule import Molecule, center_of_mass, moment_of_inertia_tensor
+from qgrep.trajectory import Trajectory
+
+try:
+    import scipy
+except ImportError:
+    scipy = None
 
 
 class TestMolecule(unittest.TestCase):
@@ -47,6 +53,49 @@ class TestMolecule(unittest.TestCase):
         new_water = Molecule([['H', [0, 0, 0]], ['O', [0, 0, 1]], ['H', [0, -1, 1]]])
         self.assertEqual(self.water, new_water)
 
+    def test_append_from_arrays(self):
+        """Test append and from_arrays"""
+        mol = Molecule()
+        for i in range(20):
+            mol.append('H', [i, 0, 0])
+        self.assertEqual(20, len(mol))
+        self.assertEqual((20, 3), mol.xyz.shape)
+        assert_almost_equal(mol.xyz[:, 0], np.arange(20))
+
+        del mol[0]
+        del mol[-1]
+        mol.insert(-1, 'O', [0, 1, 0])
+        mol.insert(100, 'C', [0, 0, 1])
+        self.assertEqual(['H'] * 17 + ['O', 'H', 'C'], mol.atoms)
+        assert_almost_equal(mol.xyz[:, 0], list(range(1, 18)) + [0, 18, 0])
+
+        mol2 = Molecule.from_arrays(mol.atoms, mol.xyz)
+        self.assertEqual(mol, mol2)
+        # The atoms and coordinates are copied
+        mol2[0] = ('He', [9, 9, 9])
+        mol2.xyz[1] = [8, 8, 8]
+        self.assertEqual('H', mol.atoms[0])
+        assert_almost_equal(mol.xyz[:2, 0], [1, 2])
+        xyz = np.zeros((2, 3))
+        mol3 = Molecule.from_arrays(['H', 'H'], xyz)
+        mol3.xyz[0] = [1, 1, 1]
+        mol3.xyz = xyz
+        mol3.xyz[1] = [1, 1, 1]
+        assert_almost_equal(xyz, 0)
+
+        # Deleting or inserting atoms of a Trajectory frame leaves the Trajectory unchanged
+        traj = Trajectory(['H', 'H', 'H'], np.arange(18.).reshape(2, 3, 3))
+        frames = traj.frames.copy()
+        mol = traj[0]
+        del mol[0]
+        assert_almost_equal([[3, 4, 5], [6, 7, 8]], mol.xyz)
+        mol = traj[1]
+        mol.insert(0, 'He', [1, 1, 1])
+        del mol[-1]
+        assert_almost_equal(frames, traj.frames)
+        self.assertRaises(SyntaxError, Molecule.from_arrays, ['H'], [[0, 0, 0], [1, 1, 1]])
+        self.assertEqual(0, len(Molecule.from_arrays([], np.zeros((0, 3)))))
+
     def test_str(self):
         """Testing __str__"""
         water_string = """\
@@ -117,6 +166,31 @@ H       0.000000      1.000000      1.000000
         self.water.xyz += [7, 8, 9]
         assert_almost_equal(self.water.moment_of_inertia_tensor(), water_moi_tensor)
 
+    def test_mass_vector(self):
+        """ Test the mass vector """
+        masses = self.water.mass_vector()
+        assert_almost_equal(masses, [1.00782503, 15.99491462, 1.00782503])
+        self.assertIs(masses, self.water.mass_vector())
+        with self.assertRaises(ValueError):
+            masses[0] = 100
+        self.water[1] = ['H', [0, 0, 1]]
+        assert_almost_equal(self.water.mass_vector(), [1.00782503] * 3)
+        assert_almost_equal(self.water.mass_vector([1, 2, 3]), [1, 2, 3])
+        self.assertRaises(ValueError, self.water.mass_vector, 'H')
+
+    def test_frames(self):
+        """ Test center of mass and moment of inertia tensor for many frames """
+        frames = np.array([self.water.xyz, self.water.xyz + [7, 8, 9], self.water.xyz[::-1]])
+        coms = self.water.center_of_mass(frames=frames)
+        moi_tensors = self.water.moment_of_inertia_tensor(frames=frames)
+        self.assertEqual((3, 3), coms.shape)
+        self.assertEqual((3, 3, 3), moi_tensors.shape)
+        for frame, com, moi_tensor in zip(frames, coms, moi_tensors):
+            masses = self.water.mass_vector()
+            assert_almost_equal(center_of_mass(frame, masses), com)
+            assert_almost_equal(moment_of_inertia_tensor(frame, masses), moi_tensor)
+        assert_almost_equal(moi_tensors[0], moi_tensors[1])
+
     def test_reorder(self):
         """ Test the reordering of atoms """
         w1 = self.water
@@ -128,6 +202,28 @@ H       0.000000      1.000000      1.000000
         assert w1[2][0] == w2[2][0]
         assert all(w1[2][1] == w2[2][1])
 
+    def test_rmsd_aligned(self):
+        """ Test the RMSD and alignment between molecules """
+        c, s = np.cos(0.3), np.sin(0.3)
+        rotation = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+        moved = Molecule.from_arrays(self.water.atoms, self.water.xyz @ rotation.T + [1, 2, 3])
+        self.assertAlmostEqual(0, self.water.rmsd(moved))
+        self.assertGreater(self.water.rmsd(moved, align=False), 1)
+        assert_almost_equal(moved.aligned(self.water).xyz, self.water.xyz)
+        self.assertRaises(ValueError, self.water.rmsd, moved.reorder([1, 0, 2]))
+
+    @unittest.skipUnless(scipy, 'scipy is needed to reorder atoms')
+    def test_rmsd_reorder(self):
+        """ Test the RMSD and alignment between molecules with reordered atoms """
+        c, s = np.cos(0.3), np.sin(0.3)
+        rotation = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+        moved = Molecule.from_arrays(self.water.atoms, self.water.xyz @ rotation.T + [1, 2, 3])
+        swapped = moved.reorder([1, 0, 2])
+        self.assertAlmostEqual(0, self.water.rmsd(swapped, reorder=True))
+        aligned = swapped.aligned(self.water, reorder=True)
+        self.assertEqual(self.water.atoms, aligned.atoms)
+        assert_almost_equal(aligned.xyz, self.water.xyz)
+
 
 
 
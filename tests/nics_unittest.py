@@ -1,3 +1,5 @@
+import os
+import shutil
 import unittest
 import numpy as np
 
@@ -6,7 +8,9 @@ from numpy.testing import assert_array_almost_equal as aaa_equal
 
 path.insert(0, '..')
 
-from qgrep.nics import nics_points
+from qgrep.molecule import Molecule
+from qgrep.nics import nics_frames, nics_many, nics_points
+from qgrep.trajectory import Trajectory
 
 
 class NICS(unittest.TestCase):
@@ -42,15 +46,56 @@ C   1.4   1.4   1.4
         aaa_equal([(0, 0, 0), (-1, 0, 0), (1, 0, 0)], nics_points(benzene))
         cubane_points = nics_points(cubane)
         assert len(cubane_points) == 6
-        aaa_equal(cubane_points, [
+        # Compare ring by ring, independent of the order the rings are found in
+        rings = sorted(np.round(cubane_points, 8).reshape(-1, 3, 3).tolist())
+        aaa_equal(rings, sorted(np.reshape([
             ( 0.7,  0.0, 0.7),
             ( 0.7, -1.0, 0.7),
             ( 0.7,  1.0, 0.7),
             ( 0.0,  0.7, 0.7),
             (-1.0,  0.7, 0.7),
             ( 1.0,  0.7, 0.7),
+        ], (-1, 3, 3)).tolist()))
+
+    def test_nics_points_molecule(self):
+        naphthalene = Molecule.from_arrays(['C'] * 10, [
+            [ 0.000,  0.710, 0.0], [ 0.000, -0.710, 0.0], [ 1.230,  1.400, 0.0],
+            [ 1.230, -1.400, 0.0], [ 2.460,  0.710, 0.0], [ 2.460, -0.710, 0.0],
+            [-1.230,  1.400, 0.0], [-1.230, -1.400, 0.0], [-2.460,  0.710, 0.0],
+            [-2.460, -0.710, 0.0],
         ])
+        points = np.reshape(nics_points(naphthalene), (-1, 3, 3))
+        assert len(points) == 2
+        aaa_equal(sorted(points[:, 0, 0]), [-1.23, 1.23])
+        aaa_equal(points[:, 1] - points[:, 0], [(0, 0, -1)] * 2)
+
+    def test_nics_many(self):
+        square = [[0, 0, 0], [1.4, 0, 0], [1.4, 1.4, 0], [0, 1.4, 0]]
+        frames = np.array([square, np.add(square, [0, 0, 2]), np.multiply(square, 2)])
+        traj = Trajectory(['C'] * 4, frames)
+        results = nics_frames(list(traj), cache={})
+        self.assertIs(results[0][0], results[1][0])
+        self.assertEqual([], results[2][0])
+        aaa_equal(results[1][1] - results[0][1], [(0, 0, 2)] * 3)
 
+        # Files are written in a temporary directory (inputs must end with .xyz)
+        tmp_dir = 'nics_test.tmp'
+        os.makedirs(tmp_dir, exist_ok=True)
+        infiles = [f'{tmp_dir}/nics_test.xyz', f'{tmp_dir}/nics_test_single.xyz']
+        try:
+            traj.write(infiles[0])
+            traj[:1].write(infiles[1])
+            outfiles = nics_many(infiles, nprocs=2)
+            self.assertEqual([f'{tmp_dir}/nics_test_nics_0.inp', f'{tmp_dir}/nics_test_nics_1.inp',
+                              f'{tmp_dir}/nics_test_nics_2.inp',
+                              f'{tmp_dir}/nics_test_single_nics.inp'], outfiles)
+            with open(outfiles[1]) as f:
+                lines = f.read().splitlines()
+            self.assertIn('NMR', lines[2])
+            self.assertEqual(4 + 3, sum(line.startswith('    ') for line in lines))
+            self.assertTrue(lines[-3].strip().startswith('H:'))
+        finally:
+            shutil.rmtree(tmp_dir)
 
 if __name__ == '__main__':
     unittest.main()
@@ -69,6 +69,16 @@ class TestOrca(unittest.TestCase):
         geoms = orca.plot(self.files['CH3F_Cl_scan.out'])
         self.assertEqual('\n'.join(geoms), ''.join(self.files['CH3F_Cl_scan.plot']))
 
+    def test_get_trajectory(self):
+        """Testing get_trajectory"""
+        traj = orca.get_trajectory(self.files['CH3F_Cl_scan.out'])
+        geoms = orca.plot(self.files['CH3F_Cl_scan.out'])
+        self.assertEqual(len(geoms), len(traj))
+        for geom, mol in zip(geoms, traj):
+            lines = geom.splitlines()[2:]
+            self.assertEqual([line.split()[0] for line in lines], mol.atoms)
+            self.assertEqual([[float(x) for x in line.split()[1:]] for line in lines], mol.xyz.tolist())
+
     def test_convert_zmatrix(self):
         zmat = orca.convert_zmatrix(self.files['CH3F_Cl_scan.out'], 'angstrom')
         self.assertEqual(['\t'.join(line) + '\n' for line in zmat],
@@ -1,3 +1,4 @@
+import io
 import unittest
 import numpy as np
 
@@ -6,7 +7,12 @@ from numpy.testing import assert_almost_equal
 
 path.insert(0, '../../')
 
-from qgrep.population.nbo import NAOs, NPA, NPA_Diff
+from qgrep.population.nbo import CR, LP, NAOs, NBO, NBOs, NBOSet, NPA, NPA_Diff, RYs
+
+try:
+    import scipy
+except ImportError:
+    scipy = None
 
 
 class TestNAOs(unittest.TestCase):
@@ -18,6 +24,18 @@ class TestNAOs(unittest.TestCase):
         occ = [0.58963, 0.00147, 1.99984, 1.79608, 0.00093, 1.99981, 0.00019,
                1.50996, 0.00052, 1.50996, 0.00052, 0.58963, 0.00147]
         assert_almost_equal([x[5] for x in naos.vals], occ)
+        assert_almost_equal(naos.occupancies, occ)
+        self.assertEqual(naos.vals[3], ['O', 2, 's', 'Val', '2s', 1.79608, -0.91246])
+
+    def test_stack(self):
+        naos_list = NAOs.read_many(['H2O.nbo', 'H2O_stretched.nbo'])
+        occupancies = NAOs.stack(naos_list)
+        self.assertEqual(occupancies.shape, (2, 13))
+        assert_almost_equal(occupancies[1], naos_list[1].occupancies)
+
+        naos_list[1].atoms[0] = 'He'
+        self.assertRaises(ValueError, NAOs.stack, naos_list)
+        self.assertEqual(NAOs.stack(naos_list, pad=True).shape, (2, 13))
 
 
 class TestNPA(unittest.TestCase):
@@ -64,12 +82,106 @@ class TestNPA(unittest.TestCase):
 
         assert_almost_equal((h2o + h2o_stretched).charges, add)
 
+    def test_stack(self):
+        files = ['H2O.nbo', 'H2O_stretched.nbo', 'H2O.nbo']
+        npas = NPA.read_many(files)
+        self.assertEqual(npas, NPA.read_many(files, nprocs=2))
+        charges = NPA.stack(npas)
+        self.assertEqual(charges.shape, (3, 3, 5))
+        assert_almost_equal(charges[0] - charges[1], (npas[0] - npas[1]).charges)
+
+        # Different atoms are only padded with zeros when requested
+        npa_h = NPA(['H'], npas[1].charges[:1])
+        self.assertRaises(ValueError, NPA.stack, [npas[0], npa_h])
+        charges = NPA.stack([npas[0], npa_h], pad=True)
+        assert_almost_equal(charges[1, 1:], 0)
+
 class TestNBO(unittest.TestCase):
     """Tests the NBO class"""
 
     def test_read(self):
-        pass
+        with open('H2O.nbo') as f:
+            nbos = NBOSet(f)
+        self.assertEqual(len(nbos), 13)
+        self.assertEqual(list(nbos.types[:6]), ['BD', 'BD', 'CR', 'LP', 'LP', 'RY*'])
+        self.assertEqual(nbos.atoms, ['H', 'O', 'H'])
+        assert_almost_equal(nbos.occupancies[[0, 3, 12]], [1.99908, 2.0, 0.00044])
+        self.assertEqual(nbos.centers[0].tolist(), [1, 2, 0])
+        self.assertEqual(nbos.centers[4].tolist(), [2, 0, 0])
+        assert_almost_equal(nbos.polarizations[1], [70.52, 29.48, 0])
+        assert_almost_equal(nbos.coefficients[11], [0.8398, -0.5429, 0])
+        assert_almost_equal(nbos.hybrids[0, 1], [18.01, 81.99, 0, 0, 0])
+        assert_almost_equal(nbos.hybrids[4, 0], [64.03, 35.97, 0, 0, 0])
+        # NAO coefficients of each center, RY* 7 has none printed
+        self.assertEqual(np.diff(nbos.nao_offsets)[:6].tolist(), [2, 9, 0, 9, 2, 0])
+        self.assertEqual(np.diff(nbos.nao_offsets)[18:21].tolist(), [0, 0, 0])
+
+        # Orbital objects
+        self.assertIsInstance(nbos[0], NBO)
+        self.assertIsInstance(nbos[2], CR)
+        self.assertIsInstance(nbos[3], LP)
+        self.assertIsInstance(nbos[5], RYs)
+        self.assertIsInstance(nbos[-1], NBOs)
+        self.assertEqual((nbos[1].atom, nbos[1].atom_n, nbos[1].atom2, nbos[1].atom2_n),
+                         ('O', 2, 'H', 3))
+        self.assertEqual(nbos[0].hybrids[1], [('s', 1.0, 18.01), ('p', 4.55, 81.99)])
+        self.assertEqual(nbos[0].densities[0], [-1.0, -0.0013])
+        self.assertEqual(nbos[3].hybrids, [('s', 1.0, 0.0), ('p', 1.0, 100.0)])
+        self.assertEqual(len(nbos.orbitals), 13)
+        self.assertIsInstance(nbos.orbitals, tuple)
+        self.assertIs(nbos.orbitals, nbos.orbitals)
+
+        with open('H2O.47') as f:
+            self.assertRaises(Exception, NBOSet, f)
+
+    def test_hybridicities(self):
+        """Hybridicities are kept as printed, including capped and zero hybrids"""
+        nbos = NBOSet(io.StringIO("""\
+     (Occupancy)   Bond orbital / Coefficients / Hybrids
+ ------------------ Lewis ------------------------------------------------------
+   1. (1.92050) BD ( 1)Fe  1- C  2
+               ( 32.17%)   0.5672*Fe  1 s(  0.01%)p99.99( 33.10%)d 2.02( 66.88%)
+                                                  f 0.00(  0.00%)
+                                         0.0000  0.0000 -0.0044  0.5753  0.0022
+               ( 67.83%)   0.8236* C  2 s( 33.10%)p 2.02( 66.88%)
+                                         0.0000  0.0000
+
+"""))
+        assert_almost_equal(nbos.hybridicities[0, 0], [1, 99.99, 2.02, 0, np.nan])
+        self.assertEqual(nbos[0].hybrids[0], [('s', 1.0, 0.01), ('p', 99.99, 33.1),
+                                              ('d', 2.02, 66.88), ('f', 0.0, 0.0)])
+        self.assertEqual(nbos[0].hybrids[1], [('s', 1.0, 33.1), ('p', 2.02, 66.88)])
+
+    def test_bond_orders(self):
+        with open('H2O.nbo') as f:
+            nbos = NBOSet(f)
+        bond_orders = nbos.bond_orders()
+        self.assertEqual(sorted(bond_orders), [(1, 2), (2, 3)])
+        self.assertAlmostEqual(bond_orders[(1, 2)], (1.99908 - 0.00044)/2)
 
+        # Bond orders along a path
+        with open('H2O_stretched.nbo') as f:
+            stretched = NBOSet(f)
+        pairs, orders = NBOSet.bond_orders_many([nbos, stretched, nbos])
+        self.assertEqual(pairs.tolist(), [[1, 2], [2, 3]])
+        self.assertEqual(orders.shape, (3, 2))
+        assert_almost_equal(orders[0], orders[2])
+        assert_almost_equal(orders[1], [stretched.bond_orders()[(1, 2)]] * 2)
+
+        # BD and BD* printed with the atoms in opposite orders are still combined
+        nbos.centers[-1, :2] = nbos.centers[-1, 1::-1]
+        self.assertEqual(bond_orders, nbos.bond_orders())
+        assert_almost_equal(NBOSet.bond_orders_many([nbos])[1], orders[:1])
+
+    @unittest.skipUnless(scipy, 'scipy is needed for sparse bond order matrices')
+    def test_bond_order_matrix(self):
+        with open('H2O.nbo') as f:
+            nbos = NBOSet(f)
+        bo_matrix = nbos.bond_order_matrix().toarray()
+        self.assertEqual(bo_matrix.shape, (3, 3))
+        assert_almost_equal(bo_matrix, bo_matrix.T)
+        self.assertAlmostEqual(bo_matrix[0, 1], nbos.bond_orders()[(1, 2)])
+        self.assertEqual(bo_matrix[0, 2], 0)
 
 if __name__ == '__main__':
     unittest.main()
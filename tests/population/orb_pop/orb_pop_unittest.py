@@ -31,17 +31,89 @@ class TestOrbPop(unittest.TestCase):
         self.assertEqual(op, op_dup)
         os.remove('tmp.csv')
 
+        # Binary columnar format
+        op.write('tmp.npz', 'npz')
+        self.assertEqual(op, OP('tmp.npz'))
+        self.assertEqual(op.range(3, 7), OP('tmp.npz', mo_range=(3, 7)))
+        os.remove('tmp.npz')
+        # Names without the extension could not be read back
+        self.assertRaises(SyntaxError, op.write, 'tmp.out', 'npz')
+        self.assertRaises(SyntaxError, op.write, 'stdout', 'npz')
+        self.assertFalse(os.path.exists('tmp.out.npz'))
+
         # Test UKS open shell
         op = OP('H2O+.dat')
         ao_contrib = AO_Contrib(1, 'O', 'px', 100.0, 1)
         self.assertEqual(op.orb_list[3].contributions[0], ao_contrib)
 
+    def test_arrays(self):
+        op = OP('H2O.dat')
+        self.assertEqual(len(op), 13)
+        self.assertEqual(len(op.offsets), 14)
+        self.assertEqual(len(op[2]), 4)
+        self.assertEqual(list(op.atoms[op.offsets[2]:op.offsets[3]]), ['H', 'O', 'O', 'H'])
+        self.assertEqual(list(op.aos[op.offsets[2]:op.offsets[3]]), ['s', 'pz', 'py', 's'])
+        self.assertEqual(op, OP.from_arrays(**op.arrays()))
+        self.assertEqual(op, OP(orb_list=op.orb_list))
+
+        # Cropping keeps the largest contributions
+        cropped = op.crop(max_num=2)
+        self.assertTrue(all(len(orb) <= 2 for orb in cropped))
+        self.assertEqual([aoc.val for aoc in cropped[2].contributions], [30.4, 30.4])
+
+        # Ranges and appending
+        self.assertEqual(op.range(2, 5).orb_list, op.orb_list[2:5])
+        op_range = op.range(0, 5)
+        op_range.append(op[5])
+        op_range[0] = op[5]
+        self.assertEqual(op_range[0], op[5])
+        self.assertEqual(op_range[5], op[5])
+        self.assertEqual(op_range.range(1, 5), op.range(1, 5))
+
+        # Views are read-only rather than silently discarding changes
+        self.assertIsInstance(op.orb_list, tuple)
+        self.assertIsInstance(op[2].contributions, tuple)
+        self.assertFalse(hasattr(op.orb_list[2].contributions, 'append'))
+
+    def test_read_range(self):
+        op = OP('H2O.dat')
+        self.assertEqual(OP('H2O.dat', mo_range=(3, 8)), op.range(3, 8))
+        self.assertEqual(OP('H2O.dat', mo_range=2), op.range(3, 7))
+        self.assertEqual(OP('H2O.dat', mo_range=(20, 30)), OP())
+
+        # Open shell windows span the spin up and spin down blocks
+        op = OP('H2O+.dat')
+        self.assertEqual(OP('H2O+.dat', mo_range=(10, 16)), op.range(10, 16))
+        self.assertEqual(OP('H2O+.dat', mo_range=(10, 16))[3].spin, -1)
+
     def test_homo_lumo_somo(self):
         op = OP('H2O.dat')
         self.assertEqual(op.homo, 4)
         self.assertEqual(op.lumo, 5)
         self.assertEqual(op.somo, [])
 
+    def test_queries(self):
+        op = OP('H2O.dat')
+        self.assertEqual(op.frontier(), (4, 5))
+        self.assertEqual(op.frontier(1), (None, None))
+        self.assertEqual(list(op.occupied()), [0, 1, 2, 3, 4])
+
+        # Sums over all orbitals match sums over the contributions of each MOrbital
+        orbs = [MOrbital(orb.index, None, orb.energy, orb.occupation, orb.contributions)
+                for orb in op]
+        assert_almost_equal(op.atom_sum('H'), [orb.atom_sum('H') for orb in orbs])
+        assert_almost_equal(op.atom_sum(1), [orb.atom_sum(1) for orb in orbs])
+        assert_almost_equal(op.orbital_type_sum('O', 'p', op.occupied()),
+                            [orb.orbital_type_sum('O', 'p') for orb in orbs[:5]])
+        self.assertEqual(op[8].orbital_type_sum(1, 'p'), 9.8)
+        self.assertEqual(op[8].atom_sum('F'), 0)
+        self.assertEqual(list(op.atom_sum(7)), [0] * 13)
+
+        op = OP('H2O+.dat')
+        self.assertEqual(op.frontier(1), (4, 5))
+        self.assertEqual(op.frontier(-1), (16, 17))
+        self.assertEqual(list(op.occupied(-1)), [13, 14, 15, 16])
+
     def test_atom_contract(self):
         op = OP('H2O.dat')
         atom_contract = op.atom_contract()
@@ -54,6 +126,21 @@ class TestOrbPop(unittest.TestCase):
         self.assertEqual(am_contract[5].contributions[0].val, 34.1)
         self.assertEqual(am_contract[8].contributions[2].val,  9.8)
 
+    def test_matrices(self):
+        op = OP('H2O.dat')
+        atom_matrix = op.atom_matrix()
+        am_matrix = op.am_matrix()
+        self.assertEqual(atom_matrix.shape, (13, 3))
+        self.assertEqual(am_matrix.shape, (13, 3, 7))
+        self.assertEqual(atom_matrix[5, 0], 34.1)
+        self.assertEqual(am_matrix[8, 1, 1], 9.8)
+        assert_almost_equal(am_matrix.sum(axis=2), atom_matrix)
+        assert_almost_equal(atom_matrix.sum(axis=1), 100, decimal=0)
+
+        # Contracting a single MOrbital matches contracting the population
+        self.assertEqual(op[8].am_contract(), op.am_contract()[8])
+        self.assertEqual(op[8].atom_contract(), op.atom_contract()[8])
+
     def test_sub(self):
         # Blank - Blank == Blank
         self.assertEqual(OP() - OP(), OP())
@@ -64,10 +151,33 @@ class TestOrbPop(unittest.TestCase):
         blank = OP(orb_list=[MOrbital(i, None, 0, 0, []) for i in range(13)])
         self.assertEqual(h2o - blank, h2o)
 
-        # A - B
-        h2s = OP('H2S.dat')
-        # TODO: fix indexing problem for subtraction
-        #(h2o.atom_contract() - h2s.atom_contract()).write('h2o_h2s.csv')
+        # A - A == 0
+        self.assertTrue(all((orb.occupation, orb.energy) == (0, 0) for orb in h2o - h2o))
+        self.assertEqual((h2o - h2o).val.tolist(), [0] * len(h2o.val))
+
+        # A - B, matched by orbital and atom, even when the orderings differ
+        h2s = OP('H2S.dat').atom_contract()
+        diff = h2o.atom_contract() - h2s.sorted()
+        self.assertEqual(len(diff), len(h2s))
+        # The O and S of atom 1 are different contributions
+        self.assertEqual([aoc.atom for aoc in diff[5].contributions], ['H', 'O', 'H', 'S'])
+        for orb, orb_h2o, orb_h2s in zip(diff, h2o.atom_contract(), h2s):
+            for atom in range(3):
+                self.assertAlmostEqual(orb.atom_sum(atom),
+                                       orb_h2o.atom_sum(atom) - orb_h2s.atom_sum(atom))
+
+    def test_align(self):
+        ops = [OP('H2O.dat'), OP('H2O.dat').sorted(), OP('H2O+.dat')]
+        mo_keys, ao_keys, contributions = OP.align(ops)
+        self.assertEqual(len(mo_keys), 13 + 26)
+        self.assertEqual(mo_keys[:2], [(None, 0), (None, 1)])
+        self.assertEqual(mo_keys[13:15], [(1, 0), (1, 1)])
+        self.assertEqual(ao_keys[0], (1, 'O', 's'))
+        self.assertEqual(contributions.shape, (3, 39, len(ao_keys)))
+        assert_almost_equal(contributions[0], contributions[1])
+        self.assertEqual(contributions[0, 13:].sum(), 0)
+        self.assertEqual(contributions[2, :13].sum(), 0)
+        self.assertEqual(contributions[0, 4, ao_keys.index((1, 'O', 'px'))], 100)
 
 
 class TestOrbital(unittest.TestCase):
@@ -100,12 +210,13 @@ class TestOrbital(unittest.TestCase):
         # A - Blank == A
         self.assertEqual((self.orb2 - self.orb1).contributions, self.orb2.contributions)
 
-        # A - B
-        aoc_1_2 = self.aoc1 - self.aoc2
-        aoc_2_1 = self.aoc2 - self.aoc1
+        # A - B, contributions are matched regardless of their order
+        aoc_1_1 = self.aoc1 - self.aoc1
+        aoc_2_2 = self.aoc2 - self.aoc2
         aoc_3_3 = self.aoc3 - self.aoc3
-        orb_2_3 = MOrbital(1, None, -0.20, 0.50, [aoc_1_2, aoc_2_1, aoc_3_3])
-        self.assertEqual((self.orb2 - self.orb3).contributions, orb_2_3.contributions)
+        orb_2_3 = MOrbital(1, None, -0.20, 0.50, [aoc_1_1, aoc_2_2, aoc_3_3])
+        self.assertEqual(self.orb2 - self.orb3, orb_2_3)
+        self.assertEqual((self.orb3 - self.orb1).contributions, self.orb3.contributions)
 
 
 class TestAO_Contrib(unittest.TestCase):
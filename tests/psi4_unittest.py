@@ -0,0 +1,34 @@
+import unittest
+
+from sys import path
+
+path.insert(0, '..')
+
+from qgrep import psi4
+
+
+class TestPsi4(unittest.TestCase):
+    """Tests the psi4 module"""
+
+    def setUp(self):
+        """Read in the necessary files"""
+        with open('psi4_output.dat') as f:
+            self.lines = f.readlines()
+
+    def test_get_trajectory(self):
+        """Testing get_trajectory"""
+        traj = psi4.get_trajectory(self.lines)
+        geoms = psi4.plot(self.lines)
+        self.assertEqual(5, len(traj))
+        self.assertEqual(len(geoms), len(traj))
+        self.assertEqual(['H', 'O', 'H'], traj.atoms)
+        for geom, mol in zip(geoms, traj):
+            lines = geom.splitlines()[2:]
+            self.assertEqual([line.split()[0] for line in lines], mol.atoms)
+            self.assertEqual([[float(x) for x in line.split()[1:]] for line in lines],
+                             mol.xyz.tolist())
+        self.assertEqual([0.0, 0.7581055431, -0.5647004883], traj.frames[-1, 0].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
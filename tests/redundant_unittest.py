@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+
+from sys import path
+from numpy.testing import assert_almost_equal
+
+path.insert(0, '..')
+
+from qgrep.redundant import RedundantInternals, align, canonical_id, diff_matrix
+
+
+class TestRedundantInternals(unittest.TestCase):
+    """Tests reading and comparing redundant internal coordinates"""
+
+    def setUp(self):
+        """Read the redundant internals of every step of a scan"""
+        with open('orca/CH3F_Cl_scan.out') as f:
+            lines = f.readlines()
+        starts = [i for i, line in enumerate(lines) if '--- Optimized Parameters ---' in line]
+        self.steps = [RedundantInternals(lines[:start + 30]) for start in starts[:3]]
+        self.final = RedundantInternals(lines)
+
+    def test_canonical_id(self):
+        """Test canonical_id"""
+        self.assertEqual(('B', 0, 1), canonical_id('B', (1, 0)))
+        self.assertEqual(('A', 1, 0, 2), canonical_id('A', (2, 0, 1)))
+        self.assertEqual(('D', 1, 4, 0, 3), canonical_id('D', (3, 0, 4, 1)))
+        self.assertEqual(('L', 1, 2, 3, 0, 2), canonical_id('L', (3, 2, 1, 0), 2))
+
+    def test_read(self):
+        """Test read"""
+        self.assertEqual(17, len(self.final))
+        self.assertEqual(('B', 0, 1), self.final.ids[0])
+        self.assertEqual(('A', 3, 0, 4), self.final.ids[8])
+        self.assertEqual([(0, 'C'), (1, 'Cl'), 3.0239], self.final.bond_vals[0])
+        self.assertEqual([(3, 'H'), (0, 'C'), (4, 'H'), 106.71], self.final.angle_vals[0])
+        self.assertEqual([7], np.flatnonzero(self.final.constrained).tolist())
+        self.assertEqual('  0 C -  1 Cl =  3.0239', self.final.print().splitlines()[0])
+        self.assertEqual('  2 H -  0 C -  4 H  =  106.72', self.final.print(False, True)[-31:-1])
+
+    def test_align(self):
+        """Test aligning the coordinates of many outputs"""
+        ids, values = align(self.steps + [self.final])
+        self.assertEqual((4, len(ids)), values.shape)
+        self.assertEqual(len(set(ids)), len(ids))
+        for ri, row in zip(self.steps + [self.final], values):
+            self.assertEqual(len(ri), int((~np.isnan(row)).sum()))
+            assert_almost_equal(row[[ids.index(cid) for cid in ri.ids]], ri.values)
+
+    def test_diff_matrix(self):
+        """Test diff_matrix"""
+        sets = self.steps + [self.final]
+        sad = diff_matrix(sets)
+        self.assertEqual((4, 4), sad.shape)
+        assert_almost_equal(np.diag(sad), 0)
+        assert_almost_equal(sad, sad.T)
+        b0, b1 = self.steps[:2]
+        shared = [cid for cid in b0.ids if cid in b1.index and cid[0] == 'B']
+        expected = sum(abs(b0.values[b0.index[cid]] - b1.values[b1.index[cid]]) for cid in shared)
+        self.assertAlmostEqual(expected, sad[0, 1])
+        rmsd = diff_matrix(sets, 'rmsd', 'BALD')
+        self.assertTrue((rmsd >= diff_matrix(sets, 'mad', 'BALD') - 1e-12).all())
+        self.assertTrue((diff_matrix(sets, 'max', 'AL') <= 180).all())
+        self.assertRaises(ValueError, diff_matrix, sets, 'abc')
+
+        # Single pairs match the matrix
+        for metric in ['sad', 'rmsd']:
+            self.assertAlmostEqual(diff_matrix(sets, metric, 'BA')[1, 3],
+                                   sets[1].diff_metric(sets[3], metric, 'BA'))
+        self.assertRaises(ValueError, b0.diff_metric, b1, 'abc')
+
+
+if __name__ == '__main__':
+    unittest.main()
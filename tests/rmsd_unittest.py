@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+
+from sys import path
+from numpy.testing import assert_almost_equal
+
+path.insert(0, '..')
+
+from qgrep.rmsd import align, kabsch, reorder, rmsd, rmsd_matrix
+
+try:
+    import scipy
+except ImportError:
+    scipy = None
+
+
+def random_rotation(rng):
+    """Random proper rotation matrix"""
+    q, r = np.linalg.qr(rng.normal(size=(3, 3)))
+    q *= np.sign(np.diag(r))
+    return q * np.sign(np.linalg.det(q))
+
+
+class TestRMSD(unittest.TestCase):
+    """Tests alignment and RMSD"""
+
+    def setUp(self):
+        """Set up for every test"""
+        self.rng = np.random.default_rng(0)
+        self.atoms = ['C', 'C', 'O', 'H', 'H', 'H', 'H', 'N']
+        self.xyz = self.rng.normal(size=(8, 3))
+
+    def test_kabsch_align(self):
+        """Test kabsch and align"""
+        rotation = random_rotation(self.rng)
+        moved = self.xyz @ rotation.T + [3, -1, 2]
+        centered = self.xyz - self.xyz.mean(axis=0)
+        assert_almost_equal(align(moved, self.xyz), centered)
+        r = kabsch(centered, centered @ rotation.T)
+        assert_almost_equal(r, rotation)
+        # Mirror images cannot be aligned by a rotation
+        mirrored = self.xyz * [1, 1, -1]
+        self.assertAlmostEqual(1, np.linalg.det(kabsch(centered, mirrored - mirrored.mean(0))))
+
+    def test_rmsd(self):
+        """Test rmsd"""
+        moved = self.xyz @ random_rotation(self.rng).T + 5
+        self.assertAlmostEqual(0, rmsd(self.xyz, moved))
+        self.assertGreater(rmsd(self.xyz, moved, align=False), 1)
+        noisy = self.xyz + self.rng.normal(scale=0.1, size=self.xyz.shape)
+        aligned = align(noisy, self.xyz)
+        centered = self.xyz - self.xyz.mean(axis=0)
+        expected = np.sqrt(((aligned - centered)**2).sum() / len(self.xyz))
+        self.assertAlmostEqual(expected, rmsd(noisy, self.xyz))
+        self.assertEqual((3,), rmsd([self.xyz] * 3, [moved, noisy, self.xyz]).shape)
+
+    def test_rmsd_matrix(self):
+        """Test rmsd_matrix against pairwise rmsd"""
+        frames = self.xyz + self.rng.normal(scale=0.3, size=(20, 8, 3))
+        expected = rmsd(frames[:, np.newaxis], frames[np.newaxis])
+        np.fill_diagonal(expected, 0)
+        for nprocs in [1, 2]:
+            assert_almost_equal(rmsd_matrix(frames, nprocs=nprocs, block_size=6), expected)
+
+    @unittest.skipUnless(scipy, 'scipy is needed to reorder atoms')
+    def test_reorder(self):
+        """Test reorder"""
+        perm = self.rng.permutation(8)
+        atoms = [self.atoms[i] for i in perm]
+        moved = (self.xyz @ random_rotation(self.rng).T)[perm]
+        order = reorder(self.atoms, self.xyz, atoms, moved)
+        self.assertEqual(self.atoms, [atoms[i] for i in order])
+        self.assertAlmostEqual(0, rmsd(self.xyz, moved[order]))
+        self.assertRaises(ValueError, reorder, self.atoms, self.xyz, ['C'] * 8, self.xyz)
+
+        frames = np.array([self.xyz, moved])
+        matrix = rmsd_matrix(frames, [self.atoms, atoms], reorder_atoms=True)
+        assert_almost_equal(matrix, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import os
+import unittest
+import numpy as np
+
+from sys import path
+from glob import glob
+from numpy.testing import assert_almost_equal
+
+path.insert(0, '..')
+
+from qgrep.molecule import Molecule
+from qgrep.trajectory import Trajectory, XYZReader
+
+
+class TestTrajectory(unittest.TestCase):
+    """Tests the Trajectory class"""
+
+    def setUp(self):
+        """Set up for every test"""
+        self.atoms = ['H', 'O', 'H']
+        water = np.array([[0, 0, 0], [0, 0, 1], [0, 1, 1]])
+        self.frames = np.array([water, water + 1, water * 2, water - 1])
+        self.traj = Trajectory(self.atoms, self.frames)
+
+    def tearDown(self):
+        for tmp_file in glob('*.tmp'):
+            os.remove(tmp_file)
+
+    def test_init(self):
+        """Test __init__ and __len__"""
+        self.assertEqual(4, len(self.traj))
+        self.assertEqual(3, self.traj.n_atoms)
+        self.assertEqual('<Trajectory 4x3>', repr(self.traj))
+        self.assertRaises(SyntaxError, Trajectory, ['H'], self.frames)
+        self.assertRaises(SyntaxError, Trajectory, self.atoms, self.frames[0])
+        self.assertRaises(SyntaxError, Trajectory, self.atoms, self.frames, ['a'])
+
+    def test_getitem_iter(self):
+        """Test __getitem__ and __iter__"""
+        mol = self.traj[1]
+        self.assertIsInstance(mol, Molecule)
+        self.assertEqual(self.atoms, mol.atoms)
+        assert_almost_equal(self.frames[1], mol.xyz)
+
+        # Frames are views into the Trajectory
+        mol.xyz[0] = [5, 5, 5]
+        assert_almost_equal([5, 5, 5], self.traj.frames[1, 0])
+
+        sub = Trajectory(self.atoms, self.frames, ['a', 'b', 'c', 'd'])[::2]
+        self.assertEqual(2, len(sub))
+        self.assertEqual(['a', 'c'], sub.comments)
+        self.assertEqual('Step 1', self.traj[1:].comment(1))
+
+        for mol, frame in zip(self.traj, self.traj.frames):
+            assert_almost_equal(frame, mol.xyz)
+
+    def test_from_molecules(self):
+        """Test from_molecules"""
+        traj = Trajectory.from_molecules(list(self.traj))
+        assert_almost_equal(self.traj.frames, traj.frames)
+        self.assertRaises(SyntaxError, Trajectory.from_molecules, [])
+        bad = Molecule([['H', [0, 0, 0]]])
+        self.assertRaises(SyntaxError, Trajectory.from_molecules, [self.traj[0], bad])
+
+    def test_from_blocks(self):
+        """Test from_blocks"""
+        blocks = [['H 1 0 0 0\n', 'He 2 1 1 1\n'], ['H 1 0 0 1\n', 'He 2 1 1 2\n']]
+        traj = Trajectory.from_blocks(blocks, xyz_cols=(2, 3, 4))
+        self.assertEqual(['H', 'He'], traj.atoms)
+        assert_almost_equal([[1, 1, 1], [1, 1, 2]], traj.frames[:, 1])
+        self.assertRaises(SyntaxError, Trajectory.from_blocks, [blocks[0], blocks[0][:1]])
+
+    def test_write(self):
+        """Test writing XYZ files"""
+        self.traj.write('traj.xyz.tmp')
+        with open('traj.xyz.tmp') as f:
+            lines = f.readlines()
+        self.assertEqual(20, len(lines))
+        self.assertEqual(['3\n', 'Step 0\n'], lines[:2])
+        self.assertEqual(str(self.traj[3]) + '\n', ''.join(lines[17:]))
+
+        files = self.traj.write_frames('traj_{}.xyz.tmp')
+        self.assertEqual(4, len(files))
+        self.assertEqual(self.traj[2], Molecule.read_from(files[2]))
+
+        # Other precisions and blank lines between frames
+        self.traj.write('traj.xyz.tmp', form='{:2}' + ' {:>15.10f}' * 3, separator='\n')
+        with open('traj.xyz.tmp') as f:
+            lines = f.readlines()
+        self.assertEqual(24, len(lines))
+        self.assertEqual(['\n', '3\n'], lines[5:7])
+        self.assertEqual('H     0.0000000000    0.0000000000    0.0000000000\n', lines[2])
+        with XYZReader('traj.xyz.tmp') as reader:
+            assert_almost_equal(self.traj.frames, reader.read().frames)
+
+
+class TestXYZReader(unittest.TestCase):
+    """Tests the XYZReader class"""
+
+    def setUp(self):
+        """Set up for every test"""
+        water = np.array([[0, 0, 0], [0, 0, 1], [0, 1, 1]])
+        self.frames = np.array([water + i for i in range(10)])
+        self.traj = Trajectory(['H', 'O', 'H'], self.frames)
+        self.traj.write('traj.xyz.tmp')
+
+    def tearDown(self):
+        for tmp_file in glob('*.tmp'):
+            os.remove(tmp_file)
+
+    def test_index(self):
+        """Test indexing of frames with various chunk sizes"""
+        for chunk_size in [1, 7, 64, 2**20]:
+            with XYZReader('traj.xyz.tmp', chunk_size) as reader:
+                self.assertEqual(10, len(reader))
+                self.assertEqual([3] * 10, list(reader.n_atoms))
+                assert_almost_equal(self.frames[7], reader[7].xyz)
+
+    def test_getitem(self):
+        """Test random access, slices, and strides"""
+        with XYZReader('traj.xyz.tmp') as reader:
+            self.assertEqual(self.traj[3], reader[3])
+            self.assertEqual(self.traj[9], reader[-1])
+            self.assertEqual('Step 4', reader.comment(4))
+            self.assertRaises(IndexError, reader.__getitem__, 10)
+
+            traj = reader[1::3]
+            self.assertEqual(['Step 1', 'Step 4', 'Step 7'], traj.comments)
+            assert_almost_equal(self.frames[1::3], traj.frames)
+            assert_almost_equal(self.frames[[2, 5]], reader.read([2, 5]).frames)
+            self.assertEqual(10, len(list(reader)))
+            self.assertRaises(SyntaxError, reader.read, slice(0, 0))
+
+    def test_edge_cases(self):
+        """Test trailing blank lines, missing final newline, incomplete frames, and empty files"""
+        with open('traj.xyz.tmp') as f:
+            text = f.read()
+        for content, length in [(text + '\n\n', 10), (text.rstrip('\n'), 10),
+                                (text + '3\nStep 10\nH 0 0 0\n', 10), ('', 0)]:
+            with open('edge.xyz.tmp', 'w') as f:
+                f.write(content)
+            with XYZReader('edge.xyz.tmp') as reader:
+                self.assertEqual(length, len(reader))
+                if length:
+                    assert_almost_equal(self.frames[-1], reader[-1].xyz)
+
+        # Blank lines between frames are skipped
+        lines = text.splitlines(keepends=True)
+        frames = [''.join(lines[i:i + 5]) for i in range(0, len(lines), 5)]
+        for chunk_size in [1, 7, 2**20]:
+            with open('blank.xyz.tmp', 'w') as f:
+                f.write('\n'.join(frames))
+            with XYZReader('blank.xyz.tmp', chunk_size) as reader:
+                self.assertEqual(10, len(reader))
+                assert_almost_equal(self.frames[1], reader[1].xyz)
+                assert_almost_equal(self.frames, reader.read().frames)
+
+        with open('bad.xyz.tmp', 'w') as f:
+            f.write('H 0 0 0\n')
+        self.assertRaises(SyntaxError, XYZReader, 'bad.xyz.tmp')
+        with open('bad.xyz.tmp', 'w') as f:
+            f.write(text + '\nH 0 0 0\n')
+        self.assertRaises(SyntaxError, XYZReader, 'bad.xyz.tmp')
+
+
+if __name__ == '__main__':
+    unittest.main()